@@ -1,28 +1,50 @@
 package handlers
 
 import (
-	"crawl-trigger-api/database"
+	"crawl-trigger-api/jobs"
 	"crawl-trigger-api/models"
 	"crawl-trigger-api/queue"
+	"errors"
 	"net/http"
+	"strconv"
 	"time"
 
 	"github.com/gin-gonic/gin"
-	"github.com/google/uuid"
 )
 
 type CrawlHandler struct {
-	queue *queue.RedisQueue
-	db    *database.MySQLDB
+	queue   *queue.RedisQueue
+	creator *jobs.Creator
 }
 
-func NewCrawlHandler(q *queue.RedisQueue, d *database.MySQLDB) *CrawlHandler {
+func NewCrawlHandler(q *queue.RedisQueue, creator *jobs.Creator) *CrawlHandler {
 	return &CrawlHandler{
-		queue: q,
-		db:    d,
+		queue:   q,
+		creator: creator,
 	}
 }
 
+// validPlatforms lists the platforms crawlers exist for
+var validPlatforms = map[string]bool{
+	"instagram": true,
+	"tiktok":    true,
+	"facebook":  true,
+}
+
+// invalidPriority is the error for a priority outside queue.Priorities
+const invalidPriority = "Invalid priority. Must be one of: high, normal, low"
+
+// validateCrawlTarget checks platform and max_comments, shared by crawls and monitors
+func validateCrawlTarget(platform string, maxComments int) string {
+	if !validPlatforms[platform] {
+		return "Invalid platform. Must be one of: instagram, tiktok, facebook"
+	}
+	if maxComments <= 0 || maxComments > 10000 {
+		return "max_comments must be between 1 and 10000"
+	}
+	return ""
+}
+
 // CreateCrawlJob handles POST /api/crawl
 func (h *CrawlHandler) CreateCrawlJob(c *gin.Context) {
 	var req models.CrawlRequest
@@ -36,80 +58,52 @@ func (h *CrawlHandler) CreateCrawlJob(c *gin.Context) {
 		return
 	}
 
-	// Validate platform
-	validPlatforms := map[string]bool{
-		"instagram": true,
-		"tiktok":    true,
-		"facebook":  true,
-	}
-
-	if !validPlatforms[req.Platform] {
+	// Validate platform and max_comments
+	if message := validateCrawlTarget(req.Platform, req.MaxComments); message != "" {
 		c.JSON(http.StatusBadRequest, gin.H{
-			"error": "Invalid platform. Must be one of: instagram, tiktok, facebook",
+			"error": message,
 		})
 		return
 	}
 
-	// Validate max_comments
-	if req.MaxComments <= 0 || req.MaxComments > 10000 {
+	if req.Priority == "" {
+		req.Priority = queue.DefaultPriority
+	}
+	if !queue.ValidPriority(req.Priority) {
 		c.JSON(http.StatusBadRequest, gin.H{
-			"error": "max_comments must be between 1 and 10000",
+			"error": invalidPriority,
 		})
 		return
 	}
 
-	// Generate unique job ID
-	jobID := uuid.New().String()
-
-	// Create job data
-	now := time.Now()
-	jobData := map[string]interface{}{
-		"job_id":       jobID,
-		"platform":     req.Platform,
-		"target_url":   req.TargetURL,
-		"max_comments": req.MaxComments,
-		"status":       "queued",
-		"created_at":   now.Format(time.RFC3339),
-		"updated_at":   now.Format(time.RFC3339),
+	// Traced and profiled jobs are for diagnosing a crawl, so they never
+	// attach to someone else's run
+	extra := map[string]interface{}{}
+	if req.Trace {
+		extra["trace"] = true
 	}
-
-	// Create job in MySQL database
-	err := h.db.CreateJob(jobID, req.Platform, req.TargetURL, req.MaxComments)
-	if err != nil {
-		c.JSON(http.StatusInternalServerError, gin.H{
-			"error":   "Failed to create job in database",
-			"details": err.Error(),
-		})
-		return
-	}
-
-	// Store job data in Redis
-	err = h.queue.StoreJobData(jobID, jobData)
-	if err != nil {
-		c.JSON(http.StatusInternalServerError, gin.H{
-			"error":   "Failed to store job data",
-			"details": err.Error(),
-		})
-		return
+	if req.Profile {
+		extra["profile"] = true
 	}
 
-	// Set initial job status
-	err = h.queue.SetJobStatus(jobID, "queued")
+	jobID, kind, err := h.creator.Create(jobs.Request{
+		Platform:    req.Platform,
+		TargetURL:   req.TargetURL,
+		MaxComments: req.MaxComments,
+		Priority:    req.Priority,
+		Force:       req.Force || req.Trace || req.Profile,
+		Extra:       extra,
+	})
 	if err != nil {
 		c.JSON(http.StatusInternalServerError, gin.H{
-			"error":   "Failed to set job status",
+			"error":   "Failed to queue job",
 			"details": err.Error(),
 		})
 		return
 	}
 
-	// Publish job to queue
-	err = h.queue.PublishJob(jobData)
-	if err != nil {
-		c.JSON(http.StatusInternalServerError, gin.H{
-			"error":   "Failed to queue job",
-			"details": err.Error(),
-		})
+	if kind != jobs.KindNew {
+		h.respondDeduplicated(c, jobID)
 		return
 	}
 
@@ -120,23 +114,33 @@ func (h *CrawlHandler) CreateCrawlJob(c *gin.Context) {
 	})
 }
 
+// respondDeduplicated answers a duplicate submission with the job it was attached to
+func (h *CrawlHandler) respondDeduplicated(c *gin.Context, jobID string) {
+	status := "queued"
+	if job, err := h.queue.GetJob(jobID); err == nil && job["status"] != "" {
+		status = job["status"]
+	}
+
+	c.JSON(http.StatusOK, models.CrawlResponse{
+		JobID:        jobID,
+		Status:       status,
+		Deduplicated: true,
+	})
+}
+
 // GetJobStatus handles GET /api/crawl/:job_id/status
 func (h *CrawlHandler) GetJobStatus(c *gin.Context) {
 	jobID := c.Param("job_id")
 
-	// Get job data from Redis
-	jobData, err := h.queue.GetJobData(jobID)
-	if err != nil {
+	// Job state and progress come from one HGETALL
+	job, err := h.queue.GetJob(jobID)
+	if errors.Is(err, queue.ErrJobNotFound) {
 		c.JSON(http.StatusNotFound, gin.H{
 			"error":  "Job not found",
 			"job_id": jobID,
 		})
 		return
-	}
-
-	// Get current status
-	status, err := h.queue.GetJobStatus(jobID)
-	if err != nil {
+	} else if err != nil {
 		c.JSON(http.StatusInternalServerError, gin.H{
 			"error":   "Failed to get job status",
 			"details": err.Error(),
@@ -144,22 +148,41 @@ func (h *CrawlHandler) GetJobStatus(c *gin.Context) {
 		return
 	}
 
-	// Parse timestamps
-	createdAt, _ := time.Parse(time.RFC3339, jobData["created_at"].(string))
-	updatedAt, _ := time.Parse(time.RFC3339, jobData["updated_at"].(string))
+	// Parse timestamps and counters (hash values are strings)
+	createdAt, _ := time.Parse(time.RFC3339, job["created_at"])
+	updatedAt, _ := time.Parse(time.RFC3339, job["updated_at"])
+	maxComments, _ := strconv.Atoi(job["max_comments"])
 
 	// Build response
 	response := models.JobStatusResponse{
-		JobID:     jobID,
-		Platform:  jobData["platform"].(string),
-		Status:    status,
-		CreatedAt: createdAt,
-		UpdatedAt: updatedAt,
-	}
-
-	if errorMsg, ok := jobData["error_message"].(string); ok {
-		response.ErrorMessage = errorMsg
+		JobID:        jobID,
+		Platform:     job["platform"],
+		TargetURL:    job["target_url"],
+		MaxComments:  maxComments,
+		Priority:     job["priority"],
+		Status:       job["status"],
+		Phase:        job["phase"],
+		Partial:      job["partial"] == "1",
+		Progress:     parseProgress(job),
+		CreatedAt:    createdAt,
+		UpdatedAt:    updatedAt,
+		ErrorMessage: job["error_message"],
 	}
 
 	c.JSON(http.StatusOK, response)
 }
+
+// parseProgress reads the worker's progress counters from a job hash
+func parseProgress(job map[string]string) models.JobProgress {
+	counter := func(field string) int64 {
+		value, _ := strconv.ParseInt(job[field], 10, 64)
+		return value
+	}
+	return models.JobProgress{
+		CommentsFound: counter("comments_found"),
+		CommentsSent:  counter("comments_sent"),
+		ChunksSent:    counter("chunks_sent"),
+		BytesSent:     counter("bytes_sent"),
+		RateLimitedMs: counter("rate_limited_ms"),
+	}
+}
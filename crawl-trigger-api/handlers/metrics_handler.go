@@ -0,0 +1,73 @@
+package handlers
+
+import (
+	"crawl-trigger-api/jobs"
+	"crawl-trigger-api/queue"
+	"fmt"
+	"net/http"
+	"strings"
+
+	"github.com/gin-gonic/gin"
+)
+
+type MetricsHandler struct {
+	queue   *queue.RedisQueue
+	creator *jobs.Creator
+}
+
+func NewMetricsHandler(q *queue.RedisQueue, creator *jobs.Creator) *MetricsHandler {
+	return &MetricsHandler{
+		queue:   q,
+		creator: creator,
+	}
+}
+
+// GetMetrics handles GET /metrics in the Prometheus text format
+func (h *MetricsHandler) GetMetrics(c *gin.Context) {
+	var out strings.Builder
+
+	submissions := h.creator.Stats()
+	writeMetric(&out, "crawl_api_submissions_total", "counter", "Crawl submissions by how they were resolved (new, inflight, cached, failed)")
+	fmt.Fprintf(&out, "crawl_api_submissions_total{kind=%q} %d\n", jobs.KindNew, submissions.New)
+	fmt.Fprintf(&out, "crawl_api_submissions_total{kind=%q} %d\n", jobs.KindInflight, submissions.Inflight)
+	fmt.Fprintf(&out, "crawl_api_submissions_total{kind=%q} %d\n", jobs.KindCached, submissions.Cached)
+	fmt.Fprintf(&out, "crawl_api_submissions_total{kind=%q} %d\n", "failed", submissions.Failed)
+
+	// Queue gauges come from Redis, so every API instance reports the same queues
+	stats, err := h.queue.QueueStats()
+	up := 1
+	if err != nil {
+		up = 0
+	}
+	writeMetric(&out, "crawl_api_queue_up", "gauge", "Whether the queue stats could be read from Redis")
+	fmt.Fprintf(&out, "crawl_api_queue_up %d\n", up)
+
+	queueMetrics := []struct {
+		name, kind, help string
+		value            func(queue.ClassStats) float64
+	}{
+		{"crawl_queue_waiting", "gauge", "Jobs waiting in a queue class",
+			func(s queue.ClassStats) float64 { return float64(s.Waiting) }},
+		{"crawl_queue_running", "gauge", "Jobs of a queue class held by workers",
+			func(s queue.ClassStats) float64 { return float64(s.Running) }},
+		{"crawl_queue_oldest_wait_seconds", "gauge", "Age of the oldest waiting job of a queue class",
+			func(s queue.ClassStats) float64 { return s.OldestWait.Seconds() }},
+		{"crawl_queue_dequeued_total", "counter", "Jobs workers took from a queue class",
+			func(s queue.ClassStats) float64 { return float64(s.Dequeued) }},
+		{"crawl_queue_wait_seconds_total", "counter", "Queue wait summed over the dequeued jobs of a queue class",
+			func(s queue.ClassStats) float64 { return s.WaitTotal.Seconds() }},
+	}
+	for _, metric := range queueMetrics {
+		writeMetric(&out, metric.name, metric.kind, metric.help)
+		for _, class := range stats {
+			fmt.Fprintf(&out, "%s{platform=%q,priority=%q} %g\n", metric.name, class.Platform, class.Priority, metric.value(class))
+		}
+	}
+
+	c.Data(http.StatusOK, "text/plain; version=0.0.4", []byte(out.String()))
+}
+
+// writeMetric writes the HELP and TYPE lines of a metric
+func writeMetric(out *strings.Builder, name, kind, help string) {
+	fmt.Fprintf(out, "# HELP %s %s\n# TYPE %s %s\n", name, help, name, kind)
+}
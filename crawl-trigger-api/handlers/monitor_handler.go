@@ -0,0 +1,196 @@
+package handlers
+
+import (
+	"crawl-trigger-api/jobs"
+	"crawl-trigger-api/models"
+	"crawl-trigger-api/queue"
+	"errors"
+	"net/http"
+	"strconv"
+	"time"
+
+	"github.com/gin-gonic/gin"
+	"github.com/google/uuid"
+)
+
+// minMonitorInterval keeps monitors from turning into a crawl loop
+const minMonitorInterval = 60
+
+type MonitorHandler struct {
+	queue *queue.RedisQueue
+}
+
+func NewMonitorHandler(q *queue.RedisQueue) *MonitorHandler {
+	return &MonitorHandler{
+		queue: q,
+	}
+}
+
+// CreateMonitor handles POST /api/monitors
+func (h *MonitorHandler) CreateMonitor(c *gin.Context) {
+	var req models.MonitorRequest
+
+	// Validate request body
+	if err := c.ShouldBindJSON(&req); err != nil {
+		c.JSON(http.StatusBadRequest, gin.H{
+			"error":   "Invalid request format",
+			"details": err.Error(),
+		})
+		return
+	}
+
+	// Validate platform and max_comments
+	if message := validateCrawlTarget(req.Platform, req.MaxComments); message != "" {
+		c.JSON(http.StatusBadRequest, gin.H{
+			"error": message,
+		})
+		return
+	}
+
+	if req.IntervalSeconds < minMonitorInterval {
+		c.JSON(http.StatusBadRequest, gin.H{
+			"error": "interval_seconds must be at least 60",
+		})
+		return
+	}
+
+	// Monitor runs queue behind on-demand crawls unless asked otherwise
+	if req.Priority == "" {
+		req.Priority = jobs.MonitorPriority
+	}
+	if !queue.ValidPriority(req.Priority) {
+		c.JSON(http.StatusBadRequest, gin.H{
+			"error": invalidPriority,
+		})
+		return
+	}
+
+	// The first run is due right away
+	monitorID := uuid.New().String()
+	now := time.Now()
+	err := h.queue.SaveMonitor(monitorID, map[string]interface{}{
+		"monitor_id":       monitorID,
+		"platform":         req.Platform,
+		"target_url":       req.TargetURL,
+		"max_comments":     req.MaxComments,
+		"interval_seconds": req.IntervalSeconds,
+		"priority":         req.Priority,
+		"created_at":       now.Format(time.RFC3339),
+	}, now)
+	if err != nil {
+		c.JSON(http.StatusInternalServerError, gin.H{
+			"error":   "Failed to create monitor",
+			"details": err.Error(),
+		})
+		return
+	}
+
+	c.JSON(http.StatusCreated, models.Monitor{
+		MonitorID:       monitorID,
+		Platform:        req.Platform,
+		TargetURL:       req.TargetURL,
+		MaxComments:     req.MaxComments,
+		IntervalSeconds: req.IntervalSeconds,
+		Priority:        req.Priority,
+		NextRunAt:       time.Unix(now.Unix(), 0),
+		CreatedAt:       time.Unix(now.Unix(), 0),
+	})
+}
+
+// ListMonitors handles GET /api/monitors
+func (h *MonitorHandler) ListMonitors(c *gin.Context) {
+	ids, err := h.queue.ListMonitors()
+	if err != nil {
+		c.JSON(http.StatusInternalServerError, gin.H{
+			"error":   "Failed to list monitors",
+			"details": err.Error(),
+		})
+		return
+	}
+
+	monitors := make([]models.Monitor, 0, len(ids))
+	for _, id := range ids {
+		monitor, nextRun, err := h.queue.GetMonitor(id)
+		if err != nil {
+			continue // Deleted between the two reads
+		}
+		monitors = append(monitors, buildMonitor(id, monitor, nextRun))
+	}
+
+	c.JSON(http.StatusOK, gin.H{
+		"monitors": monitors,
+		"count":    len(monitors),
+	})
+}
+
+// GetMonitor handles GET /api/monitors/:monitor_id
+func (h *MonitorHandler) GetMonitor(c *gin.Context) {
+	monitorID := c.Param("monitor_id")
+
+	monitor, nextRun, err := h.queue.GetMonitor(monitorID)
+	if errors.Is(err, queue.ErrMonitorNotFound) {
+		c.JSON(http.StatusNotFound, gin.H{
+			"error":      "Monitor not found",
+			"monitor_id": monitorID,
+		})
+		return
+	} else if err != nil {
+		c.JSON(http.StatusInternalServerError, gin.H{
+			"error":   "Failed to get monitor",
+			"details": err.Error(),
+		})
+		return
+	}
+
+	c.JSON(http.StatusOK, buildMonitor(monitorID, monitor, nextRun))
+}
+
+// DeleteMonitor handles DELETE /api/monitors/:monitor_id
+func (h *MonitorHandler) DeleteMonitor(c *gin.Context) {
+	monitorID := c.Param("monitor_id")
+
+	err := h.queue.DeleteMonitor(monitorID)
+	if errors.Is(err, queue.ErrMonitorNotFound) {
+		c.JSON(http.StatusNotFound, gin.H{
+			"error":      "Monitor not found",
+			"monitor_id": monitorID,
+		})
+		return
+	} else if err != nil {
+		c.JSON(http.StatusInternalServerError, gin.H{
+			"error":   "Failed to delete monitor",
+			"details": err.Error(),
+		})
+		return
+	}
+
+	c.JSON(http.StatusOK, gin.H{
+		"monitor_id": monitorID,
+		"deleted":    true,
+	})
+}
+
+// buildMonitor converts a monitor hash (string values) into the API model
+func buildMonitor(monitorID string, monitor map[string]string, nextRun time.Time) models.Monitor {
+	maxComments, _ := strconv.Atoi(monitor["max_comments"])
+	interval, _ := strconv.Atoi(monitor["interval_seconds"])
+	runs, _ := strconv.Atoi(monitor["runs"])
+	createdAt, _ := time.Parse(time.RFC3339, monitor["created_at"])
+
+	response := models.Monitor{
+		MonitorID:       monitorID,
+		Platform:        monitor["platform"],
+		TargetURL:       monitor["target_url"],
+		MaxComments:     maxComments,
+		IntervalSeconds: interval,
+		Priority:        monitor["priority"],
+		NextRunAt:       nextRun,
+		LastJobID:       monitor["last_job_id"],
+		Runs:            runs,
+		CreatedAt:       createdAt,
+	}
+	if lastRun, err := time.Parse(time.RFC3339, monitor["last_run_at"]); err == nil {
+		response.LastRunAt = &lastRun
+	}
+	return response
+}
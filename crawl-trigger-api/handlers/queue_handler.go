@@ -0,0 +1,59 @@
+package handlers
+
+import (
+	"crawl-trigger-api/models"
+	"crawl-trigger-api/queue"
+	"net/http"
+	"time"
+
+	"github.com/gin-gonic/gin"
+)
+
+type QueueHandler struct {
+	queue *queue.RedisQueue
+}
+
+func NewQueueHandler(q *queue.RedisQueue) *QueueHandler {
+	return &QueueHandler{
+		queue: q,
+	}
+}
+
+// GetQueues handles GET /api/queues
+func (h *QueueHandler) GetQueues(c *gin.Context) {
+	stats, err := h.queue.QueueStats()
+	if err != nil {
+		c.JSON(http.StatusInternalServerError, gin.H{
+			"error":   "Failed to get queue stats",
+			"details": err.Error(),
+		})
+		return
+	}
+
+	classes := make([]models.QueueClassStats, 0, len(stats))
+	var waiting, running int64
+	for _, class := range stats {
+		var avgWait time.Duration
+		if class.Dequeued > 0 {
+			avgWait = class.WaitTotal / time.Duration(class.Dequeued)
+		}
+		classes = append(classes, models.QueueClassStats{
+			Platform:     class.Platform,
+			Priority:     class.Priority,
+			Waiting:      class.Waiting,
+			Running:      class.Running,
+			OldestWaitMs: class.OldestWait.Milliseconds(),
+			Dequeued:     class.Dequeued,
+			AvgWaitMs:    avgWait.Milliseconds(),
+			LastWaitMs:   class.LastWait.Milliseconds(),
+		})
+		waiting += class.Waiting
+		running += class.Running
+	}
+
+	c.JSON(http.StatusOK, gin.H{
+		"classes": classes,
+		"waiting": waiting,
+		"running": running,
+	})
+}
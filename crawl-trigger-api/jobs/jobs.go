@@ -0,0 +1,150 @@
+package jobs
+
+import (
+	"crawl-trigger-api/database"
+	"crawl-trigger-api/queue"
+	"sync/atomic"
+	"time"
+
+	"github.com/google/uuid"
+)
+
+// Ways a submission can be resolved (see queue.ReserveJob)
+const (
+	KindNew      = "new"
+	KindInflight = "inflight"
+	KindCached   = "cached"
+)
+
+// Request describes a crawl to start
+type Request struct {
+	Platform    string
+	TargetURL   string
+	MaxComments int
+	// Priority is the queue class within the platform (queue.DefaultPriority when empty)
+	Priority string
+	// Force skips attaching to an in-flight or cached crawl of the same post
+	Force bool
+	// Incremental jobs only emit comments newer than the post's watermark.
+	// Their partial results are never shared with other submissions.
+	Incremental bool
+	// Extra fields stored in the job hash and passed to the worker
+	Extra map[string]interface{}
+}
+
+// Creator starts crawl jobs: MySQL row, Redis state hash and stream entry.
+// Used by POST /api/crawl and by the monitor scheduler.
+type Creator struct {
+	queue       *queue.RedisQueue
+	db          *database.MySQLDB
+	inflightTTL time.Duration
+
+	// Submissions since start by kind, and those that failed (GET /metrics)
+	created  int64
+	inflight int64
+	cached   int64
+	failed   int64
+}
+
+// SubmissionStats counts Create calls by how they were resolved
+type SubmissionStats struct {
+	New      int64
+	Inflight int64
+	Cached   int64
+	Failed   int64
+}
+
+func NewCreator(q *queue.RedisQueue, d *database.MySQLDB, inflightTTL time.Duration) *Creator {
+	return &Creator{
+		queue:       q,
+		db:          d,
+		inflightTTL: inflightTTL,
+	}
+}
+
+// Create queues a crawl, or returns the running or recently completed job of
+// the same post when it covers MaxComments. Returns the job ID and its kind.
+func (c *Creator) Create(req Request) (string, string, error) {
+	jobID, kind, err := c.create(req)
+	switch {
+	case err != nil:
+		atomic.AddInt64(&c.failed, 1)
+	case kind == KindInflight:
+		atomic.AddInt64(&c.inflight, 1)
+	case kind == KindCached:
+		atomic.AddInt64(&c.cached, 1)
+	default:
+		atomic.AddInt64(&c.created, 1)
+	}
+	return jobID, kind, err
+}
+
+// Stats returns the submission counters
+func (c *Creator) Stats() SubmissionStats {
+	return SubmissionStats{
+		New:      atomic.LoadInt64(&c.created),
+		Inflight: atomic.LoadInt64(&c.inflight),
+		Cached:   atomic.LoadInt64(&c.cached),
+		Failed:   atomic.LoadInt64(&c.failed),
+	}
+}
+
+func (c *Creator) create(req Request) (string, string, error) {
+	dedupeKey := queue.DedupeKey(req.Platform, req.TargetURL)
+	jobID := uuid.New().String()
+
+	// Attach to a running or recently completed crawl of the same post when
+	// it covers max_comments; otherwise this job takes the in-flight slot
+	if !req.Incremental {
+		var kind string
+		var err error
+		jobID, kind, err = c.queue.ReserveJob(dedupeKey, jobID, req.MaxComments, c.inflightTTL, req.Force)
+		if err != nil {
+			return "", "", err
+		}
+		if kind != KindNew {
+			return jobID, kind, nil
+		}
+	}
+
+	priority := req.Priority
+	if priority == "" {
+		priority = queue.DefaultPriority
+	}
+
+	// Create job data
+	now := time.Now()
+	jobData := map[string]interface{}{
+		"job_id":       jobID,
+		"platform":     req.Platform,
+		"target_url":   req.TargetURL,
+		"max_comments": req.MaxComments,
+		"priority":     priority,
+		"dedupe_key":   dedupeKey,
+		"status":       "queued",
+		"created_at":   now.Format(time.RFC3339),
+		"updated_at":   now.Format(time.RFC3339),
+	}
+	if req.Incremental {
+		jobData["incremental"] = true
+	}
+	for field, value := range req.Extra {
+		jobData[field] = value
+	}
+
+	// Create job in MySQL database
+	err := c.db.CreateJob(jobID, req.Platform, req.TargetURL, req.MaxComments)
+	if err != nil {
+		c.queue.ReleaseJob(dedupeKey, jobID)
+		return "", "", err
+	}
+
+	// Store job state and publish the job to its class stream (one round trip)
+	err = c.queue.EnqueueJob(jobID, queue.JobStream(req.Platform, priority), jobData)
+	if err != nil {
+		c.queue.ReleaseJob(dedupeKey, jobID)
+		return "", "", err
+	}
+
+	return jobID, KindNew, nil
+}
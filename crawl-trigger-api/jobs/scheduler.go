@@ -0,0 +1,99 @@
+package jobs
+
+import (
+	"context"
+	"crawl-trigger-api/queue"
+	"log"
+	"strconv"
+	"time"
+)
+
+// monitorBatch is how many due monitors one scheduler tick claims at most
+const monitorBatch = 100
+
+// MonitorPriority is the queue priority of monitor runs unless the monitor sets one
+const MonitorPriority = "low"
+
+// MonitorScheduler starts a crawl for every monitor whose run is due
+type MonitorScheduler struct {
+	queue    *queue.RedisQueue
+	creator  *Creator
+	interval time.Duration
+}
+
+func NewMonitorScheduler(q *queue.RedisQueue, creator *Creator, interval time.Duration) *MonitorScheduler {
+	return &MonitorScheduler{
+		queue:    q,
+		creator:  creator,
+		interval: interval,
+	}
+}
+
+// Run polls for due monitors every interval until ctx is cancelled
+func (s *MonitorScheduler) Run(ctx context.Context) {
+	ticker := time.NewTicker(s.interval)
+	defer ticker.Stop()
+
+	for {
+		s.runDue(time.Now())
+
+		select {
+		case <-ctx.Done():
+			return
+		case <-ticker.C:
+		}
+	}
+}
+
+// runDue claims due monitors (already rescheduled by the claim) and queues
+// an incremental crawl for each
+func (s *MonitorScheduler) runDue(now time.Time) {
+	for {
+		ids, err := s.queue.ClaimDueMonitors(now, monitorBatch)
+		if err != nil {
+			log.Printf("⚠️ Monitor scheduler: %v", err)
+			return
+		}
+
+		for _, id := range ids {
+			s.start(id, now)
+		}
+
+		if len(ids) < monitorBatch {
+			return
+		}
+	}
+}
+
+func (s *MonitorScheduler) start(monitorID string, now time.Time) {
+	monitor, _, err := s.queue.GetMonitor(monitorID)
+	if err != nil {
+		log.Printf("⚠️ Monitor %s: %v", monitorID, err)
+		return
+	}
+
+	maxComments, _ := strconv.Atoi(monitor["max_comments"])
+	priority := monitor["priority"]
+	if priority == "" {
+		priority = MonitorPriority
+	}
+	jobID, _, err := s.creator.Create(Request{
+		Platform:    monitor["platform"],
+		TargetURL:   monitor["target_url"],
+		MaxComments: maxComments,
+		Priority:    priority,
+		Incremental: true,
+		Extra: map[string]interface{}{
+			"monitor_id": monitorID,
+		},
+	})
+	if err != nil {
+		log.Printf("⚠️ Monitor %s: failed to start run: %v", monitorID, err)
+		return
+	}
+
+	if err := s.queue.RecordMonitorRun(monitorID, jobID, now); err != nil {
+		log.Printf("⚠️ Monitor %s: %v", monitorID, err)
+	}
+	log.Printf("⏰ Monitor %s started job %s", monitorID, jobID)
+}
@@ -1,12 +1,16 @@
 package main
 
 import (
+	"context"
 	"crawl-trigger-api/database"
 	"crawl-trigger-api/handlers"
+	"crawl-trigger-api/jobs"
 	"crawl-trigger-api/queue"
 	"fmt"
 	"log"
 	"os"
+	"strconv"
+	"time"
 
 	"github.com/gin-gonic/gin"
 	"github.com/joho/godotenv"
@@ -25,6 +29,11 @@ func main() {
 	redisPassword := getEnv("REDIS_PASSWORD", "")
 	apiPort := getEnv("CRAWL_API_PORT", "8080")
 
+	// How long a queued/running job absorbs duplicate submissions
+	inflightTTL := time.Duration(getEnvInt("CRAWL_INFLIGHT_TTL", 1800)) * time.Second
+	// How often the scheduler looks for monitors whose run is due
+	monitorPoll := time.Duration(getEnvInt("MONITOR_POLL_INTERVAL", 15)) * time.Second
+
 	// MySQL configuration
 	dbHost := getEnv("DB_HOST", "localhost")
 	dbPort := getEnv("DB_PORT", "3306")
@@ -51,7 +60,16 @@ func main() {
 	log.Println("✅ Connected to Redis successfully")
 
 	// Initialize handlers
-	crawlHandler := handlers.NewCrawlHandler(redisQueue, db)
+	jobCreator := jobs.NewCreator(redisQueue, db, inflightTTL)
+	crawlHandler := handlers.NewCrawlHandler(redisQueue, jobCreator)
+	monitorHandler := handlers.NewMonitorHandler(redisQueue)
+	queueHandler := handlers.NewQueueHandler(redisQueue)
+	metricsHandler := handlers.NewMetricsHandler(redisQueue, jobCreator)
+
+	// Start recurring monitor runs
+	ctx, cancel := context.WithCancel(context.Background())
+	defer cancel()
+	go jobs.NewMonitorScheduler(redisQueue, jobCreator, monitorPoll).Run(ctx)
 
 	// Setup Gin router
 	router := gin.Default()
@@ -78,11 +96,19 @@ func main() {
 		})
 	})
 
+	// Prometheus metrics: submissions and queue depth/wait per class
+	router.GET("/metrics", metricsHandler.GetMetrics)
+
 	// API routes
 	api := router.Group("/api")
 	{
 		api.POST("/crawl", crawlHandler.CreateCrawlJob)
 		api.GET("/crawl/:job_id/status", crawlHandler.GetJobStatus)
+		api.POST("/monitors", monitorHandler.CreateMonitor)
+		api.GET("/monitors", monitorHandler.ListMonitors)
+		api.GET("/monitors/:monitor_id", monitorHandler.GetMonitor)
+		api.DELETE("/monitors/:monitor_id", monitorHandler.DeleteMonitor)
+		api.GET("/queues", queueHandler.GetQueues)
 	}
 
 	// Start server
@@ -91,7 +117,13 @@ func main() {
 	log.Printf("📋 Endpoints:")
 	log.Printf("   POST   http://localhost%s/api/crawl", addr)
 	log.Printf("   GET    http://localhost%s/api/crawl/:job_id/status", addr)
+	log.Printf("   POST   http://localhost%s/api/monitors", addr)
+	log.Printf("   GET    http://localhost%s/api/monitors", addr)
+	log.Printf("   GET    http://localhost%s/api/monitors/:monitor_id", addr)
+	log.Printf("   DELETE http://localhost%s/api/monitors/:monitor_id", addr)
+	log.Printf("   GET    http://localhost%s/api/queues", addr)
 	log.Printf("   GET    http://localhost%s/health", addr)
+	log.Printf("   GET    http://localhost%s/metrics", addr)
 
 	if err := router.Run(addr); err != nil {
 		log.Fatalf("Failed to start server: %v", err)
@@ -105,3 +137,11 @@ func getEnv(key, defaultValue string) string {
 	}
 	return value
 }
+
+func getEnvInt(key string, defaultValue int) int {
+	value, err := strconv.Atoi(os.Getenv(key))
+	if err != nil {
+		return defaultValue
+	}
+	return value
+}
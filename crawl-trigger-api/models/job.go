@@ -7,6 +7,13 @@ type CrawlRequest struct {
 	Platform    string `json:"platform" binding:"required"`
 	TargetURL   string `json:"target_url" binding:"required"`
 	MaxComments int    `json:"max_comments" binding:"required"`
+	Force       bool   `json:"force"`
+	// Priority picks the queue class: high, normal (default) or low
+	Priority string `json:"priority"`
+	// Trace records a span timeline of the crawl; Profile also captures
+	// cProfile and a Playwright trace. Both always start a crawl of their own.
+	Trace   bool `json:"trace"`
+	Profile bool `json:"profile"`
 }
 
 // CrawlJob represents a job in the queue
@@ -23,16 +30,44 @@ type CrawlJob struct {
 
 // CrawlResponse represents the API response for a new crawl job
 type CrawlResponse struct {
-	JobID  string `json:"job_id"`
-	Status string `json:"status"`
+	JobID        string `json:"job_id"`
+	Status       string `json:"status"`
+	Deduplicated bool   `json:"deduplicated,omitempty"`
 }
 
 // JobStatusResponse represents the API response for job status check
 type JobStatusResponse struct {
-	JobID        string    `json:"job_id"`
-	Platform     string    `json:"platform"`
-	Status       string    `json:"status"`
-	CreatedAt    time.Time `json:"created_at"`
-	UpdatedAt    time.Time `json:"updated_at"`
-	ErrorMessage string    `json:"error_message,omitempty"`
+	JobID        string      `json:"job_id"`
+	Platform     string      `json:"platform"`
+	TargetURL    string      `json:"target_url"`
+	MaxComments  int         `json:"max_comments"`
+	Priority     string      `json:"priority"`
+	Status       string      `json:"status"`
+	Phase        string      `json:"phase,omitempty"`
+	Partial      bool        `json:"partial,omitempty"`
+	Progress     JobProgress `json:"progress"`
+	CreatedAt    time.Time   `json:"created_at"`
+	UpdatedAt    time.Time   `json:"updated_at"`
+	ErrorMessage string      `json:"error_message,omitempty"`
+}
+
+// JobProgress holds the live counters workers add to while a job runs
+type JobProgress struct {
+	CommentsFound int64 `json:"comments_found"`
+	CommentsSent  int64 `json:"comments_sent"`
+	ChunksSent    int64 `json:"chunks_sent"`
+	BytesSent     int64 `json:"bytes_sent"`
+	RateLimitedMs int64 `json:"rate_limited_ms"`
+}
+
+// QueueClassStats reports depth and wait times of one queue class
+type QueueClassStats struct {
+	Platform     string `json:"platform"`
+	Priority     string `json:"priority"`
+	Waiting      int64  `json:"waiting"`
+	Running      int64  `json:"running"`
+	OldestWaitMs int64  `json:"oldest_wait_ms"`
+	Dequeued     int64  `json:"dequeued"`
+	AvgWaitMs    int64  `json:"avg_wait_ms"`
+	LastWaitMs   int64  `json:"last_wait_ms"`
 }
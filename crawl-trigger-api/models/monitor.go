@@ -0,0 +1,29 @@
+package models
+
+import "time"
+
+// MonitorRequest registers a post to be re-crawled on a schedule
+type MonitorRequest struct {
+	Platform        string `json:"platform" binding:"required"`
+	TargetURL       string `json:"target_url" binding:"required"`
+	MaxComments     int    `json:"max_comments" binding:"required"`
+	IntervalSeconds int    `json:"interval_seconds" binding:"required"`
+	// Priority of the runs (default low, so monitors yield to on-demand crawls)
+	Priority string `json:"priority"`
+}
+
+// Monitor represents a recurring crawl. Each run is an incremental job that
+// only emits comments newer than the post's watermark.
+type Monitor struct {
+	MonitorID       string     `json:"monitor_id"`
+	Platform        string     `json:"platform"`
+	TargetURL       string     `json:"target_url"`
+	MaxComments     int        `json:"max_comments"`
+	IntervalSeconds int        `json:"interval_seconds"`
+	Priority        string     `json:"priority"`
+	NextRunAt       time.Time  `json:"next_run_at"`
+	LastRunAt       *time.Time `json:"last_run_at,omitempty"`
+	LastJobID       string     `json:"last_job_id,omitempty"`
+	Runs            int        `json:"runs"`
+	CreatedAt       time.Time  `json:"created_at"`
+}
@@ -0,0 +1,139 @@
+package queue
+
+import (
+	"crypto/sha1"
+	"encoding/hex"
+	"fmt"
+	"net/url"
+	"sort"
+	"strings"
+	"time"
+
+	"github.com/go-redis/redis/v8"
+)
+
+// Query parameters that only track where a link was shared from
+var trackingParams = map[string]bool{
+	"fbclid":         true,
+	"igshid":         true,
+	"igsh":           true,
+	"is_from_webapp": true,
+	"sender_device":  true,
+	"_r":             true,
+	"_t":             true,
+	"lang":           true,
+	"mibextid":       true,
+}
+
+// reserveScript atomically picks the job a request should use:
+// a recent completed job that covers max_comments, a queued/running job that
+// covers it, or a new job that takes over the in-flight slot. Forced requests
+// always take the slot.
+// KEYS: result cache, in-flight slot. ARGV: new job ID, max_comments, slot TTL (s), force
+var reserveScript = redis.NewScript(`
+if ARGV[4] == '1' then
+	redis.call('HSET', KEYS[2], 'job_id', ARGV[1], 'max_comments', ARGV[2])
+	redis.call('EXPIRE', KEYS[2], ARGV[3])
+	return {'new', ARGV[1]}
+end
+local cached = redis.call('HMGET', KEYS[1], 'job_id', 'max_comments')
+if cached[1] and tonumber(cached[2]) >= tonumber(ARGV[2]) then
+	return {'cached', cached[1]}
+end
+local inflight = redis.call('HMGET', KEYS[2], 'job_id', 'max_comments')
+if inflight[1] and tonumber(inflight[2]) >= tonumber(ARGV[2]) then
+	return {'inflight', inflight[1]}
+end
+redis.call('HSET', KEYS[2], 'job_id', ARGV[1], 'max_comments', ARGV[2])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+return {'new', ARGV[1]}
+`)
+
+// releaseScript frees the in-flight slot only if it still belongs to the job
+var releaseScript = redis.NewScript(`
+if redis.call('HGET', KEYS[1], 'job_id') == ARGV[1] then
+	return redis.call('DEL', KEYS[1])
+end
+return 0
+`)
+
+// NormalizeURL reduces a post URL to the form every share of it has in common:
+// lowercase host without www./m., no fragment, no trailing slash, no tracking
+// parameters and the remaining query parameters sorted
+func NormalizeURL(rawURL string) string {
+	u, err := url.Parse(strings.TrimSpace(rawURL))
+	if err != nil || u.Host == "" {
+		return strings.TrimSpace(rawURL)
+	}
+
+	host := strings.ToLower(u.Host)
+	host = strings.TrimPrefix(host, "www.")
+	host = strings.TrimPrefix(host, "m.")
+
+	query := u.Query()
+	keys := make([]string, 0, len(query))
+	for key := range query {
+		if trackingParams[key] || strings.HasPrefix(key, "utm_") {
+			continue
+		}
+		keys = append(keys, key)
+	}
+	sort.Strings(keys)
+
+	params := make([]string, 0, len(keys))
+	for _, key := range keys {
+		params = append(params, url.QueryEscape(key)+"="+url.QueryEscape(query.Get(key)))
+	}
+
+	normalized := host + strings.TrimRight(u.Path, "/")
+	if len(params) > 0 {
+		normalized += "?" + strings.Join(params, "&")
+	}
+	return normalized
+}
+
+// DedupeKey identifies a crawl target across submissions
+func DedupeKey(platform string, targetURL string) string {
+	sum := sha1.Sum([]byte(NormalizeURL(targetURL)))
+	return platform + ":" + hex.EncodeToString(sum[:])
+}
+
+func inflightKey(dedupeKey string) string {
+	return fmt.Sprintf("crawl_inflight:%s", dedupeKey)
+}
+
+func resultKey(dedupeKey string) string {
+	return fmt.Sprintf("crawl_result:%s", dedupeKey)
+}
+
+// ReserveJob returns the job a submission should be attached to and how it was
+// found ("cached", "inflight" or "new"). For "new" the returned ID is newJobID,
+// which now owns the in-flight slot for inflightTTL. force skips the lookups.
+func (q *RedisQueue) ReserveJob(dedupeKey string, newJobID string, maxComments int, inflightTTL time.Duration, force bool) (string, string, error) {
+	forceArg := "0"
+	if force {
+		forceArg = "1"
+	}
+
+	keys := []string{resultKey(dedupeKey), inflightKey(dedupeKey)}
+	result, err := reserveScript.Run(q.ctx, q.client, keys, newJobID, maxComments, int(inflightTTL.Seconds()), forceArg).Slice()
+	if err != nil {
+		return "", "", fmt.Errorf("failed to reserve job: %v", err)
+	}
+	if len(result) != 2 {
+		return "", "", fmt.Errorf("unexpected reserve result: %v", result)
+	}
+
+	kind, _ := result[0].(string)
+	jobID, _ := result[1].(string)
+	return jobID, kind, nil
+}
+
+// ReleaseJob frees the in-flight slot of a job that could not be queued
+func (q *RedisQueue) ReleaseJob(dedupeKey string, jobID string) error {
+	err := releaseScript.Run(q.ctx, q.client, []string{inflightKey(dedupeKey)}, jobID).Err()
+	if err != nil {
+		return fmt.Errorf("failed to release job: %v", err)
+	}
+	return nil
+}
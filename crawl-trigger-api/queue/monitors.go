@@ -0,0 +1,122 @@
+package queue
+
+import (
+	"errors"
+	"fmt"
+	"time"
+
+	"github.com/go-redis/redis/v8"
+)
+
+// MonitorsDue is the sorted set of monitor IDs scored by their next run (unix seconds)
+const MonitorsDue = "monitors_due"
+
+// ErrMonitorNotFound is returned for unknown (or deleted) monitors
+var ErrMonitorNotFound = errors.New("monitor not found")
+
+// claimDueScript pops up to ARGV[2] monitors due at ARGV[1] and reschedules
+// each one interval_seconds ahead in the same step, so API instances running
+// the scheduler side by side never start the same run twice.
+// KEYS: due set. ARGV: now (unix), batch size
+var claimDueScript = redis.NewScript(`
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+local claimed = {}
+for _, id in ipairs(due) do
+	local interval = tonumber(redis.call('HGET', 'monitor:' .. id, 'interval_seconds'))
+	if interval then
+		redis.call('ZADD', KEYS[1], tonumber(ARGV[1]) + interval, id)
+		table.insert(claimed, id)
+	else
+		redis.call('ZREM', KEYS[1], id)
+	end
+end
+return claimed
+`)
+
+// MonitorKey returns the Redis hash holding a monitor's settings and last run
+func MonitorKey(monitorID string) string {
+	return fmt.Sprintf("monitor:%s", monitorID)
+}
+
+// SaveMonitor stores a monitor and schedules its first run at nextRun
+func (q *RedisQueue) SaveMonitor(monitorID string, monitor map[string]interface{}, nextRun time.Time) error {
+	_, err := q.client.TxPipelined(q.ctx, func(pipe redis.Pipeliner) error {
+		pipe.HSet(q.ctx, MonitorKey(monitorID), monitor)
+		pipe.ZAdd(q.ctx, MonitorsDue, &redis.Z{Score: float64(nextRun.Unix()), Member: monitorID})
+		return nil
+	})
+	if err != nil {
+		return fmt.Errorf("failed to save monitor: %v", err)
+	}
+	return nil
+}
+
+// GetMonitor reads a monitor's hash and its next scheduled run
+func (q *RedisQueue) GetMonitor(monitorID string) (map[string]string, time.Time, error) {
+	var fields *redis.StringStringMapCmd
+	var score *redis.FloatCmd
+	_, err := q.client.Pipelined(q.ctx, func(pipe redis.Pipeliner) error {
+		fields = pipe.HGetAll(q.ctx, MonitorKey(monitorID))
+		score = pipe.ZScore(q.ctx, MonitorsDue, monitorID)
+		return nil
+	})
+	if err != nil && err != redis.Nil {
+		return nil, time.Time{}, fmt.Errorf("failed to get monitor: %v", err)
+	}
+
+	monitor := fields.Val()
+	if len(monitor) == 0 {
+		return nil, time.Time{}, ErrMonitorNotFound
+	}
+	return monitor, time.Unix(int64(score.Val()), 0), nil
+}
+
+// ListMonitors returns the IDs of all monitors, soonest run first
+func (q *RedisQueue) ListMonitors() ([]string, error) {
+	ids, err := q.client.ZRange(q.ctx, MonitorsDue, 0, -1).Result()
+	if err != nil {
+		return nil, fmt.Errorf("failed to list monitors: %v", err)
+	}
+	return ids, nil
+}
+
+// DeleteMonitor unschedules a monitor and drops its hash
+func (q *RedisQueue) DeleteMonitor(monitorID string) error {
+	var removed *redis.IntCmd
+	_, err := q.client.TxPipelined(q.ctx, func(pipe redis.Pipeliner) error {
+		pipe.ZRem(q.ctx, MonitorsDue, monitorID)
+		removed = pipe.Del(q.ctx, MonitorKey(monitorID))
+		return nil
+	})
+	if err != nil {
+		return fmt.Errorf("failed to delete monitor: %v", err)
+	}
+	if removed.Val() == 0 {
+		return ErrMonitorNotFound
+	}
+	return nil
+}
+
+// ClaimDueMonitors returns up to limit monitors whose run is due, already
+// rescheduled for their next interval
+func (q *RedisQueue) ClaimDueMonitors(now time.Time, limit int) ([]string, error) {
+	ids, err := claimDueScript.Run(q.ctx, q.client, []string{MonitorsDue}, now.Unix(), limit).StringSlice()
+	if err != nil && err != redis.Nil {
+		return nil, fmt.Errorf("failed to claim due monitors: %v", err)
+	}
+	return ids, nil
+}
+
+// RecordMonitorRun stores the job started for a monitor's latest run
+func (q *RedisQueue) RecordMonitorRun(monitorID string, jobID string, at time.Time) error {
+	key := MonitorKey(monitorID)
+	_, err := q.client.Pipelined(q.ctx, func(pipe redis.Pipeliner) error {
+		pipe.HSet(q.ctx, key, "last_job_id", jobID, "last_run_at", at.Format(time.RFC3339))
+		pipe.HIncrBy(q.ctx, key, "runs", 1)
+		return nil
+	})
+	if err != nil {
+		return fmt.Errorf("failed to record monitor run: %v", err)
+	}
+	return nil
+}
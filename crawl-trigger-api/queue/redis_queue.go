@@ -3,12 +3,43 @@ package queue
 import (
 	"context"
 	"encoding/json"
+	"errors"
 	"fmt"
 	"time"
 
 	"github.com/go-redis/redis/v8"
 )
 
+// Crawl jobs are added to one Redis Stream per queue class (platform and
+// priority). Workers read all of them through one consumer group, serve the
+// classes weighted-fair and ack each job once it is done.
+const (
+	JobStreamPrefix = "crawl_jobs_stream"
+	JobGroup        = "crawler_workers"
+	DefaultPriority = "normal"
+)
+
+// Platforms and Priorities span the queue classes (worker weights follow the same order)
+var (
+	Platforms  = []string{"tiktok", "instagram", "facebook"}
+	Priorities = []string{"high", "normal", "low"}
+)
+
+// JobStream returns the stream jobs of a platform and priority are queued on
+func JobStream(platform, priority string) string {
+	return fmt.Sprintf("%s:%s:%s", JobStreamPrefix, platform, priority)
+}
+
+// ValidPriority reports whether priority names a queue class
+func ValidPriority(priority string) bool {
+	for _, p := range Priorities {
+		if p == priority {
+			return true
+		}
+	}
+	return false
+}
+
 type RedisQueue struct {
 	client *redis.Client
 	ctx    context.Context
@@ -36,75 +67,52 @@ func NewRedisQueue(host string, port string, password string) (*RedisQueue, erro
 	}, nil
 }
 
-// PublishJob publishes a crawl job to the queue
-func (q *RedisQueue) PublishJob(jobData map[string]interface{}) error {
-	jsonData, err := json.Marshal(jobData)
-	if err != nil {
-		return fmt.Errorf("failed to marshal job data: %v", err)
-	}
-
-	err = q.client.LPush(q.ctx, "crawl_jobs", jsonData).Err()
-	if err != nil {
-		return fmt.Errorf("failed to push job to queue: %v", err)
-	}
-
-	return nil
-}
+// ErrJobNotFound is returned when a job has no state hash (unknown or expired)
+var ErrJobNotFound = errors.New("job not found")
 
-// SetJobStatus updates job status in Redis
-func (q *RedisQueue) SetJobStatus(jobID string, status string) error {
-	key := fmt.Sprintf("job_status:%s", jobID)
-	err := q.client.Set(q.ctx, key, status, 24*time.Hour).Err()
-	if err != nil {
-		return fmt.Errorf("failed to set job status: %v", err)
-	}
-	return nil
-}
+// jobTTL is how long a job's state hash is kept
+const jobTTL = 24 * time.Hour
 
-// GetJobStatus retrieves job status from Redis
-func (q *RedisQueue) GetJobStatus(jobID string) (string, error) {
-	key := fmt.Sprintf("job_status:%s", jobID)
-	status, err := q.client.Get(q.ctx, key).Result()
-	if err == redis.Nil {
-		return "not_found", nil
-	} else if err != nil {
-		return "", fmt.Errorf("failed to get job status: %v", err)
-	}
-	return status, nil
+// JobKey returns the Redis hash holding a job's state and live progress
+func JobKey(jobID string) string {
+	return fmt.Sprintf("job:%s", jobID)
 }
 
-// StoreJobData stores complete job information
-func (q *RedisQueue) StoreJobData(jobID string, jobData map[string]interface{}) error {
-	key := fmt.Sprintf("job_data:%s", jobID)
+// EnqueueJob stores the job's state hash and adds the job to its class stream
+// in one pipelined round trip. Workers update the same hash as the job runs.
+func (q *RedisQueue) EnqueueJob(jobID string, stream string, jobData map[string]interface{}) error {
 	jsonData, err := json.Marshal(jobData)
 	if err != nil {
 		return fmt.Errorf("failed to marshal job data: %v", err)
 	}
 
-	err = q.client.Set(q.ctx, key, jsonData, 24*time.Hour).Err()
+	key := JobKey(jobID)
+	_, err = q.client.TxPipelined(q.ctx, func(pipe redis.Pipeliner) error {
+		pipe.HSet(q.ctx, key, jobData)
+		pipe.Expire(q.ctx, key, jobTTL)
+		pipe.XAdd(q.ctx, &redis.XAddArgs{
+			Stream: stream,
+			Values: map[string]interface{}{"job": string(jsonData)},
+		})
+		return nil
+	})
 	if err != nil {
-		return fmt.Errorf("failed to store job data: %v", err)
+		return fmt.Errorf("failed to queue job: %v", err)
 	}
+
 	return nil
 }
 
-// GetJobData retrieves complete job information
-func (q *RedisQueue) GetJobData(jobID string) (map[string]interface{}, error) {
-	key := fmt.Sprintf("job_data:%s", jobID)
-	data, err := q.client.Get(q.ctx, key).Result()
-	if err == redis.Nil {
-		return nil, fmt.Errorf("job not found")
-	} else if err != nil {
-		return nil, fmt.Errorf("failed to get job data: %v", err)
-	}
-
-	var jobData map[string]interface{}
-	err = json.Unmarshal([]byte(data), &jobData)
+// GetJob reads a job's state and progress with a single HGETALL
+func (q *RedisQueue) GetJob(jobID string) (map[string]string, error) {
+	job, err := q.client.HGetAll(q.ctx, JobKey(jobID)).Result()
 	if err != nil {
-		return nil, fmt.Errorf("failed to unmarshal job data: %v", err)
+		return nil, fmt.Errorf("failed to get job: %v", err)
 	}
-
-	return jobData, nil
+	if len(job) == 0 {
+		return nil, ErrJobNotFound
+	}
+	return job, nil
 }
 
 // Close closes the Redis connection
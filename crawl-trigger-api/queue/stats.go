@@ -0,0 +1,123 @@
+package queue
+
+import (
+	"fmt"
+	"strconv"
+	"strings"
+	"time"
+
+	"github.com/go-redis/redis/v8"
+)
+
+// ClassStats describes one queue class (platform and priority)
+type ClassStats struct {
+	Platform string
+	Priority string
+	// Waiting jobs not handed to a worker yet; Running jobs a worker holds
+	Waiting int64
+	Running int64
+	// Age of the oldest waiting job (0 when none is waiting)
+	OldestWait time.Duration
+	// Dequeue counters recorded by workers (see QueueStatsKey)
+	Dequeued  int64
+	WaitTotal time.Duration
+	LastWait  time.Duration
+}
+
+// QueueStatsKey returns the hash workers add dequeue counts and queue wait
+// times to for a class (fields dequeued, wait_ms_total, last_wait_ms)
+func QueueStatsKey(platform, priority string) string {
+	return fmt.Sprintf("queue_stats:%s:%s", platform, priority)
+}
+
+// QueueStats reads depth and wait times of every queue class in two
+// pipelined round trips
+func (q *RedisQueue) QueueStats() ([]ClassStats, error) {
+	type classCmds struct {
+		length *redis.IntCmd
+		groups *redis.XInfoGroupsCmd
+		stats  *redis.StringStringMapCmd
+	}
+
+	var stats []ClassStats
+	var cmds []classCmds
+	_, err := q.client.Pipelined(q.ctx, func(pipe redis.Pipeliner) error {
+		for _, platform := range Platforms {
+			for _, priority := range Priorities {
+				stream := JobStream(platform, priority)
+				stats = append(stats, ClassStats{Platform: platform, Priority: priority})
+				cmds = append(cmds, classCmds{
+					length: pipe.XLen(q.ctx, stream),
+					groups: pipe.XInfoGroups(q.ctx, stream),
+					stats:  pipe.HGetAll(q.ctx, QueueStatsKey(platform, priority)),
+				})
+			}
+		}
+		return nil
+	})
+	// Streams no worker has created yet fail XINFO; they count as empty
+	if err != nil && !strings.Contains(err.Error(), "no such key") {
+		return nil, fmt.Errorf("failed to read queue stats: %v", err)
+	}
+
+	// Acked jobs are deleted, so every entry is either waiting or pending
+	lastDelivered := make(map[int]string)
+	for i, cmd := range cmds {
+		length := cmd.length.Val()
+		groups, _ := cmd.groups.Result()
+		for _, group := range groups {
+			if group.Name == JobGroup {
+				stats[i].Running = group.Pending
+				lastDelivered[i] = group.LastDeliveredID
+			}
+		}
+		stats[i].Waiting = length - stats[i].Running
+		if stats[i].Waiting < 0 {
+			stats[i].Waiting = 0
+		}
+
+		counters := cmd.stats.Val()
+		stats[i].Dequeued, _ = strconv.ParseInt(counters["dequeued"], 10, 64)
+		stats[i].WaitTotal = parseMillis(counters["wait_ms_total"])
+		stats[i].LastWait = parseMillis(counters["last_wait_ms"])
+	}
+
+	// The oldest waiting job is the first entry after the group's last delivery
+	oldest := make(map[int]*redis.XMessageSliceCmd)
+	_, err = q.client.Pipelined(q.ctx, func(pipe redis.Pipeliner) error {
+		for i := range stats {
+			if stats[i].Waiting == 0 {
+				continue
+			}
+			start := "-"
+			if id, ok := lastDelivered[i]; ok {
+				start = "(" + id
+			}
+			oldest[i] = pipe.XRangeN(q.ctx, JobStream(stats[i].Platform, stats[i].Priority), start, "+", 1)
+		}
+		return nil
+	})
+	if err != nil {
+		return nil, fmt.Errorf("failed to read queue stats: %v", err)
+	}
+
+	now := time.Now()
+	for i, cmd := range oldest {
+		messages, _ := cmd.Result()
+		if len(messages) == 0 {
+			continue
+		}
+		added := parseMillis(strings.SplitN(messages[0].ID, "-", 2)[0])
+		if age := now.Sub(time.Unix(0, int64(added))); age > 0 {
+			stats[i].OldestWait = age
+		}
+	}
+
+	return stats, nil
+}
+
+// parseMillis reads a millisecond count (stream IDs and worker counters)
+func parseMillis(value string) time.Duration {
+	ms, _ := strconv.ParseInt(value, 10, 64)
+	return time.Duration(ms) * time.Millisecond
+}
@@ -0,0 +1,263 @@
+import asyncio
+import functools
+import logging
+import os
+import signal
+import sys
+import redis
+import redis.asyncio as aioredis
+from dotenv import load_dotenv
+
+# Load environment variables before the crawler modules read their settings
+load_dotenv('../.env')
+
+from crawlers.instagram_crawler import AsyncInstagramCrawler
+from crawlers.tiktok_crawler import AsyncTikTokCrawler
+from crawlers.facebook_crawler import AsyncFacebookCrawler
+from utils.browser_pool import AsyncBrowserPool
+from utils.deadline import AsyncWatchdog, Deadline
+from utils.fingerprint import COMMENT_FILTER, CommentFilter
+from utils.job_queue import AsyncJobQueue, JobEntry
+from utils.metrics import JOBS_IN_PROGRESS, record_browser_pool, record_job, start_metrics_server
+from utils.job_state import AsyncJobState, JobState
+from utils.rate_limiter import RATE_LIMIT, AsyncRateLimiter
+from utils.selector_cache import SELECTOR_CACHE, AsyncSelectorCache
+from utils.session_store import SessionStore
+from utils.tracing import trace_for_job
+from utils.uploader import ChunkedUpload, UploadError, create_session
+from utils.watermark import AsyncWatermark
+from worker_config import REDIS_HOST, REDIS_PORT, HEADLESS, PROCESSING_API_URL, redis_options
+
+logger = logging.getLogger(__name__)
+
+# Number of crawls one async worker process runs at the same time
+WORKER_CONCURRENCY = int(os.getenv('WORKER_CONCURRENCY', 3))
+
+# One pooled keep-alive connection per concurrent crawl
+processing_session = create_session(pool_size=WORKER_CONCURRENCY)
+
+# Uploads run in threads, so their progress writes and the comment filter use a sync client
+sync_redis_client = redis.Redis(**redis_options())
+
+# Login sessions cached on disk and shared with other worker processes
+session_store = SessionStore()
+
+# Cross-worker filter of comments already delivered to the Processing API
+comment_filter = CommentFilter(sync_redis_client) if COMMENT_FILTER else None
+
+ASYNC_CRAWLERS = {
+    'instagram': AsyncInstagramCrawler,
+    'tiktok': AsyncTikTokCrawler,
+    'facebook': AsyncFacebookCrawler,
+}
+
+async def fail_dead_letter_job(redis_client: aioredis.Redis, job_data: dict):
+    """Mark a job that kept killing its workers as failed (async counterpart of main.fail_dead_letter_job)"""
+    await AsyncJobState(redis_client, job_data.get('job_id')).set_status(
+        'failed', 'Job was abandoned by crashed workers too many times')
+    record_job(job_data.get('platform'), 'failed', 'dead_letter')
+
+async def process_crawl_job(job_data: dict, browser_pool: AsyncBrowserPool, redis_client: aioredis.Redis,
+                            selector_cache: AsyncSelectorCache = None):
+    """Process a single crawl job (async counterpart of main.process_crawl_job)"""
+    job_id = job_data.get('job_id')
+    platform = job_data.get('platform')
+    target_url = job_data.get('target_url')
+    max_comments = job_data.get('max_comments', 100)
+    
+    logger.info(f"Processing job {job_id}: {platform} - {target_url}")
+    
+    # Monitor runs only emit comments newer than the post's watermark
+    watermark = None
+    if job_data.get('incremental') and job_data.get('dedupe_key'):
+        watermark = await AsyncWatermark(redis_client, job_data['dedupe_key']).load()
+    
+    job_state = AsyncJobState(redis_client, job_id)
+    await job_state.set_status('processing', phase='starting')
+    
+    deadline = Deadline()
+    watchdog = None
+    trace = trace_for_job(job_data)
+    outcome, reason = 'failed', 'crawl'
+    JOBS_IN_PROGRESS.inc()
+    
+    try:
+        # Comments are streamed to the Processing API in chunks while the crawl runs.
+        # Uploads run in a thread, so progress and the comment filter use the sync client
+        upload = ChunkedUpload(job_id, processing_session, PROCESSING_API_URL,
+                               job_state=JobState(sync_redis_client, job_id), comment_filter=comment_filter,
+                               deadline=deadline, trace=trace)
+        
+        crawler_class = ASYNC_CRAWLERS.get(platform)
+        if crawler_class is None:
+            raise ValueError(f"Unsupported platform: {platform}")
+        crawler = crawler_class(headless=HEADLESS, browser_pool=browser_pool, session_store=session_store,
+                                comment_sink=upload, job_state=job_state, watermark=watermark,
+                                rate_limiter=AsyncRateLimiter(redis_client) if RATE_LIMIT else None,
+                                deadline=deadline, trace=trace, selector_cache=selector_cache)
+        
+        # Perform crawl
+        logger.info(f"Starting crawl with {crawler.__class__.__name__}")
+        crawl = asyncio.create_task(crawler.crawl(target_url, max_comments))
+        
+        def abort_hung_crawl():
+            # The browser is shared with other crawls: cancel this one and retire the browser
+            crawl.cancel()
+            browser_pool.mark_hung()
+        
+        watchdog = AsyncWatchdog(deadline, abort_hung_crawl).start()
+        try:
+            await crawl
+        except asyncio.CancelledError:
+            if not watchdog.fired:
+                raise
+            logger.warning(f"⏱️ Crawl of job {job_id} cancelled by the watchdog")
+        except Exception as e:
+            # Out of time: keep whatever was extracted before the deadline
+            if not deadline.ran_out():
+                raise
+            logger.warning(f"⏱️ Crawl of job {job_id} cut short: {e}")
+        logger.info(f"🧭 Browser pool stats: {browser_pool.stats()}")
+        if selector_cache:
+            logger.info(f"🎯 Selector cache stats: {selector_cache.stats()}")
+        partial = deadline.exceeded is not None
+        
+        if upload.total == 0:
+            if partial:
+                raise TimeoutError(deadline.message())
+            logger.warning(f"No {'new ' if watermark else ''}comments found for job {job_id}")
+            if watermark:
+                await watermark.save()
+            await job_state.set_status('completed', phase='done')
+            outcome = 'completed'
+            return
+        
+        # Send the last chunk with the complete marker
+        deadline.enter('uploading')
+        if trace:
+            trace.phase('uploading')
+        await job_state.set_phase('uploading')
+        await asyncio.to_thread(upload.finish)
+        # A partial run may have skipped comments, so the watermark stays put (see main.process_crawl_job)
+        if watermark and not partial:
+            await watermark.save()
+        await job_state.set_status('completed', deadline.message() if partial else None, phase='done', partial=partial)
+        outcome = 'partial' if partial else 'completed'
+        logger.info(f"Job {job_id} completed {'with partial results ' if partial else 'successfully '}with {upload.sent} comments in {upload.chunk_index} chunk(s) ({upload.skipped} already stored)")
+        
+    except UploadError as e:
+        logger.error(f"Job {job_id} failed: {e}")
+        await job_state.set_status('failed', 'Failed to send data to Processing API')
+        reason = 'upload'
+    except Exception as e:
+        error_msg = f"Crawl failed: {str(e)}"
+        logger.error(f"Job {job_id} failed: {error_msg}")
+        await job_state.set_status('failed', error_msg)
+        if deadline.exceeded is not None:
+            reason = 'deadline'
+    finally:
+        if watchdog:
+            watchdog.stop()
+        JOBS_IN_PROGRESS.dec()
+        record_job(platform, outcome, reason, deadline.finish())
+        record_browser_pool(browser_pool.stats())
+        if trace:
+            trace.finish(outcome=outcome)
+
+async def _run_job(entry: JobEntry, job_data: dict, job_queue: AsyncJobQueue, browser_pool: AsyncBrowserPool,
+                   redis_client: aioredis.Redis, slots: asyncio.Semaphore, jobs_counter=None,
+                   selector_cache: AsyncSelectorCache = None):
+    """Run one job, ack it and free its concurrency slot afterwards"""
+    try:
+        await process_crawl_job(job_data, browser_pool, redis_client, selector_cache)
+        await job_queue.ack(entry)
+        if jobs_counter is not None:
+            with jobs_counter.get_lock():
+                jobs_counter.value += 1
+    finally:
+        slots.release()
+
+async def main(jobs_counter=None):
+    """
+    Async worker loop - keeps up to WORKER_CONCURRENCY crawls running at once
+    
+    Args:
+        jobs_counter: Optional shared multiprocessing.Value incremented per finished job
+    """
+    logger.info(f"🚀 Async Crawler Worker started (concurrency: {WORKER_CONCURRENCY})")
+    start_metrics_server()
+    logger.info(f"📡 Connected to Redis at {REDIS_HOST}:{REDIS_PORT}")
+    
+    redis_client = aioredis.Redis(**redis_options())
+    
+    # Test Redis connection
+    try:
+        await redis_client.ping()
+        logger.info("✅ Redis connection successful")
+    except Exception as e:
+        logger.error(f"❌ Failed to connect to Redis: {e}")
+        sys.exit(1)
+    
+    logger.info("⏳ Waiting for jobs...")
+    
+    # Jobs stay pending in the consumer group until acked, so a crash never loses one
+    job_queue = AsyncJobQueue(redis_client, on_dead_letter=functools.partial(fail_dead_letter_job, redis_client))
+    await job_queue.ensure_group()
+    heartbeat = asyncio.create_task(job_queue.run_heartbeat())
+    prefetched = []
+    
+    browser_pool = AsyncBrowserPool(headless=HEADLESS)
+    # Selector rankings are learned by every crawl this process runs
+    selector_cache = AsyncSelectorCache(redis_client) if SELECTOR_CACHE else None
+    slots = asyncio.Semaphore(WORKER_CONCURRENCY)
+    running = set()
+    
+    # SIGTERM stops taking new jobs; in-flight crawls are drained below
+    stopping = asyncio.Event()
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stopping.set)
+    
+    try:
+        while not stopping.is_set():
+            # Only take a job off the queue when a slot is free
+            await slots.acquire()
+            if stopping.is_set():
+                slots.release()
+                break
+            try:
+                if not prefetched:
+                    prefetched = await job_queue.fetch(block_ms=5000)
+                if not prefetched:
+                    slots.release()
+                    continue
+                
+                entry, job_data = prefetched.pop(0)
+            except Exception as e:
+                slots.release()
+                logger.error(f"Worker error: {e}")
+                await asyncio.sleep(1)
+                continue
+            
+            logger.info(f"📥 Received new job: {job_data.get('job_id')} ({len(running) + 1}/{WORKER_CONCURRENCY} running)")
+            task = asyncio.create_task(_run_job(entry, job_data, job_queue, browser_pool, redis_client, slots, jobs_counter,
+                                                selector_cache))
+            running.add(task)
+            task.add_done_callback(running.discard)
+    finally:
+        # Prefetched jobs that never started go back to the queue for other workers
+        for entry, job_data in prefetched:
+            try:
+                await job_queue.release(entry, job_data)
+            except Exception as e:
+                logger.warning(f"Failed to release job {job_data.get('job_id')}: {e}")
+        if running:
+            logger.info(f"🛑 Draining {len(running)} in-flight job(s) before exiting")
+            await asyncio.gather(*running, return_exceptions=True)
+        heartbeat.cancel()
+        await browser_pool.close()
+        await redis_client.close()
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        logger.info("Worker stopped by user")
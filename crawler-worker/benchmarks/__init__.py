@@ -0,0 +1 @@
+# Offline benchmarks of the crawler worker
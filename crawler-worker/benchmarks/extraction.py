@@ -0,0 +1,187 @@
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+from urllib.parse import urlparse
+
+import psutil
+
+from crawlers.facebook_crawler import FacebookCrawler
+from crawlers.instagram_crawler import InstagramCrawler
+from crawlers.tiktok_crawler import TikTokCrawler
+from fixtures.bench_pages import BENCH_SIZES, PLATFORMS
+from fixtures.server import FixtureServer
+from utils.browser_pool import BrowserPool, browser_tree_rss_mb
+from utils.tracing import JobTrace
+
+CRAWLERS = {
+    'tiktok': TikTokCrawler,
+    'instagram': InstagramCrawler,
+    'facebook': FacebookCrawler,
+}
+
+# Results of a known-good run; compare against it with --check, write it with --save-baseline
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'extraction_baseline.json')
+
+# Allowed relative slowdown (and growth of IPC calls and memory) before a case counts as a regression
+DEFAULT_THRESHOLD = 0.2
+
+LOCAL_HOSTS = ('127.0.0.1', 'localhost')
+
+def keep_offline(route):
+    """Context route handler: anything not served by the fixture server is aborted"""
+    if urlparse(route.request.url).hostname in LOCAL_HOSTS:
+        route.fallback()
+    else:
+        route.abort()
+
+class RssSampler:
+    """Peak resident memory of this process plus the Playwright driver and Chromium, sampled on a thread"""
+    
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def sample(self):
+        own = psutil.Process().memory_info().rss / (1024 * 1024)
+        self.peak_mb = max(self.peak_mb, own + browser_tree_rss_mb())
+    
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='rss-sampler', daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.sample()
+    
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+def extract_once(pool: BrowserPool, url: str, platform: str, size: int, trace: JobTrace = None):
+    """
+    Load a benchmark page and run the crawler's extraction step on it
+    
+    Returns:
+        tuple: (seconds spent extracting, Playwright calls made while extracting)
+    """
+    crawler = CRAWLERS[platform](headless=True, browser_pool=pool, trace=trace)
+    crawler.initialize_browser()
+    try:
+        crawler.context.route('**/*', keep_offline)
+        crawler.page.goto(url, wait_until='load', timeout=120000)
+        spans_before = len(trace.spans) if trace else 0
+        started = time.perf_counter()
+        comments = crawler.extract_rendered_comments(url, size)
+        elapsed = time.perf_counter() - started
+    finally:
+        crawler.close_browser()
+    
+    if len(comments) != size:
+        raise RuntimeError(f"{platform}: extracted {len(comments)} of {size} comments")
+    # Playwright call spans are named <Class>.<method>; selector/batch/phase spans are not
+    calls = sum(1 for span in trace.spans[spans_before:] if '.' in span.name) if trace else 0
+    return elapsed, calls
+
+def run_case(pool: BrowserPool, server: FixtureServer, platform: str, size: int, repeats: int) -> dict:
+    """Benchmark one platform and page size: a traced warm-up run counts IPC calls, then repeats timed runs"""
+    url = f"{server.url}/bench/{platform}/{size}"
+    sampler = RssSampler().start()
+    try:
+        _, calls = extract_once(pool, url, platform, size, JobTrace(f"bench-{platform}-{size}", platform))
+        timings = [extract_once(pool, url, platform, size)[0] for _ in range(repeats)]
+    finally:
+        sampler.stop()
+    
+    seconds = statistics.median(timings)
+    return {
+        'platform': platform,
+        'comments': size,
+        'seconds': round(seconds, 4),
+        'comments_per_sec': round(size / seconds, 1),
+        'ipc_calls': calls,
+        'ipc_per_comment': round(calls / size, 4),
+        'peak_rss_mb': round(sampler.peak_mb, 1),
+    }
+
+def find_regressions(results: list, baseline: list, threshold: float) -> list:
+    """Cases slower, chattier or bigger than the baseline by more than threshold"""
+    previous = {(case['platform'], case['comments']): case for case in baseline}
+    regressions = []
+    for case in results:
+        base = previous.get((case['platform'], case['comments']))
+        if not base:
+            continue
+        name = f"{case['platform']}/{case['comments']}"
+        if case['comments_per_sec'] < base['comments_per_sec'] * (1 - threshold):
+            regressions.append(f"{name}: {case['comments_per_sec']} comments/sec (baseline {base['comments_per_sec']})")
+        if case['ipc_calls'] > base['ipc_calls'] * (1 + threshold):
+            regressions.append(f"{name}: {case['ipc_calls']} Playwright calls (baseline {base['ipc_calls']})")
+        if case['peak_rss_mb'] > base['peak_rss_mb'] * (1 + threshold):
+            regressions.append(f"{name}: peak RSS {case['peak_rss_mb']} MB (baseline {base['peak_rss_mb']} MB)")
+    return regressions
+
+def print_table(results: list):
+    print(f"{'platform':<10} {'comments':>8} {'seconds':>9} {'comments/s':>11} {'IPC calls':>10} {'IPC/comment':>12} {'peak RSS MB':>12}")
+    for case in results:
+        print(f"{case['platform']:<10} {case['comments']:>8} {case['seconds']:>9.3f} {case['comments_per_sec']:>11.1f} "
+              f"{case['ipc_calls']:>10} {case['ipc_per_comment']:>12.4f} {case['peak_rss_mb']:>12.1f}")
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark comment extraction against generated pages, offline')
+    parser.add_argument('--platforms', nargs='+', choices=PLATFORMS, default=list(PLATFORMS))
+    parser.add_argument('--sizes', nargs='+', type=int, default=list(BENCH_SIZES), help='comments per page')
+    parser.add_argument('--repeats', type=int, default=3, help='timed runs per case (the median is reported)')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='allowed relative regression against the baseline (default 0.2)')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--check', action='store_true', help='exit with status 1 on a regression against the baseline')
+    parser.add_argument('--save-baseline', action='store_true', help='write these results as the new baseline')
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args(argv)
+    
+    # Crawlers log every comment at INFO; keep the console (and its cost) out of the timings
+    logging.getLogger().setLevel(logging.WARNING)
+    
+    results = []
+    pool = BrowserPool(headless=True)
+    try:
+        with FixtureServer() as server:
+            for platform in args.platforms:
+                for size in args.sizes:
+                    results.append(run_case(pool, server, platform, size, args.repeats))
+    finally:
+        pool.close()
+    
+    print_table(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    
+    if args.check:
+        if not os.path.exists(args.baseline):
+            print(f"No baseline at {args.baseline} - run with --save-baseline on a known-good tree first")
+            return 1
+        with open(args.baseline) as f:
+            regressions = find_regressions(results, json.load(f), args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+        print(f"No regression beyond {args.threshold:.0%} of the baseline")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
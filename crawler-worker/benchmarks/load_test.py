@@ -0,0 +1,382 @@
+import argparse
+import json
+import logging
+import os
+import random
+import signal
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from functools import partial
+
+import redis
+import requests
+from dotenv import load_dotenv
+
+from fixtures.bench_pages import PLATFORMS
+from fixtures.processing_stub import ProcessingStub
+from fixtures.server import FixtureServer
+from utils.job_queue import DEFAULT_PRIORITY, PRIORITIES, job_stream
+from utils.job_state import JOB_STATE_TTL, TERMINAL_STATUSES, job_key
+
+load_dotenv('../.env')
+
+REDIS_HOST = os.getenv('REDIS_HOST', 'localhost')
+REDIS_PORT = int(os.getenv('REDIS_PORT', 6379))
+REDIS_PASSWORD = os.getenv('REDIS_PASSWORD', '')
+
+WORKER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Worker settings for a load test: no rate limiting between jobs, no network
+# capture wait on TikTok and no comment filter (every job re-sends the same
+# generated comments, which the filter would drop after the first upload)
+WORKER_ENV = {
+    'HEADLESS': 'true',
+    'RATE_LIMIT': 'false',
+    'TIKTOK_CAPTURE_MODE': 'dom',
+    'COMMENT_FILTER': 'false',
+    'METRICS_PORT': '0',
+}
+
+# Step counts as saturated when workers finish fewer jobs than this share of the offered rate
+SATURATION_THROUGHPUT = 0.9
+
+PERCENTILES = (50, 90, 99)
+
+def parse_mix(value: str, choices) -> dict:
+    """'tiktok=0.6,instagram=0.4' -> normalised weights (a bare name weighs 1)"""
+    weights = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in choices:
+            raise argparse.ArgumentTypeError(f"{name!r} is not one of {', '.join(choices)}")
+        weights[name] = float(weight or 1)
+    total = sum(weights.values())
+    if total <= 0:
+        raise argparse.ArgumentTypeError(f"weights of {value!r} add up to zero")
+    return {name: weight / total for name, weight in weights.items()}
+
+def arrivals(rates: list, step_seconds: float, rng: random.Random):
+    """
+    Poisson arrival offsets for consecutive steps of the given rates
+    
+    Args:
+        rates: Jobs per minute of each step
+        step_seconds: Length of every step
+        rng: Seeded random source
+    
+    Returns:
+        list: (seconds from start, step index) per job
+    """
+    jobs = []
+    for step, rate in enumerate(rates):
+        at = step * step_seconds
+        end = at + step_seconds
+        while rate > 0:
+            at += rng.expovariate(rate / 60)
+            if at >= end:
+                break
+            jobs.append((at, step))
+    return jobs
+
+def pick(weights: dict, rng: random.Random) -> str:
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+def _now() -> str:
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+def enqueue_direct(client, platform: str, target_url: str, max_comments: int, priority: str) -> str:
+    """Queue a job the way the Crawl Trigger API does (job hash + class stream entry), without MySQL"""
+    job_id = str(uuid.uuid4())
+    job = {
+        'job_id': job_id,
+        'platform': platform,
+        'target_url': target_url,
+        'max_comments': max_comments,
+        'priority': priority,
+        'status': 'queued',
+        'created_at': _now(),
+        'updated_at': _now(),
+    }
+    pipe = client.pipeline(transaction=True)
+    pipe.hset(job_key(job_id), mapping=job)
+    pipe.expire(job_key(job_id), JOB_STATE_TTL)
+    pipe.xadd(job_stream(platform, priority), {'job': json.dumps(job)})
+    pipe.execute()
+    return job_id
+
+def enqueue_api(session: requests.Session, api_url: str, platform: str, target_url: str, max_comments: int,
+                priority: str) -> str:
+    """Submit a job to the Crawl Trigger API (force: every submission is its own crawl)"""
+    response = session.post(f"{api_url.rstrip('/')}/api/crawl", json={
+        'platform': platform,
+        'target_url': target_url,
+        'max_comments': max_comments,
+        'priority': priority,
+        'force': True,
+    }, timeout=10)
+    if response.status_code not in (200, 201):
+        raise RuntimeError(f"Crawl Trigger API error: {response.status_code} - {response.text}")
+    return response.json()['job_id']
+
+class WorkerFleet:
+    """Worker supervisor started for the run and drained (SIGTERM) at the end"""
+    
+    def __init__(self, workers: int, mode: str, processing_api_url: str):
+        self.workers = workers
+        self.mode = mode
+        self.processing_api_url = processing_api_url
+        self.process = None
+    
+    def start(self):
+        env = {**os.environ, **WORKER_ENV, 'PROCESSING_API_URL': self.processing_api_url}
+        self.process = subprocess.Popen(
+            [sys.executable, 'supervisor.py', '--workers', str(self.workers), '--mode', self.mode],
+            cwd=WORKER_DIR, env=env,
+        )
+        return self
+    
+    def stop(self, timeout: int = 120):
+        if self.process is None or self.process.poll() is not None:
+            return
+        self.process.send_signal(signal.SIGTERM)
+        try:
+            self.process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+class LoadTest:
+    """
+    Offers jobs at the configured rates, follows every job through its Redis
+    hash and times it:
+    
+        queue wait  submitted -> a worker set it to processing
+        crawl       processing -> uploading phase (or done, for an empty crawl)
+        upload      uploading -> final chunk accepted (stub) or completed status
+        end to end  submitted -> finished
+    
+    Job hashes are polled, so times are accurate to about the poll interval.
+    """
+    
+    def __init__(self, client, submit, target_url, args, stub: ProcessingStub = None):
+        self.client = client
+        self.submit = submit
+        self.target_url = target_url
+        self.args = args
+        self.stub = stub
+        self.rng = random.Random(args.seed)
+        self.jobs = {}
+        self.submit_errors = 0
+    
+    def run(self):
+        schedule = arrivals(self.args.rates, self.args.step_duration, self.rng)
+        started = time.time()
+        end = started + len(self.args.rates) * self.args.step_duration
+        print(f"Offering {len(schedule)} jobs over {len(self.args.rates)} step(s) of {self.args.step_duration:g}s "
+              f"at {', '.join(f'{rate:g}' for rate in self.args.rates)} jobs/min")
+        
+        next_poll = 0
+        while schedule or self._pending():
+            now = time.time()
+            while schedule and started + schedule[0][0] <= now:
+                _, step = schedule.pop(0)
+                self._submit(step)
+            if now >= next_poll:
+                self._poll()
+                next_poll = now + self.args.poll_interval
+            if not schedule and now > end + self.args.drain_timeout:
+                print(f"Drain timeout: {len(self._pending())} job(s) unfinished")
+                break
+            wake = min(started + schedule[0][0], next_poll) if schedule else next_poll
+            time.sleep(max(0.0, wake - time.time()))
+        self._poll()
+        return started
+    
+    def _submit(self, step: int):
+        platform = pick(self.args.mix, self.rng)
+        priority = pick(self.args.priorities, self.rng)
+        size = self.rng.choice(self.args.sizes)
+        url = f"{self.target_url}/bench/{platform}/{size}?load={len(self.jobs)}"
+        try:
+            job_id = self.submit(platform, url, size, priority)
+        except (redis.RedisError, requests.RequestException, RuntimeError) as e:
+            logging.getLogger(__name__).warning(f"Submit failed: {e}")
+            self.submit_errors += 1
+            return
+        self.jobs[job_id] = {
+            'job_id': job_id, 'step': step, 'platform': platform, 'priority': priority, 'comments': size,
+            'submitted_at': time.time(), 'started_at': None, 'crawled_at': None, 'finished_at': None, 'status': 'queued',
+        }
+    
+    def _pending(self) -> list:
+        return [job for job in self.jobs.values() if job['finished_at'] is None]
+    
+    def _poll(self):
+        """One pipelined HMGET over every unfinished job"""
+        pending = self._pending()
+        if not pending:
+            return
+        pipe = self.client.pipeline(transaction=False)
+        for job in pending:
+            pipe.hmget(job_key(job['job_id']), 'status', 'phase', 'partial')
+        now = time.time()
+        for job, (status, phase, partial) in zip(pending, pipe.execute()):
+            if not status or status == 'queued':
+                continue
+            job['started_at'] = job['started_at'] or now
+            if phase == 'uploading' or status in TERMINAL_STATUSES:
+                job['crawled_at'] = job['crawled_at'] or now
+            if status in TERMINAL_STATUSES:
+                job['status'] = 'partial' if partial == '1' else status
+                job['finished_at'] = self._final_chunk_at(job) or now
+    
+    def _final_chunk_at(self, job: dict):
+        """When the stub accepted the final chunk - exact, unlike the polled status"""
+        upload = self.stub.upload(job['job_id']) if self.stub else None
+        if not upload or not upload['completed_at']:
+            return None
+        return max(upload['completed_at'], job['crawled_at'])
+
+def durations(job: dict) -> dict:
+    """Seconds per stage of a finished job (stages it skipped are absent)"""
+    if job['finished_at'] is None or job['started_at'] is None:
+        return {}
+    return {
+        'queue_wait': job['started_at'] - job['submitted_at'],
+        'crawl': job['crawled_at'] - job['started_at'],
+        'upload': job['finished_at'] - job['crawled_at'],
+        'end_to_end': job['finished_at'] - job['submitted_at'],
+    }
+
+def percentiles(values: list) -> dict:
+    if not values:
+        return {f"p{p}": None for p in PERCENTILES}
+    if len(values) == 1:
+        return {f"p{p}": round(values[0], 3) for p in PERCENTILES}
+    cuts = statistics.quantiles(values, n=100, method='inclusive')
+    return {f"p{p}": round(cuts[p - 1], 3) for p in PERCENTILES}
+
+def summarize(jobs: list, started: float, rates: list, step_seconds: float, max_queue_wait: float) -> list:
+    """
+    Per-step report: offered vs finished rate, outcomes and stage percentiles
+    
+    A step is saturated when workers finish less than SATURATION_THROUGHPUT of
+    the offered rate during it, or its p90 queue wait passes max_queue_wait.
+    """
+    steps = []
+    for step, rate in enumerate(rates):
+        window = (started + step * step_seconds, started + (step + 1) * step_seconds)
+        submitted = [job for job in jobs if job['step'] == step]
+        finished_in_window = sum(1 for job in jobs if job['finished_at'] and window[0] <= job['finished_at'] < window[1])
+        stages = [durations(job) for job in submitted]
+        outcomes = {}
+        for job in submitted:
+            outcomes[job['status']] = outcomes.get(job['status'], 0) + 1
+        
+        report = {
+            'step': step,
+            'offered_per_min': rate,
+            'submitted': len(submitted),
+            'finished_per_min': round(finished_in_window / step_seconds * 60, 2),
+            'outcomes': outcomes,
+        }
+        for stage in ('queue_wait', 'crawl', 'upload', 'end_to_end'):
+            report[stage] = percentiles([s[stage] for s in stages if stage in s])
+        wait_p90 = report['queue_wait']['p90']
+        report['saturated'] = bool(submitted) and (
+            report['finished_per_min'] < rate * SATURATION_THROUGHPUT
+            or (wait_p90 is not None and wait_p90 > max_queue_wait)
+            or outcomes.get('queued', 0) + outcomes.get('processing', 0) > 0
+        )
+        steps.append(report)
+    return steps
+
+def print_report(steps: list, poll_interval: float):
+    print(f"\n{'step':>4} {'offered/min':>11} {'done/min':>9} {'jobs':>5}  {'stage':<11} "
+          + ' '.join(f"{f'p{p} s':>8}" for p in PERCENTILES) + '  outcomes')
+    for report in steps:
+        outcomes = ', '.join(f"{name} {count}" for name, count in sorted(report['outcomes'].items()))
+        for i, stage in enumerate(('queue_wait', 'crawl', 'upload', 'end_to_end')):
+            lead = (f"{report['step']:>4} {report['offered_per_min']:>11g} {report['finished_per_min']:>9g} "
+                    f"{report['submitted']:>5}") if i == 0 else ' ' * 32
+            values = ' '.join(f"{value:>8.2f}" if value is not None else f"{'-':>8}"
+                              for value in report[stage].values())
+            print(f"{lead}  {stage:<11} {values}" + (f"  {outcomes}" if i == 0 else ''))
+    
+    saturated = next((report for report in steps if report['saturated']), None)
+    if saturated:
+        print(f"\nSaturated at {saturated['offered_per_min']:g} jobs/min (step {saturated['step']})")
+    else:
+        print("\nNo step saturated the workers")
+    print(f"Stage times are accurate to about {poll_interval:g}s (job hash poll interval)")
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description='Drive crawler workers with a synthetic job stream against generated pages and report latencies')
+    parser.add_argument('--rates', nargs='+', type=float, default=[6.0],
+                        help='offered jobs per minute; several values run as consecutive steps (saturation ramp)')
+    parser.add_argument('--step-duration', type=float, default=120, help='seconds per rate step')
+    parser.add_argument('--mix', type=lambda v: parse_mix(v, PLATFORMS), default=parse_mix('tiktok,instagram,facebook', PLATFORMS),
+                        help='platform weights, e.g. tiktok=0.6,instagram=0.3,facebook=0.1')
+    parser.add_argument('--priorities', type=lambda v: parse_mix(v, PRIORITIES), default={DEFAULT_PRIORITY: 1.0},
+                        help='priority weights, e.g. high=0.2,normal=0.8')
+    parser.add_argument('--sizes', nargs='+', type=int, default=[100], help='comments per generated page (picked uniformly)')
+    parser.add_argument('--seed', type=int, default=1, help='seed of the arrival times and job mix')
+    parser.add_argument('--workers', type=int, default=2,
+                        help='worker processes to start for the run (0 = use workers that are already running)')
+    parser.add_argument('--mode', choices=['sync', 'async'], default='sync')
+    parser.add_argument('--startup-wait', type=float, default=10, help='seconds between starting the workers and the first job')
+    parser.add_argument('--api', help='submit through this Crawl Trigger API (e.g. http://localhost:8080) instead of straight to Redis')
+    parser.add_argument('--processing-api',
+                        help='upload to this Processing API (e.g. http://localhost:8081/api/process) instead of the local stub')
+    parser.add_argument('--stub-latency-ms', type=int, default=0, help='added to every stub response, to mimic database writes')
+    parser.add_argument('--poll-interval', type=float, default=0.25, help='seconds between job hash polls')
+    parser.add_argument('--drain-timeout', type=float, default=600, help='seconds to wait for jobs after the last step')
+    parser.add_argument('--max-queue-wait', type=float, default=60,
+                        help='p90 queue wait (seconds) beyond which a step counts as saturated')
+    parser.add_argument('--json', help='also write the per-step report and per-job timings to this file')
+    args = parser.parse_args(argv)
+    
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    
+    client = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, password=REDIS_PASSWORD or None, decode_responses=True)
+    client.ping()
+    
+    if args.api:
+        submit = partial(enqueue_api, requests.Session(), args.api)
+    else:
+        submit = partial(enqueue_direct, client)
+    
+    stub = None if args.processing_api else ProcessingStub(latency_ms=args.stub_latency_ms).start()
+    fleet = None
+    try:
+        with FixtureServer() as pages:
+            if args.workers:
+                fleet = WorkerFleet(args.workers, args.mode, args.processing_api or stub.url).start()
+                # Let the workers connect and launch their browsers before the clock starts
+                time.sleep(args.startup_wait)
+            test = LoadTest(client, submit, pages.url, args, stub)
+            started = test.run()
+    finally:
+        if fleet:
+            fleet.stop()
+        if stub:
+            stub.stop()
+    
+    jobs = list(test.jobs.values())
+    steps = summarize(jobs, started, args.rates, args.step_duration, args.max_queue_wait)
+    print_report(steps, args.poll_interval)
+    if test.submit_errors:
+        print(f"{test.submit_errors} submission(s) failed")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'steps': steps, 'jobs': [{**job, **durations(job)} for job in jobs]}, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,57 +1,345 @@
+import asyncio
+import os
+import uuid
 from abc import ABC, abstractmethod
+from contextlib import nullcontext
+from playwright.async_api import async_playwright
 from playwright.sync_api import sync_playwright, Browser, Page
-from utils.anti_ban import get_stealth_config, setup_stealth_page, random_delay
+from crawlers.harvester import CommentHarvester, HARVEST_STALL_STEPS, HARVEST_STEP_TIMEOUT_MS
+from utils.anti_ban import (
+    get_stealth_config, setup_stealth_page, wait_for_network_idle,
+    async_setup_stealth_page, async_wait_for_network_idle
+)
+from utils.browser_pool import BROWSER_LAUNCH_ARGS, CONTEXT_CLOSE_TIMEOUT
+from utils.metrics import record_comments, record_rate_limited, record_selector
+from utils.resource_blocker import BLOCK_RESOURCES, ResourceBlocker
+from utils.session_store import has_valid_auth_cookie
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class BaseCrawler(ABC):
-    """Abstract base class for all platform-specific crawlers"""
+# Screenshots and page dumps of failed crawls, one file per job
+DEBUG_DIR = os.getenv('DEBUG_DIR', 'debug')
+
+# Runs in the page: reads every field of every comment node in one round trip.
+# Each field is a list of specs tried in order until one yields non-empty text:
+#   selector - CSS selector relative to the node (':scope' = the node itself)
+#   attr     - attribute to read instead of innerText
+#   parent   - resolve the selector from the node's parent element
+# Returns the rows and, per field, how many nodes each spec answered (for the selector cache).
+BATCH_EXTRACT_SCRIPT = """
+({ itemSelector, fields, limit, offset }) => {
+    const read = (node, spec) => {
+        const scope = spec.parent ? node.parentElement : node;
+        if (!scope) return null;
+        const el = spec.selector === ':scope' ? scope : scope.querySelector(spec.selector);
+        if (!el) return null;
+        const value = spec.attr ? el.getAttribute(spec.attr) : el.innerText;
+        return value ? value.trim() : null;
+    };
+    const nodes = Array.from(document.querySelectorAll(itemSelector)).slice(offset || 0, (offset || 0) + limit);
+    const hits = {};
+    for (const [name, specs] of Object.entries(fields)) hits[name] = specs.map(() => 0);
+    const rows = nodes.map((node) => {
+        const row = {};
+        for (const [name, specs] of Object.entries(fields)) {
+            row[name] = null;
+            for (const [i, spec] of specs.entries()) {
+                let value = null;
+                try { value = read(node, spec); } catch (e) { value = null; }
+                if (value) { row[name] = value; hits[name][i] += 1; break; }
+            }
+        }
+        return row;
+    });
+    return { rows, hits };
+}
+"""
+
+def field_specs(selectors, attr: str = None, parent: bool = False) -> list:
+    """Build a BATCH_EXTRACT_SCRIPT field table entry from a list of selectors"""
+    specs = []
+    for selector in selectors:
+        spec = {'selector': selector}
+        if attr:
+            spec['attr'] = attr
+        if parent:
+            spec['parent'] = True
+        specs.append(spec)
+    return specs
+
+class CrawlerState:
+    """Configuration and session bookkeeping shared by sync and async crawlers"""
+    
+    # Platform name and the cookies that prove a logged-in session (set by platform crawlers)
+    platform = None
+    auth_cookie_names = ()
     
-    def __init__(self, headless: bool = True):
+    def __init__(self, headless: bool = True, browser_pool=None, session_store=None, comment_sink=None,
+                 job_state=None, watermark=None, rate_limiter=None, deadline=None, trace=None,
+                 selector_cache=None):
         self.headless = headless
+        self.browser_pool = browser_pool
+        self.session_store = session_store
+        self.comment_sink = comment_sink  # e.g. utils.uploader.ChunkedUpload
+        self.job_state = job_state  # utils.job_state.JobState / AsyncJobState for live progress
+        self.watermark = watermark  # utils.watermark.Watermark for incremental (monitor) crawls
+        self.rate_limiter = rate_limiter  # utils.rate_limiter.RateLimiter shared by all workers
+        self.rate_limited = 0.0  # Seconds this job waited for rate-limit tokens
+        self.deadline = deadline  # utils.deadline.Deadline with the job's per-phase budgets
+        self.trace = trace  # utils.tracing.JobTrace when the job is traced
+        self.selector_cache = selector_cache  # utils.selector_cache.SelectorCache shared by every job of the worker
+        self.emitted = 0
+        self.account = None  # Login account whose session is cached
+        self.session_restored = False
         self.playwright = None
         self.browser = None
+        self.context = None
         self.page = None
+        self.resource_blocker = None  # Set per job when BLOCK_RESOURCES is on
+    
+    def _context_options(self) -> dict:
+        """Stealth context settings, starting from the cached login session when available"""
+        stealth_config = get_stealth_config()
+        context_options = {
+            'user_agent': stealth_config['user_agent'],
+            'viewport': stealth_config['viewport'],
+            'locale': stealth_config['locale'],
+            'timezone_id': stealth_config['timezone_id']
+        }
+        
+        storage_state = self._load_session_state()
+        if storage_state:
+            context_options['storage_state'] = storage_state
+        self.session_restored = storage_state is not None
+        
+        return context_options
+    
+    def _load_session_state(self):
+        """Cached storage_state for this crawler's account, or None"""
+        if not self.session_store or not self.account:
+            return None
+        return self.session_store.load(self.platform, self.account, self.auth_cookie_names)
+    
+    def _store_session_state(self, state: dict) -> bool:
+        """Hand a context's storage_state to the session store"""
+        if not self.session_store or not self.account:
+            return False
+        return self.session_store.save(self.platform, self.account, state, self.auth_cookie_names)
+    
+    def invalidate_session(self):
+        """Drop the cached session (e.g. when the platform logged us out)"""
+        self.session_restored = False
+        if self.session_store and self.account:
+            self.session_store.invalidate(self.platform, self.account)
+    
+    def _new_resource_blocker(self):
+        """Fresh blocker for this job's context, or None when blocking is disabled"""
+        self.resource_blocker = ResourceBlocker(self.platform) if BLOCK_RESOURCES else None
+        return self.resource_blocker
+    
+    def _log_resource_stats(self):
+        """Report what the resource blocker saved and the rate limiter cost during this job"""
+        if self.resource_blocker:
+            logger.info(f"🚫 Resource blocker stats: {self.resource_blocker.stats()}")
+        if self.rate_limited:
+            logger.info(f"⏳ Waited {self.rate_limited:.1f}s for {self.platform} rate limits")
+    
+    def _watermark_reached(self) -> bool:
+        """True once an incremental crawl has come across already delivered comments"""
+        return bool(self.watermark and self.watermark.reached)
+    
+    def out_of_time(self) -> bool:
+        """True once the current phase's budget is spent - load-more loops stop and extract what rendered"""
+        return bool(self.deadline and self.deadline.expired())
+    
+    def _max_wait(self) -> float:
+        """Longest rate-limit wait that fits in the phase budget (None without a deadline)"""
+        return self.deadline.remaining() if self.deadline else None
+    
+    def time_left_ms(self, timeout_ms: int) -> int:
+        """Playwright timeout capped to what is left of the phase budget"""
+        return self.deadline.timeout_ms(timeout_ms) if self.deadline else timeout_ms
+    
+    def debug_path(self, name: str) -> str:
+        """Path for a debug dump of this crawl (named after the job, so concurrent crawls never share one)"""
+        os.makedirs(DEBUG_DIR, exist_ok=True)
+        job_id = self.job_state.job_id if self.job_state else uuid.uuid4().hex[:12]
+        return os.path.join(DEBUG_DIR, f"{self.platform}-{job_id}-{name}")
+    
+    def _harvest_done(self, harvester: CommentHarvester, stalls: int) -> bool:
+        """Whether a harvesting load-more loop should stop"""
+        return (harvester.total >= harvester.limit or stalls >= HARVEST_STALL_STEPS
+                or self._watermark_reached() or self.out_of_time())
+    
+    def _harvested_comments(self, harvester: CommentHarvester, rows: list, to_comment, url: str) -> list:
+        """Comment dicts for a drained batch, numbered after the rows drained before it"""
+        start = harvester.drained - len(rows)
+        return [to_comment(row, start + i, url) for i, row in enumerate(rows)]
+    
+    def _log_harvest(self, harvester: CommentHarvester, stalls: int):
+        logger.info(f"🌾 Harvested {harvester.total} comments while loading ({stalls} stalled step(s) at the end)")
+    
+    def _new_comments(self, comments: list) -> list:
+        """Count the comments about to be emitted (only the ones the watermark has not seen)"""
+        if self.watermark:
+            comments = self.watermark.filter_new(comments)
+        self.emitted += len(comments)
+        if comments:
+            record_comments(self.platform, len(comments))
+        return comments
+    
+    def _enter_phase(self, phase: str):
+        """Start a phase's budget and trace span (the job state is published by set_phase)"""
+        if self.deadline:
+            self.deadline.enter(phase)
+        if self.trace:
+            self.trace.phase(phase)
+    
+    def _rate_limit_waited(self, waited) -> bool:
+        """
+        Account for a rate-limit wait (None: the action does not fit in the phase budget)
+        
+        Returns:
+            bool: Whether the action may go ahead
+        """
+        if waited is None:
+            self.deadline.exhaust()
+            return False
+        self.rate_limited += waited
+        if waited:
+            record_rate_limited(self.platform, waited)
+        return True
+    
+    @staticmethod
+    def _specs_kept(specs: list, kept: list) -> list:
+        """A field's specs whose selectors the selector cache kept, in their declared order"""
+        return [spec for spec in specs if spec['selector'] in kept]
+    
+    def _field_hits(self, fields: dict, hits: dict) -> list:
+        """(group, selectors in the order tried, selector -> nodes answered) per field with alternatives"""
+        if not self.selector_cache:
+            return []
+        results = []
+        for name, specs in fields.items():
+            if len(specs) > 1:
+                tried = [spec['selector'] for spec in specs]
+                results.append((f"field:{name}", tried, dict(zip(tried, hits.get(name, [])))))
+        return results
+    
+    def _traced_page(self, page):
+        """The job's page, recording a span per Playwright call when the job is traced"""
+        return self.trace.wrap(page) if self.trace else page
+    
+    def _selector_span(self, selector: str):
+        """Span around one selector probe (no-op when the job is not traced)"""
+        return self.trace.span('selector', selector=selector) if self.trace else nullcontext()
+    
+    def _batch_span(self, item_selector: str, offset: int):
+        """Span around one batch extraction round trip"""
+        return self.trace.span('extract_batch', selector=item_selector, offset=offset) if self.trace else nullcontext()
+    
+    def _reset_browser_refs(self):
+        """Forget page/context/browser handles after cleanup"""
+        self.page = None
+        self.context = None
+        self.browser = None
+        self.playwright = None
+
+class BaseCrawler(CrawlerState, ABC):
+    """Abstract base class for all platform-specific crawlers"""
     
     def initialize_browser(self):
         """Initialize Playwright browser with stealth configuration"""
-        stealth_config = get_stealth_config()
+        context_options = self._context_options()
+        
+        if self.browser_pool:
+            # Reuse the worker's long-lived browser, only the context is new
+            self.context = self.browser_pool.acquire_context(**context_options)
+        else:
+            self.playwright = sync_playwright().start()
+            self.browser = self.playwright.chromium.launch(
+                headless=self.headless,
+                args=BROWSER_LAUNCH_ARGS
+            )
+            # Create context with stealth settings
+            self.context = self.browser.new_context(**context_options)
         
-        self.playwright = sync_playwright().start()
-        self.browser = self.playwright.chromium.launch(
-            headless=self.headless,
-            args=[
-                '--disable-blink-features=AutomationControlled',
-                '--no-sandbox',
-                '--disable-dev-shm-usage'
-            ]
-        )
-        
-        # Create context with stealth settings
-        context = self.browser.new_context(
-            user_agent=stealth_config['user_agent'],
-            viewport=stealth_config['viewport'],
-            locale=stealth_config['locale'],
-            timezone_id=stealth_config['timezone_id']
-        )
-        
-        self.page = context.new_page()
+        # Skip video, images, fonts and trackers - only comment text is read
+        if self._new_resource_blocker():
+            self.resource_blocker.attach(self.context)
+        
+        # Profiled jobs record a Playwright trace of the browser side
+        if self.trace and self.trace.profile:
+            self.context.tracing.start(screenshots=True, snapshots=True)
+        
+        self.page = self._traced_page(self.context.new_page())
         setup_stealth_page(self.page)
         
         logger.info(f"Browser initialized for {self.__class__.__name__}")
     
     def close_browser(self):
         """Close browser and cleanup"""
+        self._log_resource_stats()
+        if self.trace and self.trace.profile and self.context:
+            try:
+                self.context.tracing.stop(path=self.trace.browser_trace_path)
+            except Exception as e:
+                logger.warning(f"Failed to save Playwright trace: {e}")
         if self.page:
-            self.page.close()
-        if self.browser:
-            self.browser.close()
-        if self.playwright:
-            self.playwright.stop()
+            try:
+                self.page.close()
+            except Exception as e:
+                # The watchdog may have killed the browser under a hung call
+                logger.warning(f"Failed to close page: {e}")
+        if self.browser_pool:
+            # The pooled browser stays up for the next job
+            self.browser_pool.release_context(self.context)
+        else:
+            if self.context:
+                self.context.close()
+            if self.browser:
+                self.browser.close()
+            if self.playwright:
+                self.playwright.stop()
+        self._reset_browser_refs()
         logger.info("Browser closed")
     
+    def session_is_valid(self) -> bool:
+        """Cheap local check that the context still carries a live auth cookie"""
+        try:
+            return has_valid_auth_cookie(self.context.cookies(), self.auth_cookie_names)
+        except Exception:
+            return False
+    
+    def ensure_session(self, login) -> bool:
+        """
+        Reuse the cached login session, or run the platform login flow and cache it
+        
+        Args:
+            login: Platform login function returning True on success
+        """
+        if self.session_restored and self.session_is_valid():
+            logger.info(f"♻️ Reusing saved {self.platform} session for {self.account} - skipping login")
+            return True
+        
+        if self.session_restored:
+            logger.info(f"Saved {self.platform} session was rejected - logging in again")
+            self.invalidate_session()
+        
+        self.set_phase('login')
+        if login():
+            self.save_session()
+            return True
+        return False
+    
+    def save_session(self) -> bool:
+        """Persist the current context's login session for later jobs"""
+        if not self.context:
+            return False
+        return self._store_session_state(self.context.storage_state())
+    
     @abstractmethod
     def crawl(self, url: str, max_comments: int) -> list:
         """
@@ -60,12 +348,199 @@ class BaseCrawler(ABC):
         Args:
             url: Target URL to crawl
             max_comments: Maximum number of comments to collect
-            
+        
         Returns:
             list: List of comment dictionaries
         """
         pass
     
+    def extract_comments_batch(self, item_selector: str, fields: dict, limit: int, offset: int = 0) -> list:
+        """
+        Extract all comment nodes with a single page.evaluate round trip
+        
+        Args:
+            item_selector: CSS selector matching one node per comment
+            fields: Field table of name -> list of specs (see BATCH_EXTRACT_SCRIPT)
+            limit: Maximum number of nodes to read
+            offset: Number of leading nodes to skip
+            
+        Returns:
+            list: One dict of raw field strings (or None) per comment node
+        """
+        fields = self.prune_fields(fields)
+        with self._batch_span(item_selector, offset) as span:
+            result = self.page.evaluate(BATCH_EXTRACT_SCRIPT, {
+                'itemSelector': item_selector,
+                'fields': fields,
+                'limit': limit,
+                'offset': offset
+            })
+            rows = result['rows']
+            if span:
+                span.set(rows=len(rows))
+        if rows:
+            for group, tried, hits in self._field_hits(fields, result['hits']):
+                self.selector_cache.record(self.platform, group, tried, hits, len(rows))
+        return rows
+    
+    def prune_fields(self, fields: dict) -> dict:
+        """
+        Field table without the alternative specs that recently missed
+        
+        A field's specs are a precedence list (the first one that matches
+        wins), so they keep their declared order; only selectors the cache
+        saw miss since they last matched are skipped.
+        """
+        if not self.selector_cache:
+            return fields
+        return {
+            name: self._specs_kept(specs, self.selector_cache.pruned(
+                self.platform, f"field:{name}", [spec['selector'] for spec in specs])) if len(specs) > 1 else specs
+            for name, specs in fields.items()
+        }
+    
+    def first_matching_selector(self, group: str, strategies: list) -> tuple:
+        """
+        Probe selector strategies until one matches any node (one count round trip each)
+        
+        Strategies are tried in selector cache order - the one that matched last
+        time first - and the outcome is reported back to the cache.
+        
+        Args:
+            group: Name of the strategy list in the cache (e.g. comment_item)
+            strategies: Selectors in their declared order
+        
+        Returns:
+            tuple: (matching selector or None, number of matching nodes)
+        """
+        order = self.selector_cache.ranked(self.platform, group, strategies) if self.selector_cache else strategies
+        tried = []
+        for selector in order:
+            tried.append(selector)
+            matches = self.count_matches(selector)
+            record_selector(self.platform, selector, bool(matches))
+            if matches:
+                break
+        else:
+            selector, matches = None, 0
+        if self.selector_cache:
+            self.selector_cache.record(self.platform, group, tried, {selector: 1} if selector else {})
+        return selector, matches
+    
+    def count_matches(self, selector: str) -> int:
+        """Number of nodes matching a selector (one round trip, no element handles)"""
+        with self._selector_span(selector) as span:
+            matches = self.page.locator(selector).count()
+            if span:
+                span.set(matches=matches)
+            return matches
+    
+    def harvest_comments(self, item_selector: str, fields: dict, to_comment, url: str, max_comments: int,
+                         load_more) -> list:
+        """
+        Run a load-more loop, emitting comments as they render
+        
+        A page-side observer (crawlers.harvester) reads every comment node the
+        moment it renders, so comments a virtualized list later drops from the
+        DOM are kept. After each load-more step the new, deduplicated rows are
+        drained in one round trip and emitted. Loading stops at max_comments,
+        after HARVEST_STALL_STEPS steps without a new comment, once an
+        incremental crawl reaches its watermark, or when the phase runs out of
+        time.
+        
+        Args:
+            item_selector: CSS selector matching one node per comment
+            fields: Field table (see BATCH_EXTRACT_SCRIPT)
+            to_comment: Platform row -> comment dict function (row, index, post_url)
+            url: Post URL (part of the comment fingerprint)
+            max_comments: Maximum number of comments to harvest
+            load_more: Performs one load-more step (scroll, click "View more", ...)
+        
+        Returns:
+            list: The comments emit_comments() kept
+        """
+        harvester = CommentHarvester(self.page, item_selector, self.prune_fields(fields), max_comments).start()
+        kept = []
+        stalls = 0
+        try:
+            kept.extend(self._emit_harvested(harvester, to_comment, url))
+            while not self._harvest_done(harvester, stalls):
+                before = harvester.total
+                load_more()
+                harvester.wait_for_growth(before, self.time_left_ms(HARVEST_STEP_TIMEOUT_MS))
+                kept.extend(self._emit_harvested(harvester, to_comment, url))
+                stalls = stalls + 1 if harvester.total == before else 0
+        finally:
+            harvester.stop()
+        self._log_harvest(harvester, stalls)
+        return kept
+    
+    def _emit_harvested(self, harvester: CommentHarvester, to_comment, url: str) -> list:
+        """Drain the harvest buffer (until no rows are held back) and emit every batch"""
+        kept = []
+        while True:
+            rows, hits = harvester.drain()
+            if rows:
+                for group, tried, field_hits in self._field_hits(harvester.fields, hits):
+                    self.selector_cache.record(self.platform, group, tried, field_hits, len(rows))
+                kept.extend(self.emit_comments(self._harvested_comments(harvester, rows, to_comment, url)))
+            if not harvester.backlog:
+                return kept
+    
+    def emit_comments(self, comments: list) -> list:
+        """
+        Hand extracted comments on as soon as they are available
+        
+        With a comment sink attached they are streamed to it and not kept in memory;
+        otherwise they are returned for the crawler to collect.
+        
+        For incremental crawls only comments the watermark has not seen are
+        passed on.
+        
+        Returns:
+            list: The comments the crawler should keep
+        """
+        comments = self._new_comments(comments)
+        if self.job_state and comments:
+            self.job_state.add_progress(comments_found=len(comments))
+        if self.comment_sink is None:
+            return comments
+        self.comment_sink.add_many(comments)
+        return []
+    
+    def set_phase(self, phase: str):
+        """Publish the crawl step the job is in (shown by the status endpoint) and start its budget"""
+        self._enter_phase(phase)
+        if self.job_state:
+            self.job_state.set_phase(phase)
+    
+    def throttle(self, action: str = 'request') -> bool:
+        """
+        Wait for a token from the platform's shared rate limit
+        
+        Call before every navigation and load-more action. The wait is added to
+        the job's rate_limited_ms progress counter. It is capped to what is left
+        of the phase budget: a longer wait is not slept, the phase is ended
+        (out_of_time() turns True) and the action must be skipped.
+        
+        Returns:
+            bool: False if the action does not fit in the phase budget
+        """
+        if not self.rate_limiter:
+            return True
+        waited = self.rate_limiter.acquire(self.platform, self.account, action, self._max_wait())
+        if not self._rate_limit_waited(waited):
+            return False
+        if waited and self.job_state:
+            self.job_state.add_progress(rate_limited_ms=int(waited * 1000))
+        return True
+    
+    def goto(self, url: str, wait_until: str, timeout_ms: int):
+        """Rate-limited page.goto with its timeout capped to the phase budget"""
+        if not self.throttle('navigation'):
+            raise TimeoutError(self.deadline.message())
+        return self.page.goto(url, wait_until=wait_until, timeout=self.time_left_ms(timeout_ms))
+    
     def extract_comment_data(self, element) -> dict:
         """
         Extract comment data from a page element
@@ -74,5 +549,231 @@ class BaseCrawler(ABC):
         return {}
     
     def wait_for_comments(self, timeout: int = 10000):
-        """Wait for comment section to load"""
-        random_delay(1000, 2000)
+        """Wait for comment section to load (returns early once the network is idle)"""
+        wait_for_network_idle(self.page, self.time_left_ms(timeout))
+
+class AsyncBaseCrawler(CrawlerState, ABC):
+    """playwright.async_api counterpart of BaseCrawler, used by the async worker"""
+    
+    async def initialize_browser(self):
+        """Initialize Playwright browser with stealth configuration"""
+        context_options = self._context_options()
+        
+        if self.browser_pool:
+            self.context = await self.browser_pool.acquire_context(**context_options)
+        else:
+            self.playwright = await async_playwright().start()
+            self.browser = await self.playwright.chromium.launch(
+                headless=self.headless,
+                args=BROWSER_LAUNCH_ARGS
+            )
+            self.context = await self.browser.new_context(**context_options)
+        
+        if self._new_resource_blocker():
+            await self.resource_blocker.async_attach(self.context)
+        
+        if self.trace and self.trace.profile:
+            await self.context.tracing.start(screenshots=True, snapshots=True)
+        
+        self.page = self._traced_page(await self.context.new_page())
+        await async_setup_stealth_page(self.page)
+        
+        logger.info(f"Browser initialized for {self.__class__.__name__}")
+    
+    async def close_browser(self):
+        """Close browser and cleanup"""
+        self._log_resource_stats()
+        if self.trace and self.trace.profile and self.context:
+            try:
+                await asyncio.wait_for(self.context.tracing.stop(path=self.trace.browser_trace_path),
+                                       CONTEXT_CLOSE_TIMEOUT)
+            except Exception as e:
+                logger.warning(f"Failed to save Playwright trace: {e}")
+        if self.page:
+            try:
+                await asyncio.wait_for(self.page.close(), CONTEXT_CLOSE_TIMEOUT)
+            except Exception as e:
+                # A wedged browser may never answer
+                logger.warning(f"Failed to close page: {e}")
+        if self.browser_pool:
+            await self.browser_pool.release_context(self.context)
+        else:
+            if self.context:
+                await self.context.close()
+            if self.browser:
+                await self.browser.close()
+            if self.playwright:
+                await self.playwright.stop()
+        self._reset_browser_refs()
+        logger.info("Browser closed")
+    
+    async def session_is_valid(self) -> bool:
+        """Cheap local check that the context still carries a live auth cookie"""
+        try:
+            return has_valid_auth_cookie(await self.context.cookies(), self.auth_cookie_names)
+        except Exception:
+            return False
+    
+    async def ensure_session(self, login) -> bool:
+        """
+        Reuse the cached login session, or run the platform login flow and cache it
+        
+        Args:
+            login: Async platform login function returning True on success
+        """
+        if self.session_restored and await self.session_is_valid():
+            logger.info(f"♻️ Reusing saved {self.platform} session for {self.account} - skipping login")
+            return True
+        
+        if self.session_restored:
+            logger.info(f"Saved {self.platform} session was rejected - logging in again")
+            self.invalidate_session()
+        
+        await self.set_phase('login')
+        if await login():
+            await self.save_session()
+            return True
+        return False
+    
+    async def save_session(self) -> bool:
+        """Persist the current context's login session for later jobs"""
+        if not self.context:
+            return False
+        return self._store_session_state(await self.context.storage_state())
+    
+    @abstractmethod
+    async def crawl(self, url: str, max_comments: int) -> list:
+        """
+        Abstract method to be implemented by platform-specific crawlers
+        
+        Args:
+            url: Target URL to crawl
+            max_comments: Maximum number of comments to collect
+        
+        Returns:
+            list: List of comment dictionaries
+        """
+        pass
+    
+    async def extract_comments_batch(self, item_selector: str, fields: dict, limit: int, offset: int = 0) -> list:
+        """Extract all comment nodes with a single page.evaluate round trip"""
+        fields = await self.prune_fields(fields)
+        with self._batch_span(item_selector, offset) as span:
+            result = await self.page.evaluate(BATCH_EXTRACT_SCRIPT, {
+                'itemSelector': item_selector,
+                'fields': fields,
+                'limit': limit,
+                'offset': offset
+            })
+            rows = result['rows']
+            if span:
+                span.set(rows=len(rows))
+        if rows:
+            for group, tried, hits in self._field_hits(fields, result['hits']):
+                await self.selector_cache.record(self.platform, group, tried, hits, len(rows))
+        return rows
+    
+    async def prune_fields(self, fields: dict) -> dict:
+        """Field table without the alternative specs that recently missed (see BaseCrawler)"""
+        if not self.selector_cache:
+            return fields
+        pruned = {}
+        for name, specs in fields.items():
+            if len(specs) > 1:
+                kept = await self.selector_cache.pruned(self.platform, f"field:{name}", [spec['selector'] for spec in specs])
+                specs = self._specs_kept(specs, kept)
+            pruned[name] = specs
+        return pruned
+    
+    async def first_matching_selector(self, group: str, strategies: list) -> tuple:
+        """(selector, match count) of the first strategy matching any node, in selector cache order (see BaseCrawler)"""
+        order = await self.selector_cache.ranked(self.platform, group, strategies) if self.selector_cache else strategies
+        tried = []
+        for selector in order:
+            tried.append(selector)
+            matches = await self.count_matches(selector)
+            record_selector(self.platform, selector, bool(matches))
+            if matches:
+                break
+        else:
+            selector, matches = None, 0
+        if self.selector_cache:
+            await self.selector_cache.record(self.platform, group, tried, {selector: 1} if selector else {})
+        return selector, matches
+    
+    async def count_matches(self, selector: str) -> int:
+        """Number of nodes matching a selector (one round trip, no element handles)"""
+        with self._selector_span(selector) as span:
+            matches = await self.page.locator(selector).count()
+            if span:
+                span.set(matches=matches)
+            return matches
+    
+    async def harvest_comments(self, item_selector: str, fields: dict, to_comment, url: str, max_comments: int,
+                               load_more) -> list:
+        """Run a load-more loop, emitting comments as they render (see BaseCrawler); load_more is a coroutine function"""
+        harvester = await CommentHarvester(self.page, item_selector, await self.prune_fields(fields),
+                                           max_comments).async_start()
+        kept = []
+        stalls = 0
+        try:
+            kept.extend(await self._emit_harvested(harvester, to_comment, url))
+            while not self._harvest_done(harvester, stalls):
+                before = harvester.total
+                await load_more()
+                await harvester.async_wait_for_growth(before, self.time_left_ms(HARVEST_STEP_TIMEOUT_MS))
+                kept.extend(await self._emit_harvested(harvester, to_comment, url))
+                stalls = stalls + 1 if harvester.total == before else 0
+        finally:
+            await harvester.async_stop()
+        self._log_harvest(harvester, stalls)
+        return kept
+    
+    async def _emit_harvested(self, harvester: CommentHarvester, to_comment, url: str) -> list:
+        """Drain the harvest buffer (until no rows are held back) and emit every batch"""
+        kept = []
+        while True:
+            rows, hits = await harvester.async_drain()
+            if rows:
+                for group, tried, field_hits in self._field_hits(harvester.fields, hits):
+                    await self.selector_cache.record(self.platform, group, tried, field_hits, len(rows))
+                kept.extend(await self.emit_comments(self._harvested_comments(harvester, rows, to_comment, url)))
+            if not harvester.backlog:
+                return kept
+    
+    async def emit_comments(self, comments: list) -> list:
+        """Stream comments to the comment sink, or return them to be kept (see BaseCrawler)"""
+        comments = self._new_comments(comments)
+        if self.job_state and comments:
+            await self.job_state.add_progress(comments_found=len(comments))
+        if self.comment_sink is None:
+            return comments
+        await self.comment_sink.async_add_many(comments)
+        return []
+    
+    async def set_phase(self, phase: str):
+        """Publish the crawl step the job is in (shown by the status endpoint) and start its budget"""
+        self._enter_phase(phase)
+        if self.job_state:
+            await self.job_state.set_phase(phase)
+    
+    async def throttle(self, action: str = 'request') -> bool:
+        """Wait for a token from the platform's shared rate limit (see BaseCrawler)"""
+        if not self.rate_limiter:
+            return True
+        waited = await self.rate_limiter.acquire(self.platform, self.account, action, self._max_wait())
+        if not self._rate_limit_waited(waited):
+            return False
+        if waited and self.job_state:
+            await self.job_state.add_progress(rate_limited_ms=int(waited * 1000))
+        return True
+    
+    async def goto(self, url: str, wait_until: str, timeout_ms: int):
+        """Rate-limited page.goto with its timeout capped to the phase budget"""
+        if not await self.throttle('navigation'):
+            raise TimeoutError(self.deadline.message())
+        return await self.page.goto(url, wait_until=wait_until, timeout=self.time_left_ms(timeout_ms))
+    
+    async def wait_for_comments(self, timeout: int = 10000):
+        """Wait for comment section to load (returns early once the network is idle)"""
+        await async_wait_for_network_idle(self.page, self.time_left_ms(timeout))
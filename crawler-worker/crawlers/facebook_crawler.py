@@ -1,14 +1,72 @@
-from crawlers.base_crawler import BaseCrawler
-from utils.anti_ban import random_delay, human_like_scroll
+from crawlers.base_crawler import BaseCrawler, AsyncBaseCrawler, field_specs
+from crawlers.harvester import HARVEST_STALL_STEPS, HARVEST_STEP_TIMEOUT_MS
+from utils.anti_ban import (
+    human_jitter, human_like_scroll, wait_for_any_selector,
+    async_human_jitter, async_human_like_scroll, async_wait_for_any_selector
+)
+from utils.fingerprint import comment_fingerprint
 import logging
 
 logger = logging.getLogger(__name__)
 
-class FacebookCrawler(BaseCrawler):
-    """Facebook-specific crawler implementation"""
+COMMENT_SELECTORS = [
+    '[data-ad-preview="message"]',
+    '.comment-content',
+    '[role="article"] [dir="auto"]'
+]
+
+# Field table for BaseCrawler.extract_comments_batch - comment nodes are the
+# message elements themselves, the author link sits in their parent
+FACEBOOK_COMMENT_FIELDS = {
+    'text': field_specs([':scope']),
+    'username': field_specs(['a[role="link"]'], parent=True),
+    'timestamp': field_specs(['abbr'], attr='data-utime'),
+}
+
+VIEW_MORE_SELECTORS = [
+    '[role="button"]:has-text("View more comments")',
+    '[role="button"]:has-text("See more")',
+    'span:has-text("View more")'
+]
+
+def build_facebook_comment(index: int, username: str, text: str, timestamp, post_url: str = '') -> dict:
+    """Assemble the comment dict sent to the Processing API (username None when it was not extracted)"""
+    # The ID never depends on the comment's position: without a username it is derived from the text alone
+    comment_id = f"fb_{comment_fingerprint('facebook', post_url, username, text)}"
+    username = username or f"user_{index}"
+    return {
+        'comment_id': comment_id,
+        'username': username,
+        'user_id': username,
+        'text': text,
+        'timestamp': timestamp,
+        'likes': 0,
+        'replies_count': 0,
+        'platform': 'facebook'
+    }
+
+def facebook_comment_from_row(row: dict, index: int, post_url: str = '') -> dict:
+    """Turn a FACEBOOK_COMMENT_FIELDS row into a comment dict"""
+    username = row.get('username')
+    return build_facebook_comment(index, username, row.get('text') or "", row.get('timestamp'), post_url)
+
+class _FacebookCrawlerBase:
+    """Facebook settings and the crawl bookkeeping shared by FacebookCrawler and AsyncFacebookCrawler"""
+    
+    platform = 'facebook'
+    auth_cookie_names = ('c_user', 'xs')
     
-    def __init__(self, headless: bool = True):
-        super().__init__(headless)
+    def _rendered_comments(self, rows: list, url: str) -> list:
+        """Comment dicts for the rows extract_rendered_comments() read"""
+        logger.info(f"Found {len(rows)} comment elements")
+        return [facebook_comment_from_row(row, idx, url) for idx, row in enumerate(rows)]
+    
+    def _selector_search_done(self, selector: str, attempt: int) -> bool:
+        """Whether _find_comment_selector() stops loading more (a selector matched, or it gave up)"""
+        return bool(selector) or attempt == HARVEST_STALL_STEPS or self.out_of_time()
+
+class FacebookCrawler(_FacebookCrawlerBase, BaseCrawler):
+    """Facebook-specific crawler implementation"""
     
     def crawl(self, url: str, max_comments: int) -> list:
         """
@@ -28,52 +86,30 @@ class FacebookCrawler(BaseCrawler):
             logger.info(f"Starting Facebook crawl for {url}")
             
             # Navigate to post
-            self.page.goto(url, wait_until='networkidle', timeout=30000)
-            random_delay(3000, 5000)
+            self.set_phase('loading_page')
+            self.goto(url, 'networkidle', 30000)
+            human_jitter()
             
             # Handle cookie consent
             try:
                 cookie_button = self.page.query_selector('[data-cookiebanner="accept_button"]')
                 if cookie_button:
                     cookie_button.click()
-                    random_delay(1000, 2000)
+                    human_jitter()
             except:
                 pass
             
-            # Scroll to load comments
+            # Scroll to load comments, extracting them as they render
             logger.info("Loading comments...")
-            self._load_facebook_comments(max_comments)
-            
-            # Extract comments
-            comment_selectors = [
-                '[data-ad-preview="message"]',
-                '.comment-content',
-                '[role="article"] [dir="auto"]'
-            ]
-            
-            comment_elements = []
-            for selector in comment_selectors:
-                elements = self.page.query_selector_all(selector)
-                if elements:
-                    comment_elements = elements
-                    break
+            self.set_phase('loading_comments')
+            selector = self._find_comment_selector()
+            if selector:
+                comments.extend(self.harvest_comments(selector, FACEBOOK_COMMENT_FIELDS, facebook_comment_from_row,
+                                                      url, max_comments, self._load_more_comments))
+            else:
+                logger.warning("No Facebook comments rendered")
             
-            logger.info(f"Found {len(comment_elements)} comment elements")
-            
-            for idx, element in enumerate(comment_elements[:max_comments]):
-                if idx >= max_comments:
-                    break
-                
-                try:
-                    comment_data = self._extract_facebook_comment(element, idx)
-                    if comment_data:
-                        comments.append(comment_data)
-                        logger.info(f"Extracted comment {idx + 1}/{max_comments}")
-                except Exception as e:
-                    logger.warning(f"Failed to extract comment {idx}: {e}")
-                    continue
-            
-            logger.info(f"Successfully crawled {len(comments)} comments from Facebook")
+            logger.info(f"Successfully crawled {self.emitted} comments from Facebook")
             
         except Exception as e:
             logger.error(f"Facebook crawl failed: {e}")
@@ -83,74 +119,122 @@ class FacebookCrawler(BaseCrawler):
         
         return comments
     
-    def _load_facebook_comments(self, max_comments: int):
-        """Scroll and expand comment threads"""
-        scroll_attempts = 0
-        max_scrolls = min(max_comments // 10, 15)
+    def extract_rendered_comments(self, url: str, max_comments: int) -> list:
+        """
+        Extract the comments rendered on the page and emit them
         
-        while scroll_attempts < max_scrolls:
-            # Scroll down
-            human_like_scroll(self.page, scroll_count=3)
-            
-            # Try to click "View more comments" or similar
+        crawl() harvests comments while loading them instead; the extraction
+        benchmark runs this on a fully rendered page.
+        
+        Returns:
+            list: The comments emit_comments() kept
+        """
+        self.set_phase('extracting')
+        # Extract comments - first selector that matches (recent winner first), read in one round trip
+        rows = []
+        selector, _ = self.first_matching_selector('comment_item', COMMENT_SELECTORS)
+        if selector:
+            rows = self.extract_comments_batch(selector, FACEBOOK_COMMENT_FIELDS, max_comments)
+        return self.emit_comments(self._rendered_comments(rows, url))
+    
+    def _find_comment_selector(self) -> str:
+        """The comment selector this post renders with (recent winner first), loading more until one matches"""
+        for attempt in range(HARVEST_STALL_STEPS + 1):
+            selector, _ = self.first_matching_selector('comment_item', COMMENT_SELECTORS)
+            if self._selector_search_done(selector, attempt):
+                return selector
+            self._load_more_comments()
+            wait_for_any_selector(self.page, COMMENT_SELECTORS, self.time_left_ms(HARVEST_STEP_TIMEOUT_MS))
+    
+    def _load_more_comments(self):
+        """One load-more step: scroll down and click 'View more comments' or similar"""
+        # Each step can fetch more comments, so it takes a rate-limit token
+        if not self.throttle('load_more'):
+            return
+        human_like_scroll(self.page, scroll_count=3)
+        for selector in VIEW_MORE_SELECTORS:
             try:
-                view_more_selectors = [
-                    '[role="button"]:has-text("View more comments")',
-                    '[role="button"]:has-text("See more")',
-                    'span:has-text("View more")'
-                ]
-                
-                for selector in view_more_selectors:
-                    try:
-                        button = self.page.query_selector(selector)
-                        if button:
-                            button.click()
-                            random_delay(2000, 3000)
-                            break
-                    except:
-                        continue
+                button = self.page.query_selector(selector)
+                if button:
+                    button.click()
+                    break
             except:
-                pass
-            
-            scroll_attempts += 1
-            random_delay(1500, 2500)
+                continue
+
+class AsyncFacebookCrawler(_FacebookCrawlerBase, AsyncBaseCrawler):
+    """playwright.async_api version of FacebookCrawler for the async worker"""
     
-    def _extract_facebook_comment(self, element, index: int) -> dict:
-        """Extract comment data from Facebook comment element"""
+    async def crawl(self, url: str, max_comments: int) -> list:
+        """Crawl comments from a Facebook post (see FacebookCrawler)"""
+        comments = []
+        
         try:
-            # Get comment text
-            text = element.inner_text() or ""
+            await self.initialize_browser()
+            logger.info(f"Starting Facebook crawl for {url}")
             
-            # Try to find username (parent element usually contains it)
-            username = f"user_{index}"
-            try:
-                parent = element.query_selector('..')
-                if parent:
-                    username_elem = parent.query_selector('a[role="link"]')
-                    if username_elem:
-                        username = username_elem.inner_text()
-            except:
-                pass
+            # Navigate to post
+            await self.set_phase('loading_page')
+            await self.goto(url, 'networkidle', 30000)
+            await async_human_jitter()
             
-            # Extract timestamp if available
-            timestamp = None
+            # Handle cookie consent
             try:
-                time_elem = element.query_selector('abbr')
-                if time_elem:
-                    timestamp = time_elem.get_attribute('data-utime')
+                cookie_button = await self.page.query_selector('[data-cookiebanner="accept_button"]')
+                if cookie_button:
+                    await cookie_button.click()
+                    await async_human_jitter()
             except:
                 pass
             
-            return {
-                'comment_id': f"fb_{index}_{hash(text)}",
-                'username': username,
-                'user_id': username,
-                'text': text,
-                'timestamp': timestamp,
-                'likes': 0,
-                'replies_count': 0,
-                'platform': 'facebook'
-            }
+            # Scroll to load comments, extracting them as they render
+            logger.info("Loading comments...")
+            await self.set_phase('loading_comments')
+            selector = await self._find_comment_selector()
+            if selector:
+                comments.extend(await self.harvest_comments(selector, FACEBOOK_COMMENT_FIELDS,
+                                                            facebook_comment_from_row, url, max_comments,
+                                                            self._load_more_comments))
+            else:
+                logger.warning("No Facebook comments rendered")
+            
+            logger.info(f"Successfully crawled {self.emitted} comments from Facebook")
+            
         except Exception as e:
-            logger.error(f"Failed to parse Facebook comment: {e}")
-            return None
+            logger.error(f"Facebook crawl failed: {e}")
+            raise
+        finally:
+            await self.close_browser()
+        
+        return comments
+    
+    async def extract_rendered_comments(self, url: str, max_comments: int) -> list:
+        """Extract the comments rendered on the page and emit them (see FacebookCrawler)"""
+        await self.set_phase('extracting')
+        rows = []
+        selector, _ = await self.first_matching_selector('comment_item', COMMENT_SELECTORS)
+        if selector:
+            rows = await self.extract_comments_batch(selector, FACEBOOK_COMMENT_FIELDS, max_comments)
+        return await self.emit_comments(self._rendered_comments(rows, url))
+    
+    async def _find_comment_selector(self) -> str:
+        """The comment selector this post renders with (see FacebookCrawler)"""
+        for attempt in range(HARVEST_STALL_STEPS + 1):
+            selector, _ = await self.first_matching_selector('comment_item', COMMENT_SELECTORS)
+            if self._selector_search_done(selector, attempt):
+                return selector
+            await self._load_more_comments()
+            await async_wait_for_any_selector(self.page, COMMENT_SELECTORS, self.time_left_ms(HARVEST_STEP_TIMEOUT_MS))
+    
+    async def _load_more_comments(self):
+        """One load-more step: scroll down and click 'View more comments' or similar"""
+        if not await self.throttle('load_more'):
+            return
+        await async_human_like_scroll(self.page, scroll_count=3)
+        for selector in VIEW_MORE_SELECTORS:
+            try:
+                button = await self.page.query_selector(selector)
+                if button:
+                    await button.click()
+                    break
+            except:
+                continue
@@ -0,0 +1,225 @@
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Load-more steps in a row without a new comment before a crawl stops loading
+HARVEST_STALL_STEPS = int(os.getenv('HARVEST_STALL_STEPS', 3))
+# How long one load-more step waits for new comments to render (ms)
+HARVEST_STEP_TIMEOUT_MS = int(os.getenv('HARVEST_STEP_TIMEOUT_MS', 5000))
+# Rows the page holds between drains; comment nodes beyond it wait for the next drain
+HARVEST_BUFFER_SIZE = int(os.getenv('HARVEST_BUFFER_SIZE', 1000))
+
+# Fields that identify a comment: its author (username, or the profile link when
+# no username selector matches) and its text. A field table may lack some of them.
+HARVEST_KEY_FIELDS = (('username', 'profile_href'), ('text',))
+
+# Installs window.__commentHarvest: a MutationObserver that reads every comment
+# node as it renders (or re-renders with new content, as virtualized lists
+# recycle their rows) with the BATCH_EXTRACT_SCRIPT field specs, and buffers
+# rows it has not seen before. Nodes are read as soon as they are added, so
+# comments that later scroll out of a virtualized list are kept. keyFields
+# groups the identity fields (any field of a group will do). A node missing a
+# group stays pending until the next drain; after that it is buffered with the
+# fields it has, since some comments never get them (sticker or GIF comments
+# have no text). If such a node later completes, it is not buffered again. The
+# buffer holds at most maxBuffer rows and the harvest stops at limit rows, so
+# page memory stays bounded by max_comments.
+START_HARVEST_SCRIPT = """
+({ itemSelector, fields, keyFields, limit, maxBuffer }) => {
+    if (window.__commentHarvest) window.__commentHarvest.observer.disconnect();
+    const read = (node, spec) => {
+        const scope = spec.parent ? node.parentElement : node;
+        if (!scope) return null;
+        const el = spec.selector === ':scope' ? scope : scope.querySelector(spec.selector);
+        if (!el) return null;
+        const value = spec.attr ? el.getAttribute(spec.attr) : el.innerText;
+        return value ? value.trim() : null;
+    };
+    const state = { buffer: [], keys: new Set(), pending: new Set(), hits: {}, total: 0, drains: 0 };
+    state.waits = new WeakMap();  // incomplete node -> drain it was first read in
+    state.partial = new WeakMap();  // node -> row buffered before every key field rendered
+    const keyNames = keyFields.flat();
+    state.resetHits = () => {
+        state.hits = {};
+        for (const [name, specs] of Object.entries(fields)) state.hits[name] = specs.map(() => 0);
+    };
+    state.resetHits();
+    state.flush = () => {
+        for (const node of state.pending) {
+            if (state.total >= limit || state.buffer.length >= maxBuffer) break;
+            if (!node.isConnected) { state.pending.delete(node); continue; }
+            const row = {};
+            const matched = {};
+            for (const [name, specs] of Object.entries(fields)) {
+                row[name] = null;
+                for (const [i, spec] of specs.entries()) {
+                    let value = null;
+                    try { value = read(node, spec); } catch (e) { value = null; }
+                    if (value) { row[name] = value; matched[name] = i; break; }
+                }
+            }
+            const complete = keyFields.every((group) => group.some((name) => row[name]));
+            if (!complete) {
+                if (!state.waits.has(node)) state.waits.set(node, state.drains);
+                // Possibly still rendering: read again on the next flush until a drain has passed
+                if (state.waits.get(node) === state.drains) continue;
+                if (!keyNames.some((name) => row[name])) { state.pending.delete(node); continue; }
+            }
+            state.pending.delete(node);
+            state.waits.delete(node);
+            const key = keyNames.map((name) => row[name] || '').join('\\u0001');
+            // The rest of a comment this node was already buffered with
+            const earlier = state.partial.get(node);
+            state.partial.delete(node);
+            if (earlier && keyNames.every((name) => !earlier[name] || earlier[name] === row[name])) {
+                state.keys.add(key);
+                continue;
+            }
+            if (!complete) state.partial.set(node, row);
+            if (state.keys.has(key)) continue;
+            state.keys.add(key);
+            for (const [name, i] of Object.entries(matched)) state.hits[name][i] += 1;
+            state.buffer.push(row);
+            state.total += 1;
+        }
+    };
+    const queue = (node) => {
+        const el = node.nodeType === 1 ? node : node.parentElement;
+        if (!el) return;
+        const item = el.closest(itemSelector);
+        if (item) {
+            state.pending.add(item);
+        } else if (node.nodeType === 1) {
+            for (const found of el.querySelectorAll(itemSelector)) state.pending.add(found);
+        }
+    };
+    state.observer = new MutationObserver((records) => {
+        if (state.total >= limit) return;
+        for (const record of records) {
+            if (record.type === 'characterData') queue(record.target);
+            for (const node of record.addedNodes) queue(node);
+        }
+        state.flush();
+    });
+    state.observer.observe(document.body, { childList: true, subtree: true, characterData: true });
+    for (const node of document.querySelectorAll(itemSelector)) state.pending.add(node);
+    state.flush();
+    window.__commentHarvest = state;
+    return state.total;
+}
+"""
+
+# Hands the buffered rows (and which spec answered each field) to the worker
+# and refills the buffer from nodes that were held back while it was full
+DRAIN_HARVEST_SCRIPT = """
+() => {
+    const state = window.__commentHarvest;
+    if (!state) return { rows: [], hits: {}, total: 0, backlog: 0 };
+    const rows = state.buffer;
+    const hits = state.hits;
+    state.buffer = [];
+    state.resetHits();
+    state.drains += 1;
+    state.flush();
+    return { rows, hits, total: state.total, backlog: state.buffer.length };
+}
+"""
+
+STOP_HARVEST_SCRIPT = """
+() => {
+    const state = window.__commentHarvest;
+    if (!state) return 0;
+    state.observer.disconnect();
+    delete window.__commentHarvest;
+    return state.total;
+}
+"""
+
+HARVEST_GROWTH_SCRIPT = "(previous) => !window.__commentHarvest || window.__commentHarvest.total > previous"
+
+class CommentHarvester:
+    """
+    Collects comment rows from the page while a load-more loop runs.
+    
+    start() installs the page-side observer; drain()/async_drain() fetch the
+    rows buffered since the last drain in one round trip. Only rows not seen
+    before reach the worker, so the crawler can emit every drained batch
+    straight away instead of re-reading the whole list at the end.
+    """
+    
+    def __init__(self, page, item_selector: str, fields: dict, limit: int, key_fields=HARVEST_KEY_FIELDS,
+                 buffer_size: int = None):
+        self.page = page
+        self.item_selector = item_selector
+        self.fields = fields
+        self.limit = limit
+        self.key_fields = [[name for name in group if name in fields] for group in key_fields]
+        self.key_fields = [group for group in self.key_fields if group]
+        self.buffer_size = buffer_size or HARVEST_BUFFER_SIZE
+        self.total = 0  # Unique comments harvested so far (page side)
+        self.drained = 0  # Rows handed to the worker
+        self.backlog = 0  # Rows already buffered again by the last drain
+    
+    def _start_args(self) -> dict:
+        return {
+            'itemSelector': self.item_selector,
+            'fields': self.fields,
+            'keyFields': self.key_fields,
+            'limit': self.limit,
+            'maxBuffer': self.buffer_size,
+        }
+    
+    def _drained(self, result: dict) -> tuple:
+        rows = result['rows']
+        self.total = result['total']
+        self.backlog = result['backlog']
+        self.drained += len(rows)
+        return rows, result['hits']
+    
+    def start(self):
+        self.total = self.page.evaluate(START_HARVEST_SCRIPT, self._start_args())
+        return self
+    
+    def drain(self) -> tuple:
+        """
+        Rows buffered since the last drain
+        
+        Returns:
+            tuple: (rows, field -> per-spec hit counts of those rows)
+        """
+        return self._drained(self.page.evaluate(DRAIN_HARVEST_SCRIPT))
+    
+    def wait_for_growth(self, previous: int, timeout_ms: int):
+        """Wait until more than `previous` comments have been harvested"""
+        try:
+            self.page.wait_for_function(HARVEST_GROWTH_SCRIPT, arg=previous, timeout=timeout_ms, polling=250)
+        except Exception:
+            pass  # Nothing new in time - the caller counts a stall
+    
+    def stop(self):
+        """Disconnect the observer (the page may already be gone)"""
+        try:
+            self.page.evaluate(STOP_HARVEST_SCRIPT)
+        except Exception as e:
+            logger.debug(f"Comment harvest not stopped: {e}")
+    
+    async def async_start(self):
+        self.total = await self.page.evaluate(START_HARVEST_SCRIPT, self._start_args())
+        return self
+    
+    async def async_drain(self) -> tuple:
+        """Async counterpart of drain()"""
+        return self._drained(await self.page.evaluate(DRAIN_HARVEST_SCRIPT))
+    
+    async def async_wait_for_growth(self, previous: int, timeout_ms: int):
+        try:
+            await self.page.wait_for_function(HARVEST_GROWTH_SCRIPT, arg=previous, timeout=timeout_ms, polling=250)
+        except Exception:
+            pass
+    
+    async def async_stop(self):
+        try:
+            await self.page.evaluate(STOP_HARVEST_SCRIPT)
+        except Exception as e:
+            logger.debug(f"Comment harvest not stopped: {e}")
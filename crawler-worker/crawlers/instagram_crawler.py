@@ -1,17 +1,65 @@
 import logging
 import os
-from crawlers.base_crawler import BaseCrawler
-from utils.anti_ban import random_delay, human_like_scroll
+from crawlers.base_crawler import BaseCrawler, AsyncBaseCrawler, field_specs
+from utils.anti_ban import (
+    human_jitter, human_like_scroll,
+    async_human_jitter, async_human_like_scroll
+)
+from utils.fingerprint import comment_fingerprint
 
 logger = logging.getLogger(__name__)
 
-class InstagramCrawler(BaseCrawler):
-    """Instagram-specific crawler implementation"""
+INSTAGRAM_LOGIN_URL = 'https://www.instagram.com/accounts/login/'
+
+COMMENT_SELECTOR = 'ul ul li'
+
+# Field table for BaseCrawler.extract_comments_batch
+INSTAGRAM_COMMENT_FIELDS = {
+    'username': field_specs(['a[href*="/"]']),
+    'text': field_specs(['span']),
+    'timestamp': field_specs(['time'], attr='datetime'),
+}
+
+def build_instagram_comment(index: int, username: str, text: str, timestamp, post_url: str = '') -> dict:
+    """Assemble the comment dict sent to the Processing API (username None when it was not extracted)"""
+    # The ID never depends on the comment's position: without a username it is derived from the text alone
+    comment_id = f"ig_{comment_fingerprint('instagram', post_url, username, text)}"
+    username = username or f"user_{index}"
+    return {
+        'comment_id': comment_id,
+        'username': username,
+        'user_id': username,  # Instagram doesn't expose user ID easily
+        'text': text,
+        'timestamp': timestamp,
+        'likes': 0,  # Would need additional API calls
+        'replies_count': 0,
+        'platform': 'instagram'
+    }
+
+def instagram_comment_from_row(row: dict, index: int, post_url: str = '') -> dict:
+    """Turn an INSTAGRAM_COMMENT_FIELDS row into a comment dict"""
+    username = row.get('username')
+    return build_instagram_comment(index, username, row.get('text') or "", row.get('timestamp'), post_url)
+
+class _InstagramCrawlerBase:
+    """Instagram account settings and the crawl bookkeeping shared by InstagramCrawler and AsyncInstagramCrawler"""
+    
+    platform = 'instagram'
+    auth_cookie_names = ('sessionid',)
     
-    def __init__(self, headless: bool = True):
-        super().__init__(headless)
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
         self.instagram_username = os.getenv('INSTAGRAM_USERNAME', '')
         self.instagram_password = os.getenv('INSTAGRAM_PASSWORD', '')
+        self.account = self.instagram_username or None
+    
+    def _rendered_comments(self, rows: list, url: str) -> list:
+        """Comment dicts for the rows extract_rendered_comments() read"""
+        logger.info(f"Found {len(rows)} comment elements")
+        return [instagram_comment_from_row(row, idx, url) for idx, row in enumerate(rows)]
+
+class InstagramCrawler(_InstagramCrawlerBase, BaseCrawler):
+    """Instagram-specific crawler implementation"""
     
     def _login_instagram(self):
         """Auto-login to Instagram to avoid popups and CAPTCHA"""
@@ -23,37 +71,40 @@ class InstagramCrawler(BaseCrawler):
             logger.info(f"Attempting Instagram login for user: {self.instagram_username}")
             
             # Navigate to login page
-            self.page.goto('https://www.instagram.com/accounts/login/', wait_until='domcontentloaded', timeout=30000)
-            random_delay(3000, 5000)
+            self.goto(INSTAGRAM_LOGIN_URL, 'domcontentloaded', 30000)
             
             # Fill username
-            username_input = self.page.wait_for_selector('input[name="username"]', timeout=10000)
+            username_input = self.page.wait_for_selector('input[name="username"]', timeout=self.time_left_ms(10000))
             username_input.fill(self.instagram_username)
-            random_delay(1000, 2000)
+            human_jitter()
             
             # Fill password
             password_input = self.page.query_selector('input[name="password"]')
             if password_input:
                 password_input.fill(self.instagram_password)
-                random_delay(1000, 2000)
+                human_jitter()
             
             # Click login button
             login_button = self.page.query_selector('button[type="submit"]')
             if login_button:
                 login_button.click()
                 logger.info("Login button clicked, waiting for redirect...")
-                random_delay(5000, 8000)
+                try:
+                    # Done as soon as Instagram leaves the login form
+                    self.page.wait_for_url(lambda u: '/accounts/login' not in u, timeout=self.time_left_ms(15000))
+                except Exception:
+                    pass
             
             # Handle "Save Your Login Info" popup
             try:
-                self.page.click('button:has-text("Not Now")', timeout=5000)
-                random_delay(1000, 2000)
+                self.page.click('button:has-text("Not Now")', timeout=self.time_left_ms(5000))
+                human_jitter()
             except:
                 pass
             
             # Handle "Turn on Notifications" popup
             try:
-                self.page.click('button:has-text("Not Now")', timeout=5000)
+                self.page.click('button:has-text("Not Now")', timeout=self.time_left_ms(5000))
             except:
                 pass
             
@@ -81,42 +132,37 @@ class InstagramCrawler(BaseCrawler):
             self.initialize_browser()
             logger.info(f"Starting Instagram crawl for {url}")
             
-            # Auto-login if credentials provided
+            # Auto-login if credentials provided (reuses a cached session when possible)
             if self.instagram_username and self.instagram_password:
-                self._login_instagram()
+                self.ensure_session(self._login_instagram)
             
             # Navigate to post
-            self.page.goto(url, wait_until='networkidle', timeout=30000)
-            random_delay(2000, 4000)
+            self.set_phase('loading_page')
+            self.goto(url, 'networkidle', 30000)
+            human_jitter()
+            
+            # Instagram redirects to the login page when a restored session was revoked
+            if self.session_restored and '/accounts/login' in self.page.url:
+                logger.warning("Saved Instagram session was revoked - logging in again")
+                self.invalidate_session()
+                if self._login_instagram():
+                    self.save_session()
+                self.goto(url, 'networkidle', 30000)
+                human_jitter()
             
             # Try to close any popups
             try:
-                self.page.click('button:has-text("Not Now")', timeout=3000)
+                self.page.click('button:has-text("Not Now")', timeout=self.time_left_ms(3000))
             except:
                 pass
             
-            # Scroll to load comments
+            # Scroll to load comments, extracting them as they render
             logger.info("Loading comments...")
-            self._load_all_comments(max_comments)
-            
-            # Extract comments
-            comment_elements = self.page.query_selector_all('ul ul li')
-            logger.info(f"Found {len(comment_elements)} comment elements")
-            
-            for idx, element in enumerate(comment_elements[:max_comments]):
-                if idx >= max_comments:
-                    break
-                
-                try:
-                    comment_data = self._extract_instagram_comment(element, idx)
-                    if comment_data:
-                        comments.append(comment_data)
-                        logger.info(f"Extracted comment {idx + 1}/{max_comments}")
-                except Exception as e:
-                    logger.warning(f"Failed to extract comment {idx}: {e}")
-                    continue
+            self.set_phase('loading_comments')
+            comments.extend(self.harvest_comments(COMMENT_SELECTOR, INSTAGRAM_COMMENT_FIELDS, instagram_comment_from_row,
+                                                  url, max_comments, self._load_more_comments))
             
-            logger.info(f"Successfully crawled {len(comments)} comments from Instagram")
+            logger.info(f"Successfully crawled {self.emitted} comments from Instagram")
             
         except Exception as e:
             logger.error(f"Instagram crawl failed: {e}")
@@ -126,52 +172,154 @@ class InstagramCrawler(BaseCrawler):
         
         return comments
     
-    def _load_all_comments(self, max_comments: int):
-        """Scroll and click 'View more comments' to load all comments"""
-        scroll_attempts = 0
-        max_scrolls = min(max_comments // 10, 20)  # Adjust based on comments needed
+    def extract_rendered_comments(self, url: str, max_comments: int) -> list:
+        """
+        Extract the comments rendered on the page and emit them
+        
+        crawl() harvests comments while loading them instead; the extraction
+        benchmark runs this on a fully rendered page.
+        
+        Returns:
+            list: The comments emit_comments() kept
+        """
+        self.set_phase('extracting')
+        # Extract comments in a single page.evaluate round trip
+        rows = self.extract_comments_batch(COMMENT_SELECTOR, INSTAGRAM_COMMENT_FIELDS, max_comments)
+        return self.emit_comments(self._rendered_comments(rows, url))
+    
+    def _load_more_comments(self):
+        """One load-more step: scroll down and click 'View more comments' if it is shown"""
+        # Each step can fetch more comments, so it takes a rate-limit token
+        if not self.throttle('load_more'):
+            return
+        human_like_scroll(self.page, scroll_count=2)
+        try:
+            view_more = self.page.query_selector('button:has-text("View")')
+            if view_more:
+                view_more.click()
+        except:
+            pass
+
+class AsyncInstagramCrawler(_InstagramCrawlerBase, AsyncBaseCrawler):
+    """playwright.async_api version of InstagramCrawler for the async worker"""
+    
+    async def _login_instagram(self):
+        """Auto-login to Instagram to avoid popups and CAPTCHA"""
+        if not self.instagram_username or not self.instagram_password:
+            logger.info("No Instagram credentials in .env - skipping auto-login")
+            return False
         
-        while scroll_attempts < max_scrolls:
-            # Scroll down
-            human_like_scroll(self.page, scroll_count=2)
+        try:
+            logger.info(f"Attempting Instagram login for user: {self.instagram_username}")
+            
+            # Navigate to login page
+            await self.goto(INSTAGRAM_LOGIN_URL, 'domcontentloaded', 30000)
+            
+            # Fill username
+            username_input = await self.page.wait_for_selector('input[name="username"]', timeout=self.time_left_ms(10000))
+            await username_input.fill(self.instagram_username)
+            await async_human_jitter()
+            
+            # Fill password
+            password_input = await self.page.query_selector('input[name="password"]')
+            if password_input:
+                await password_input.fill(self.instagram_password)
+                await async_human_jitter()
+            
+            # Click login button
+            login_button = await self.page.query_selector('button[type="submit"]')
+            if login_button:
+                await login_button.click()
+                logger.info("Login button clicked, waiting for redirect...")
+                try:
+                    # Done as soon as Instagram leaves the login form
+                    await self.page.wait_for_url(lambda u: '/accounts/login' not in u, timeout=self.time_left_ms(15000))
+                except Exception:
+                    pass
+            
+            # Handle "Save Your Login Info" popup
+            try:
+                await self.page.click('button:has-text("Not Now")', timeout=self.time_left_ms(5000))
+                await async_human_jitter()
+            except:
+                pass
             
-            # Try to click "View more comments" button
+            # Handle "Turn on Notifications" popup
             try:
-                view_more = self.page.query_selector('button:has-text("View")')
-                if view_more:
-                    view_more.click()
-                    random_delay(1500, 2500)
+                await self.page.click('button:has-text("Not Now")', timeout=self.time_left_ms(5000))
             except:
                 pass
             
-            scroll_attempts += 1
-            random_delay(1000, 2000)
+            logger.info("✅ Instagram login successful!")
+            return True
+                
+        except Exception as e:
+            logger.error(f"Instagram login failed: {e}")
+            return False
     
-    def _extract_instagram_comment(self, element, index: int) -> dict:
-        """Extract comment data from Instagram comment element"""
+    async def crawl(self, url: str, max_comments: int) -> list:
+        """Crawl comments from an Instagram post (see InstagramCrawler)"""
+        comments = []
+        
         try:
-            # Extract username
-            username_elem = element.query_selector('a[href*="/"]')
-            username = username_elem.inner_text() if username_elem else f"user_{index}"
-            
-            # Extract comment text
-            text_elem = element.query_selector('span')
-            text = text_elem.inner_text() if text_elem else ""
-            
-            # Extract timestamp (if available)
-            time_elem = element.query_selector('time')
-            timestamp = time_elem.get_attribute('datetime') if time_elem else None
-            
-            return {
-                'comment_id': f"ig_{index}_{hash(text)}",
-                'username': username,
-                'user_id': username,  # Instagram doesn't expose user ID easily
-                'text': text,
-                'timestamp': timestamp,
-                'likes': 0,  # Would need additional API calls
-                'replies_count': 0,
-                'platform': 'instagram'
-            }
+            await self.initialize_browser()
+            logger.info(f"Starting Instagram crawl for {url}")
+            
+            # Auto-login if credentials provided (reuses a cached session when possible)
+            if self.instagram_username and self.instagram_password:
+                await self.ensure_session(self._login_instagram)
+            
+            # Navigate to post
+            await self.set_phase('loading_page')
+            await self.goto(url, 'networkidle', 30000)
+            await async_human_jitter()
+            
+            # Instagram redirects to the login page when a restored session was revoked
+            if self.session_restored and '/accounts/login' in self.page.url:
+                logger.warning("Saved Instagram session was revoked - logging in again")
+                self.invalidate_session()
+                if await self._login_instagram():
+                    await self.save_session()
+                await self.goto(url, 'networkidle', 30000)
+                await async_human_jitter()
+            
+            # Try to close any popups
+            try:
+                await self.page.click('button:has-text("Not Now")', timeout=self.time_left_ms(3000))
+            except:
+                pass
+            
+            # Scroll to load comments, extracting them as they render
+            logger.info("Loading comments...")
+            await self.set_phase('loading_comments')
+            comments.extend(await self.harvest_comments(COMMENT_SELECTOR, INSTAGRAM_COMMENT_FIELDS,
+                                                        instagram_comment_from_row, url, max_comments,
+                                                        self._load_more_comments))
+            
+            logger.info(f"Successfully crawled {self.emitted} comments from Instagram")
+            
         except Exception as e:
-            logger.error(f"Failed to parse Instagram comment: {e}")
-            return None
+            logger.error(f"Instagram crawl failed: {e}")
+            raise
+        finally:
+            await self.close_browser()
+        
+        return comments
+    
+    async def extract_rendered_comments(self, url: str, max_comments: int) -> list:
+        """Extract the comments rendered on the page and emit them (see InstagramCrawler)"""
+        await self.set_phase('extracting')
+        rows = await self.extract_comments_batch(COMMENT_SELECTOR, INSTAGRAM_COMMENT_FIELDS, max_comments)
+        return await self.emit_comments(self._rendered_comments(rows, url))
+    
+    async def _load_more_comments(self):
+        """One load-more step: scroll down and click 'View more comments' if it is shown"""
+        if not await self.throttle('load_more'):
+            return
+        await async_human_like_scroll(self.page, scroll_count=2)
+        try:
+            view_more = await self.page.query_selector('button:has-text("View")')
+            if view_more:
+                await view_more.click()
+        except:
+            pass
@@ -0,0 +1,125 @@
+import logging
+import os
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+# Path fragment of the XHR the TikTok web client uses to page through comments
+COMMENT_API_PATTERN = os.getenv('TIKTOK_COMMENT_API_PATTERN', '/api/comment/list/')
+
+# Scrolls the comment panel (or the page) so the client requests the next cursor
+SCROLL_COMMENT_LIST_SCRIPT = """
+() => {
+    const list = document.querySelector('[class*="DivCommentListContainer"]')
+        || document.querySelector('[data-e2e="comment-list"]');
+    const last = list && list.lastElementChild;
+    if (last) last.scrollIntoView({ block: 'end' });
+    window.scrollBy(0, 800);
+}
+"""
+
+def tiktok_comment_from_api(item: dict) -> dict:
+    """Convert one comment object from the comment-list JSON into our comment dict"""
+    user = item.get('user') or {}
+    username = user.get('unique_id') or user.get('nickname') or ''
+    create_time = item.get('create_time')
+    timestamp = None
+    if create_time:
+        timestamp = datetime.fromtimestamp(int(create_time), tz=timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+    
+    # Replies carry the parent comment's cid in reply_id ("0" for top-level comments)
+    reply_id = str(item.get('reply_id') or '0')
+    
+    return {
+        'comment_id': str(item.get('cid')),
+        'username': username,
+        'user_id': str(user.get('uid') or username),
+        'text': item.get('text') or '',
+        'timestamp': timestamp,
+        'likes': int(item.get('digg_count') or 0),
+        'replies_count': int(item.get('reply_comment_total') or 0),
+        'platform': 'tiktok',
+        'parent_comment_id': reply_id if reply_id != '0' else None,
+        'raw_data': {
+            'source': 'comment_api',
+            'aweme_id': item.get('aweme_id'),
+            'create_time': create_time,
+        },
+    }
+
+class TikTokCommentCapture:
+    """
+    Collects comments from TikTok's cursor-paginated comment-list responses.
+    
+    The page.on("response") listener only queues matching responses; bodies
+    are read later by collect()/async_collect() from the crawl flow, so no
+    browser round trips happen inside event handlers.
+    """
+    
+    def __init__(self, url_pattern: str = None):
+        self.url_pattern = url_pattern or COMMENT_API_PATTERN
+        self.pending = []
+        self.comments = []  # Parsed but not yet taken
+        self.count = 0
+        self.seen_ids = set()
+        self.responses = 0
+        self.cursor = None
+        self.has_more = True
+        self.total = None
+    
+    def matches(self, response) -> bool:
+        """True for successful comment-list (or reply-list) API responses"""
+        return self.url_pattern in response.url and response.status == 200
+    
+    def on_response(self, response):
+        """page.on('response') listener - queue matching responses for collect()"""
+        if self.matches(response):
+            self.pending.append(response)
+    
+    def collect(self) -> int:
+        """Parse queued responses (sync API); returns the number of new comments"""
+        added = 0
+        pending, self.pending = self.pending, []
+        for response in pending:
+            try:
+                added += self.add_payload(response.json(), response.url)
+            except Exception as e:
+                logger.debug(f"Skipping unreadable comment response: {e}")
+        return added
+    
+    async def async_collect(self) -> int:
+        """Parse queued responses (async API); returns the number of new comments"""
+        added = 0
+        pending, self.pending = self.pending, []
+        for response in pending:
+            try:
+                added += self.add_payload(await response.json(), response.url)
+            except Exception as e:
+                logger.debug(f"Skipping unreadable comment response: {e}")
+        return added
+    
+    def take(self, limit: int = None) -> list:
+        """Hand over comments not taken yet (at most limit) and drop them from the capture"""
+        taken = self.comments if limit is None else self.comments[:max(limit, 0)]
+        self.comments = []
+        return taken
+    
+    def add_payload(self, payload: dict, url: str = '') -> int:
+        """Add comments from one decoded comment-list payload, skipping ones already seen"""
+        self.responses += 1
+        added = 0
+        for item in payload.get('comments') or []:
+            if not item.get('cid') or str(item['cid']) in self.seen_ids:
+                continue
+            self.seen_ids.add(str(item['cid']))
+            self.comments.append(tiktok_comment_from_api(item))
+            added += 1
+        self.count += added
+        
+        # Only the top-level list drives pagination; reply lists have their own cursors
+        if '/reply' not in url:
+            self.cursor = payload.get('cursor', self.cursor)
+            self.has_more = bool(payload.get('has_more'))
+            self.total = payload.get('total', self.total)
+        
+        return added
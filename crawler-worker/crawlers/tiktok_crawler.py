@@ -1,19 +1,182 @@
 import logging
 import os
 from typing import List
-from crawlers.base_crawler import BaseCrawler
-from utils.anti_ban import random_delay, human_like_scroll
+from crawlers.base_crawler import BaseCrawler, AsyncBaseCrawler, field_specs
+from crawlers.tiktok_capture import TikTokCommentCapture, SCROLL_COMMENT_LIST_SCRIPT
+from utils.anti_ban import (
+    human_jitter, wait_for_any_selector,
+    async_human_jitter, async_wait_for_any_selector
+)
+from utils.fingerprint import comment_fingerprint
 
 logger = logging.getLogger(__name__)
 
-class TikTokCrawler(BaseCrawler):
-    """Crawler for TikTok comments"""
+TIKTOK_LOGIN_URL = 'https://www.tiktok.com/login/phone-or-email/email'
+
+# "network" reads comments from the comment-list API responses, "dom" scrapes the page
+TIKTOK_CAPTURE_MODE = os.getenv('TIKTOK_CAPTURE_MODE', 'network').lower()
+
+CAPTCHA_SELECTORS = [
+    'iframe[title*="CAPTCHA"]',
+    'div[id*="captcha"]',
+    '[class*="captcha"]',
+    'div:has-text("Verify you are human")',
+]
+
+# Close buttons for login popups or region blocks
+CLOSE_POPUP_SELECTORS = [
+    '[aria-label="Close"]',
+    'button[data-e2e="modal-close-inner-button"]',
+    'div[role="button"]:has-text("Close")',
+    'svg[fill="currentColor"]'
+]
+
+# TikTok sometimes defaults to the "You may like" tab
+COMMENTS_TAB_SELECTORS = [
+    'button:has-text("Comments")',
+    'div:has-text("Comments")',
+    '[data-e2e="comment-panel"]',
+    'span:has-text("评论")',  # Chinese
+    'span:has-text("Komentar")',  # Indonesian
+]
+
+# Multiple selector strategies for TikTok (they change frequently)
+COMMENT_SELECTOR_STRATEGIES = [
+    'div[class*="DivVirtualItemContainer"]',  # NEW: Based on HTML inspection (2024)
+    'div[class*="DivCommentListContainer"] > div',  # Container > direct children
+    '[data-e2e="comment-item"]',  # Original selector
+    'div[data-e2e="comment-level-1"]',  # Updated 2024 selector
+    'div[class*="CommentItem"]',  # Class-based
+    'div[class*="comment-item"]',  # Lowercase class
+    'div[class*="DivCommentItemContainer"]',  # Container class
+    '[data-testid="comment-item"]',  # Test ID based
+    'div.comment',  # Simple class selector
+]
+
+# Profile link inside a comment (most reliable username source)
+USERNAME_LINK_SELECTOR = '[data-e2e="comment-username-1"] a, div[class*="UsernameContent"] a'
+
+USERNAME_SELECTORS = [
+    '[data-e2e="comment-username-1"]',
+    '[data-e2e="comment-username"]',
+    'a[data-e2e="comment-username-1"]',
+    'span[data-e2e="comment-username"]',
+    'div[class*="UsernameContent"] p',
+    'a.link-a11y-focus',
+    'span[class*="UserName"]',
+    'span[class*="username"]',
+]
+
+TEXT_SELECTORS = [
+    'span[data-e2e="comment-level-1"]',  # CORRECT: Based on HTML inspection
+    'span[data-e2e="comment-level-1"] span',  # Nested span with actual text
+    'span[class*="TUXText"]',  # TikTok's text component
+    'span[class*="StyledText"]',  # Alternative text component
+    '[data-e2e="comment-text"]',
+    'p[data-e2e="comment-level-2"]',
+    'span[data-e2e="comment-text-content"]',
+    'p[class*="CommentText"]',
+    'span[class*="comment-text"]',
+    'p.comment-text',
+]
+
+# Field table for BaseCrawler.extract_comments_batch
+TIKTOK_COMMENT_FIELDS = {
+    'profile_href': field_specs([USERNAME_LINK_SELECTOR], attr='href'),
+    'username': field_specs(USERNAME_SELECTORS),
+    'text': field_specs(TEXT_SELECTORS),
+    'likes': field_specs(['[data-e2e="comment-like-count"]']),
+    'timestamp': field_specs(['[data-e2e="comment-time"]']),
+}
+
+def parse_count(text: str) -> int:
+    """Parse number from text (e.g., '1.2K' -> 1200)"""
+    try:
+        text = text.strip().upper()
+        if 'K' in text:
+            return int(float(text.replace('K', '')) * 1000)
+        elif 'M' in text:
+            return int(float(text.replace('M', '')) * 1000000)
+        else:
+            return int(text)
+    except:
+        return 0
+
+def build_tiktok_comment(index: int, username: str, text: str, likes_text: str, timestamp, post_url: str = '') -> dict:
+    """Assemble the comment dict sent to the Processing API (username None when it was not extracted)"""
+    # The ID never depends on the comment's position: without a username it is derived from the text alone
+    comment_id = f"tt_{comment_fingerprint('tiktok', post_url, username, text)}"
+    username = username or f"user_{index}"
+    return {
+        'comment_id': comment_id,
+        'username': username,
+        'user_id': username,
+        'text': text,
+        'timestamp': timestamp,
+        'likes': parse_count(likes_text),
+        'replies_count': 0,
+        'platform': 'tiktok'
+    }
+
+def tiktok_comment_from_row(row: dict, index: int, post_url: str = '') -> dict:
+    """Turn a TIKTOK_COMMENT_FIELDS row into a comment dict"""
+    username = None
+    
+    # Profile link href is the most reliable username source
+    href = row.get('profile_href')
+    if href and href.startswith('/@'):
+        username = href[2:]  # Remove /@ prefix
     
-    def __init__(self, headless: bool = True):
-        super().__init__(headless)
-        self.platform = 'tiktok'
+    if not username:
+        username = row.get('username')
+    
+    return build_tiktok_comment(index, username, row.get('text') or "", row.get('likes') or "0", row.get('timestamp'), post_url)
+
+class _TikTokCrawlerBase:
+    """TikTok account settings and the crawl bookkeeping shared by TikTokCrawler and AsyncTikTokCrawler"""
+    
+    platform = 'tiktok'
+    auth_cookie_names = ('sessionid', 'sid_tt')
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
         self.tiktok_username = os.getenv('TIKTOK_USERNAME', '')
         self.tiktok_password = os.getenv('TIKTOK_PASSWORD', '')
+        self.account = self.tiktok_username or None
+    
+    def _found_comment_selector(self, selector: str, match_count: int) -> str:
+        if selector:
+            logger.info(f"Found {match_count} comments using selector #{COMMENT_SELECTOR_STRATEGIES.index(selector) + 1}: {selector}")
+        return selector
+    
+    def _save_page_source(self, html: str):
+        """Dump the page HTML to inspect a structure no comment selector matches"""
+        html_path = self.debug_path('page_source.html')
+        with open(html_path, 'w', encoding='utf-8') as f:
+            f.write(html)
+        logger.error(f"Saved page HTML to {html_path} to inspect page structure")
+    
+    def _rendered_comments(self, rows: list, url: str, max_comments: int) -> list:
+        """Comment dicts for the rows extract_rendered_comments() read"""
+        batch = []
+        for idx, row in enumerate(rows):
+            comment_data = tiktok_comment_from_row(row, idx, url)
+            username = comment_data.get('username', 'unknown')
+            text = comment_data.get('text', '')
+            logger.info(f"Extracted comment {idx + 1}/{max_comments}: @{username} - '{text[:50]}...' ({len(text)} chars)")
+            batch.append(comment_data)
+        return batch
+    
+    def _wants_next_page(self, capture: TikTokCommentCapture, max_comments: int, stalls: int) -> bool:
+        """Whether _page_comment_responses() should have TikTok fetch another comment-list page"""
+        return (self.emitted < max_comments and capture.has_more and stalls < 3
+                and not self._watermark_reached() and not self.out_of_time())
+    
+    def _log_capture(self, capture: TikTokCommentCapture):
+        logger.info(f"Comment API: {capture.count} captured (total {capture.total}, has_more={capture.has_more})")
+
+class TikTokCrawler(_TikTokCrawlerBase, BaseCrawler):
+    """Crawler for TikTok comments"""
     
     def _login_tiktok(self):
         """Auto-login to TikTok to avoid CAPTCHA and popups"""
@@ -25,26 +188,29 @@ class TikTokCrawler(BaseCrawler):
             logger.info(f"Attempting TikTok login for user: {self.tiktok_username}")
             
             # Navigate to login page
-            self.page.goto('https://www.tiktok.com/login/phone-or-email/email', wait_until='domcontentloaded', timeout=30000)
-            random_delay(3000, 5000)
+            self.goto(TIKTOK_LOGIN_URL, 'domcontentloaded', 30000)
             
             # Fill username/email
-            username_input = self.page.wait_for_selector('input[name="username"]', timeout=10000)
+            username_input = self.page.wait_for_selector('input[name="username"]', timeout=self.time_left_ms(10000))
             username_input.fill(self.tiktok_username)
-            random_delay(1000, 2000)
+            human_jitter()
             
             # Fill password
             password_input = self.page.query_selector('input[type="password"]')
             if password_input:
                 password_input.fill(self.tiktok_password)
-                random_delay(1000, 2000)
+                human_jitter()
             
             # Click login button
             login_button = self.page.query_selector('button[type="submit"]')
             if login_button:
                 login_button.click()
                 logger.info("Login button clicked, waiting for redirect...")
-                random_delay(5000, 8000)  # Wait for login to complete
+                try:
+                    # Done as soon as TikTok redirects to the feed
+                    self.page.wait_for_url(lambda u: 'foryou' in u or 'following' in u, timeout=self.time_left_ms(15000))
+                except Exception:
+                    pass  # Checked below
             
             # Check if login successful (redirect to homepage)
             if 'foryou' in self.page.url or 'following' in self.page.url:
@@ -76,44 +242,53 @@ class TikTokCrawler(BaseCrawler):
             logger.info(f"Starting TikTok crawl for {url}")
             
             # Auto-login if credentials provided (avoids CAPTCHA & popups)
+            # A cached session from an earlier job skips the login form entirely
             if self.tiktok_username and self.tiktok_password:
-                self._login_tiktok()  # Login first, then navigate to video
+                self.ensure_session(self._login_tiktok)  # Login first, then navigate to video
+            
+            # Listen for the comment-list XHRs before the video page starts loading
+            capture = None
+            if TIKTOK_CAPTURE_MODE == 'network':
+                capture = TikTokCommentCapture()
+                self.page.on('response', capture.on_response)
             
             # Navigate to TikTok video (TikTok loads slowly due to heavy JS)
             # Use domcontentloaded instead of networkidle for faster initial load
+            self.set_phase('loading_page')
             try:
-                self.page.goto(url, wait_until='domcontentloaded', timeout=90000)
-                # Wait for page to stabilize
-                self.page.wait_for_timeout(3000)
+                self.goto(url, 'domcontentloaded', 90000)
                 # Wait for video player to ensure page is loaded
-                self.page.wait_for_selector('video, [data-e2e="browse-video"]', timeout=30000, state='visible')
+                self.page.wait_for_selector('video, [data-e2e="browse-video"]', timeout=self.time_left_ms(30000), state='visible')
             except Exception as e:
                 logger.warning(f"Initial page load issue: {e}. Retrying with longer timeout...")
                 # Retry with even longer timeout
-                self.page.goto(url, wait_until='load', timeout=120000)
+                self.goto(url, 'load', 120000)
             
             # Give more time for TikTok to fully load
             logger.info("Waiting for TikTok page to stabilize...")
-            random_delay(20000, 30000)  # Increased to 20-30s for very slow loading
+            if capture:
+                # Ready as soon as the first page of comments arrives
+                self._wait_for_comment_responses(capture, 30000)
+            else:
+                # Ready once comments or the comments tab have rendered
+                wait_for_any_selector(self.page, COMMENT_SELECTOR_STRATEGIES + COMMENTS_TAB_SELECTORS, self.time_left_ms(30000))
             
             # Check for CAPTCHA
             try:
-                captcha_selectors = [
-                    'iframe[title*="CAPTCHA"]',
-                    'div[id*="captcha"]',
-                    '[class*="captcha"]',
-                    'div:has-text("Verify you are human")',
-                ]
                 captcha_found = False
-                for sel in captcha_selectors:
+                for sel in CAPTCHA_SELECTORS:
                     if self.page.query_selector(sel):
                         captcha_found = True
                         break
                 
                 if captcha_found:
                     logger.warning("⚠️ CAPTCHA DETECTED! Please solve it manually in the browser window.")
-                    logger.warning("Waiting 60 seconds for manual CAPTCHA solve...")
-                    self.page.wait_for_timeout(60000)  # Wait 60s for user to solve
+                    logger.warning("Waiting up to 60 seconds for manual CAPTCHA solve...")
+                    try:
+                        # Continue as soon as the challenge disappears
+                        self.page.wait_for_selector(', '.join(CAPTCHA_SELECTORS), state='hidden', timeout=self.time_left_ms(60000))
+                    except Exception:
+                        pass
                     logger.info("Continuing after CAPTCHA wait...")
             except:
                 pass  # No CAPTCHA, continue
@@ -121,44 +296,31 @@ class TikTokCrawler(BaseCrawler):
             # Close any login popups or region blocks
             try:
                 # Try multiple selectors for close buttons
-                close_selectors = [
-                    '[aria-label="Close"]',
-                    'button[data-e2e="modal-close-inner-button"]',
-                    'div[role="button"]:has-text("Close")',
-                    'svg[fill="currentColor"]'
-                ]
-                for selector in close_selectors:
+                for selector in CLOSE_POPUP_SELECTORS:
                     close_button = self.page.query_selector(selector)
                     if close_button:
                         close_button.click()
-                        random_delay(1000, 2000)
+                        human_jitter()
                         break
             except:
                 pass
             
             # Scroll to comments section
             logger.info("Scrolling to comments section...")
+            self.set_phase('loading_comments')
             self._scroll_to_comments()
             
             # Click on Comments tab (TikTok sometimes defaults to "You may like" tab)
             logger.info("Looking for Comments tab to click...")
             try:
                 # Try to find and click Comments tab/button
-                comments_tab_selectors = [
-                    'button:has-text("Comments")',
-                    'div:has-text("Comments")',
-                    '[data-e2e="comment-panel"]',
-                    'span:has-text("评论")',  # Chinese
-                    'span:has-text("Komentar")',  # Indonesian
-                ]
-                
-                for selector in comments_tab_selectors:
+                for selector in COMMENTS_TAB_SELECTORS:
                     try:
                         tab = self.page.query_selector(selector)
                         if tab:
                             logger.info(f"Found Comments tab with selector: {selector}")
                             tab.click()
-                            random_delay(2000, 3000)
+                            wait_for_any_selector(self.page, COMMENT_SELECTOR_STRATEGIES, self.time_left_ms(5000))
                             logger.info("Clicked on Comments tab")
                             break
                     except:
@@ -170,100 +332,75 @@ class TikTokCrawler(BaseCrawler):
             logger.info("Scrolling further down to comments...")
             for _ in range(3):
                 self.page.evaluate("window.scrollBy(0, 600)")
-                random_delay(1000, 2000)
+                human_jitter()
             
             # Wait after scrolling for comments to load
             logger.info("Waiting for comments to render after scroll...")
-            random_delay(15000, 20000)  # Increased to 15-20s for very slow networks
+            if capture:
+                self._wait_for_comment_responses(capture, 20000)
+            else:
+                wait_for_any_selector(self.page, COMMENT_SELECTOR_STRATEGIES, self.time_left_ms(20000))
+            
+            if capture and capture.count:
+                # API pages carry real comment IDs, exact like counts and timestamps
+                comments.extend(self.emit_comments(capture.take(max_comments)))
+                comments.extend(self._page_comment_responses(capture, max_comments))
+                logger.info(f"✅ Captured {self.emitted} comments from {capture.responses} comment-list responses")
+                return comments
             
-            # Load more comments
-            self._load_more_comments(max_comments)
+            if capture:
+                logger.warning("No comment-list responses captured - falling back to DOM scraping")
             
             # Wait for comments to load
             logger.info("Waiting for comment elements to load...")
             try:
-                self.page.wait_for_selector('[data-e2e="comment-item"]', timeout=30000, state='visible')  # Increased to 30s
+                self.page.wait_for_selector('[data-e2e="comment-item"]', timeout=self.time_left_ms(30000), state='visible')  # Increased to 30s
                 logger.info("Comment selector found!")
             except Exception as e:
                 logger.warning(f"Comment selector not found with data-e2e. Trying alternative selectors...")
                 # Try alternative selectors
                 try:
-                    self.page.wait_for_selector('div[class*="comment"]', timeout=5000, state='visible')
+                    self.page.wait_for_selector('div[class*="comment"]', timeout=self.time_left_ms(5000), state='visible')
                     logger.info("Alternative comment selector found!")
                 except:
+                    screenshot = self.debug_path('comments.png')
                     logger.error("No comment selectors found. Taking screenshot for debugging...")
-                    self.page.screenshot(path='tiktok_debug.png')
-                    logger.error("Screenshot saved as tiktok_debug.png")
+                    self.page.screenshot(path=screenshot)
+                    logger.error(f"Screenshot saved as {screenshot}")
             
-            # Extract comments with retry logic - try multiple selectors
-            comment_elements = []
+            # Find comments with retry logic - try multiple selectors
+            comment_selector = None
             max_retries = 3
-            
-            # Multiple selector strategies for TikTok (they change frequently)
-            selector_strategies = [
-                'div[class*="DivVirtualItemContainer"]',  # NEW: Based on HTML inspection (2024)
-                'div[class*="DivCommentListContainer"] > div',  # Container > direct children
-                '[data-e2e="comment-item"]',  # Original selector
-                'div[data-e2e="comment-level-1"]',  # Updated 2024 selector
-                'div[class*="CommentItem"]',  # Class-based
-                'div[class*="comment-item"]',  # Lowercase class
-                'div[class*="DivCommentItemContainer"]',  # Container class
-                '[data-testid="comment-item"]',  # Test ID based
-                'div.comment',  # Simple class selector
-            ]
+            selector_strategies = COMMENT_SELECTOR_STRATEGIES
             
             for attempt in range(max_retries):
                 logger.info(f"Attempt {attempt + 1}/{max_retries} to find comments...")
                 
-                # Try each selector strategy
-                for idx, selector in enumerate(selector_strategies):
-                    elements = self.page.query_selector_all(selector)
-                    if elements:
-                        comment_elements = elements
-                        logger.info(f"Found {len(comment_elements)} comments using selector #{idx + 1}: {selector}")
-                        break
-                
-                if comment_elements:
+                comment_selector = self.find_comment_selector()
+                if comment_selector:
                     break
                 else:
                     if attempt < max_retries - 1:
                         logger.warning(f"No comments found on attempt {attempt + 1}, waiting and retrying...")
-                        random_delay(3000, 5000)
                         # Try scrolling again to trigger lazy loading
                         self.page.evaluate("window.scrollBy(0, 200)")
-                        random_delay(2000, 3000)
+                        wait_for_any_selector(self.page, COMMENT_SELECTOR_STRATEGIES, self.time_left_ms(5000))
             
-            if not comment_elements:
+            if not comment_selector:
                 logger.error(f"No comment elements found after {max_retries} attempts with {len(selector_strategies)} different selectors")
-                logger.error("Check tiktok_debug.png to inspect page structure")
-            else:
                 # Save HTML for manual inspection
                 try:
-                    html_content = self.page.content()
-                    with open('tiktok_page_source.html', 'w', encoding='utf-8') as f:
-                        f.write(html_content)
-                    logger.info("✅ Saved page HTML to tiktok_page_source.html for manual inspection")
+                    self._save_page_source(self.page.content())
                 except Exception as e:
                     logger.warning(f"Failed to save HTML: {e}")
             
-            for idx, element in enumerate(comment_elements[:max_comments]):
-                if idx >= max_comments:
-                    break
-                
-                try:
-                    comment_data = self._extract_tiktok_comment(element, idx)
-                    if comment_data:
-                        username = comment_data.get('username', 'unknown')
-                        text = comment_data.get('text', '')
-                        logger.info(f"Extracted comment {idx + 1}/{max_comments}: @{username} - '{text[:50]}...' ({len(text)} chars)")
-                        comments.append(comment_data)
-                    else:
-                        logger.warning(f"Failed to extract data from comment element {idx + 1}")
-                except Exception as e:
-                    logger.warning(f"Failed to extract comment {idx}: {e}")
-                    continue
+            # Load more comments, extracting them as they render
+            if comment_selector:
+                self.set_phase('loading_comments')
+                comments.extend(self.harvest_comments(comment_selector, TIKTOK_COMMENT_FIELDS, tiktok_comment_from_row,
+                                                      url, max_comments, self._load_more_comments))
             
-            logger.info(f"Successfully crawled {len(comments)} comments from TikTok")
+            logger.info(f"Successfully crawled {self.emitted} comments from TikTok")
             
         except Exception as e:
             logger.error(f"TikTok crawl failed: {e}")
@@ -273,121 +410,388 @@ class TikTokCrawler(BaseCrawler):
         
         return comments
     
+    def find_comment_selector(self) -> str:
+        """
+        First comment selector strategy that matches any node (one count round trip per strategy,
+        the strategy that matched on recent jobs first)
+        
+        Returns:
+            str: The matching selector, or None when no strategy matches yet
+        """
+        return self._found_comment_selector(*self.first_matching_selector('comment_item', COMMENT_SELECTOR_STRATEGIES))
+    
+    def extract_rendered_comments(self, url: str, max_comments: int, comment_selector: str = None) -> list:
+        """
+        Extract the comments rendered on the page and emit them
+        
+        crawl() harvests DOM comments while loading them instead; the extraction
+        benchmark runs this on a fully rendered page.
+        
+        Args:
+            url: Post URL (part of the comment fingerprint)
+            max_comments: Maximum number of comments to read
+            comment_selector: Strategy found by find_comment_selector() (probed here when None)
+            
+        Returns:
+            list: The comments emit_comments() kept
+        """
+        self.set_phase('extracting')
+        if comment_selector is None:
+            comment_selector = self.find_comment_selector()
+        # Read every comment node in a single page.evaluate round trip
+        rows = []
+        if comment_selector:
+            rows = self.extract_comments_batch(comment_selector, TIKTOK_COMMENT_FIELDS, max_comments)
+        return self.emit_comments(self._rendered_comments(rows, url, max_comments))
+    
+    def _wait_for_comment_responses(self, capture: TikTokCommentCapture, timeout: int, need_new: bool = False) -> bool:
+        """
+        Wait for a comment-list response and parse whatever has been captured
+        
+        Args:
+            capture: Capture attached to this page
+            timeout: Maximum wait in milliseconds (capped to the phase budget)
+            need_new: Wait for another response even if comments were already captured
+            
+        Returns:
+            bool: True once at least one comment has been captured
+        """
+        if not capture.pending and (need_new or not capture.count):
+            try:
+                self.page.wait_for_event('response', predicate=capture.matches, timeout=self.time_left_ms(timeout))
+            except Exception:
+                pass  # Timed out - the caller decides whether to fall back
+        capture.collect()
+        return capture.count > 0
+    
+    def _page_comment_responses(self, capture: TikTokCommentCapture, max_comments: int) -> list:
+        """
+        Scroll the comment panel so TikTok fetches the next cursor until enough comments are captured
+        
+        Each new page is emitted as soon as it arrives; returns the comments to keep.
+        Incremental crawls stop at the first page that reaches the watermark.
+        """
+        kept = []
+        stalls = 0
+        while self._wants_next_page(capture, max_comments, stalls):
+            before = capture.count
+            if not self.throttle('load_more'):
+                break
+            self.page.evaluate(SCROLL_COMMENT_LIST_SCRIPT)
+            self._wait_for_comment_responses(capture, 10000, need_new=True)
+            stalls = stalls + 1 if capture.count == before else 0
+            kept.extend(self.emit_comments(capture.take(max_comments - self.emitted)))
+            human_jitter()
+        
+        self._log_capture(capture)
+        return kept
+    
     def _scroll_to_comments(self):
         """Scroll page to reveal comments section"""
         # Slower, more human-like scrolling for TikTok
         for _ in range(4):
             self.page.evaluate("window.scrollBy(0, 400)")
-            random_delay(1500, 2500)  # Slower delays to avoid detection
+            human_jitter()  # Human-like pause between scrolls
+    
+    def _load_more_comments(self):
+        """One load-more step: click 'View more comments' when shown, otherwise scroll the comment list"""
+        # Each step can fetch more comments, so it takes a rate-limit token
+        if not self.throttle('load_more'):
+            return
+        try:
+            view_more = self.page.query_selector('button:has-text("View more")')
+            if view_more:
+                view_more.click()
+                return
+        except:
+            pass
+        self.page.evaluate(SCROLL_COMMENT_LIST_SCRIPT)
+
+class AsyncTikTokCrawler(_TikTokCrawlerBase, AsyncBaseCrawler):
+    """playwright.async_api version of TikTokCrawler for the async worker"""
     
-    def _load_more_comments(self, max_comments: int):
-        """Click 'View more comments' buttons to load additional comments"""
-        attempts = 0
-        max_attempts = min(max_comments // 20, 10)
+    async def _login_tiktok(self):
+        """Auto-login to TikTok to avoid CAPTCHA and popups"""
+        if not self.tiktok_username or not self.tiktok_password:
+            logger.info("No TikTok credentials in .env - skipping auto-login")
+            return False
         
-        while attempts < max_attempts:
-            try:
-                # Look for "View more comments" button
-                view_more = self.page.query_selector('button:has-text("View more")')
-                if view_more:
-                    view_more.click()
-                    random_delay(2000, 3000)
-                else:
-                    break
-            except:
-                break
+        try:
+            logger.info(f"Attempting TikTok login for user: {self.tiktok_username}")
             
-            attempts += 1
-            human_like_scroll(self.page, scroll_count=2)
+            # Navigate to login page
+            await self.goto(TIKTOK_LOGIN_URL, 'domcontentloaded', 30000)
+            
+            # Fill username/email
+            username_input = await self.page.wait_for_selector('input[name="username"]', timeout=self.time_left_ms(10000))
+            await username_input.fill(self.tiktok_username)
+            await async_human_jitter()
+            
+            # Fill password
+            password_input = await self.page.query_selector('input[type="password"]')
+            if password_input:
+                await password_input.fill(self.tiktok_password)
+                await async_human_jitter()
+            
+            # Click login button
+            login_button = await self.page.query_selector('button[type="submit"]')
+            if login_button:
+                await login_button.click()
+                logger.info("Login button clicked, waiting for redirect...")
+                try:
+                    # Done as soon as TikTok redirects to the feed
+                    await self.page.wait_for_url(lambda u: 'foryou' in u or 'following' in u, timeout=self.time_left_ms(15000))
+                except Exception:
+                    pass  # Checked below
+            
+            # Check if login successful (redirect to homepage)
+            if 'foryou' in self.page.url or 'following' in self.page.url:
+                logger.info("✅ TikTok login successful!")
+                return True
+            else:
+                logger.warning("⚠️ Login may have failed or requires 2FA/CAPTCHA")
+                return False
+                
+        except Exception as e:
+            logger.error(f"TikTok login failed: {e}")
+            return False
     
-    def _extract_tiktok_comment(self, element, index: int) -> dict:
-        """Extract comment data from TikTok comment element"""
+    async def crawl(self, url: str, max_comments: int) -> list:
+        """Crawl comments from a TikTok video (see TikTokCrawler)"""
+        comments = []
+        
         try:
-            # Extract username - try multiple selectors
-            username = None
-            
-            # First try: Extract from link href (most reliable)
-            username_link = element.query_selector('[data-e2e="comment-username-1"] a, div[class*="UsernameContent"] a')
-            if username_link:
-                href = username_link.get_attribute('href')
-                if href and href.startswith('/@'):
-                    username = href[2:]  # Remove /@ prefix
-            
-            # Fallback: Try text-based selectors
-            if not username:
-                username_selectors = [
-                    '[data-e2e="comment-username-1"]',
-                    '[data-e2e="comment-username"]',
-                    'a[data-e2e="comment-username-1"]',
-                    'span[data-e2e="comment-username"]',
-                    'div[class*="UsernameContent"] p',
-                    'a.link-a11y-focus',
-                    'span[class*="UserName"]',
-                    'span[class*="username"]',
-                ]
-                for sel in username_selectors:
-                    username_elem = element.query_selector(sel)
-                    if username_elem:
-                        username = username_elem.inner_text().strip()
-                        if username:
-                            break
+            await self.initialize_browser()
+            logger.info(f"Starting TikTok crawl for {url}")
             
-            if not username:
-                username = f"user_{index}"
-            
-            # Extract comment text - try multiple selectors
-            text = ""
-            text_selectors = [
-                'span[data-e2e="comment-level-1"]',  # CORRECT: Based on HTML inspection
-                'span[data-e2e="comment-level-1"] span',  # Nested span with actual text
-                'span[class*="TUXText"]',  # TikTok's text component
-                'span[class*="StyledText"]',  # Alternative text component
-                '[data-e2e="comment-text"]',
-                'p[data-e2e="comment-level-2"]',
-                'span[data-e2e="comment-text-content"]',
-                'p[class*="CommentText"]',
-                'span[class*="comment-text"]',
-                'p.comment-text',
-            ]
-            for sel in text_selectors:
-                text_elem = element.query_selector(sel)
-                if text_elem:
-                    text = text_elem.inner_text().strip()
-                    if text:
+            # Auto-login if credentials provided (avoids CAPTCHA & popups)
+            # A cached session from an earlier job skips the login form entirely
+            if self.tiktok_username and self.tiktok_password:
+                await self.ensure_session(self._login_tiktok)  # Login first, then navigate to video
+            
+            # Listen for the comment-list XHRs before the video page starts loading
+            capture = None
+            if TIKTOK_CAPTURE_MODE == 'network':
+                capture = TikTokCommentCapture()
+                self.page.on('response', capture.on_response)
+            
+            # Navigate to TikTok video (TikTok loads slowly due to heavy JS)
+            # Use domcontentloaded instead of networkidle for faster initial load
+            await self.set_phase('loading_page')
+            try:
+                await self.goto(url, 'domcontentloaded', 90000)
+                # Wait for video player to ensure page is loaded
+                await self.page.wait_for_selector('video, [data-e2e="browse-video"]', timeout=self.time_left_ms(30000), state='visible')
+            except Exception as e:
+                logger.warning(f"Initial page load issue: {e}. Retrying with longer timeout...")
+                # Retry with even longer timeout
+                await self.goto(url, 'load', 120000)
+            
+            # Give more time for TikTok to fully load
+            logger.info("Waiting for TikTok page to stabilize...")
+            if capture:
+                # Ready as soon as the first page of comments arrives
+                await self._wait_for_comment_responses(capture, 30000)
+            else:
+                # Ready once comments or the comments tab have rendered
+                await async_wait_for_any_selector(self.page, COMMENT_SELECTOR_STRATEGIES + COMMENTS_TAB_SELECTORS, self.time_left_ms(30000))
+            
+            # Check for CAPTCHA
+            try:
+                captcha_found = False
+                for sel in CAPTCHA_SELECTORS:
+                    if await self.page.query_selector(sel):
+                        captcha_found = True
                         break
+                
+                if captcha_found:
+                    logger.warning("⚠️ CAPTCHA DETECTED! Please solve it manually in the browser window.")
+                    logger.warning("Waiting up to 60 seconds for manual CAPTCHA solve...")
+                    try:
+                        # Continue as soon as the challenge disappears
+                        await self.page.wait_for_selector(', '.join(CAPTCHA_SELECTORS), state='hidden', timeout=self.time_left_ms(60000))
+                    except Exception:
+                        pass
+                    logger.info("Continuing after CAPTCHA wait...")
+            except:
+                pass  # No CAPTCHA, continue
+            
+            # Close any login popups or region blocks
+            try:
+                # Try multiple selectors for close buttons
+                for selector in CLOSE_POPUP_SELECTORS:
+                    close_button = await self.page.query_selector(selector)
+                    if close_button:
+                        await close_button.click()
+                        await async_human_jitter()
+                        break
+            except:
+                pass
+            
+            # Scroll to comments section
+            logger.info("Scrolling to comments section...")
+            await self.set_phase('loading_comments')
+            await self._scroll_to_comments()
+            
+            # Click on Comments tab (TikTok sometimes defaults to "You may like" tab)
+            logger.info("Looking for Comments tab to click...")
+            try:
+                # Try to find and click Comments tab/button
+                for selector in COMMENTS_TAB_SELECTORS:
+                    try:
+                        tab = await self.page.query_selector(selector)
+                        if tab:
+                            logger.info(f"Found Comments tab with selector: {selector}")
+                            await tab.click()
+                            await async_wait_for_any_selector(self.page, COMMENT_SELECTOR_STRATEGIES, self.time_left_ms(5000))
+                            logger.info("Clicked on Comments tab")
+                            break
+                    except:
+                        continue
+            except Exception as e:
+                logger.warning(f"Could not find/click Comments tab: {e}")
+            
+            # Scroll more to ensure we're in comments section
+            logger.info("Scrolling further down to comments...")
+            for _ in range(3):
+                await self.page.evaluate("window.scrollBy(0, 600)")
+                await async_human_jitter()
+            
+            # Wait after scrolling for comments to load
+            logger.info("Waiting for comments to render after scroll...")
+            if capture:
+                await self._wait_for_comment_responses(capture, 20000)
+            else:
+                await async_wait_for_any_selector(self.page, COMMENT_SELECTOR_STRATEGIES, self.time_left_ms(20000))
+            
+            if capture and capture.count:
+                # API pages carry real comment IDs, exact like counts and timestamps
+                comments.extend(await self.emit_comments(capture.take(max_comments)))
+                comments.extend(await self._page_comment_responses(capture, max_comments))
+                logger.info(f"✅ Captured {self.emitted} comments from {capture.responses} comment-list responses")
+                return comments
+            
+            if capture:
+                logger.warning("No comment-list responses captured - falling back to DOM scraping")
+            
+            # Wait for comments to load
+            logger.info("Waiting for comment elements to load...")
+            try:
+                await self.page.wait_for_selector('[data-e2e="comment-item"]', timeout=self.time_left_ms(30000), state='visible')  # Increased to 30s
+                logger.info("Comment selector found!")
+            except Exception as e:
+                logger.warning(f"Comment selector not found with data-e2e. Trying alternative selectors...")
+                # Try alternative selectors
+                try:
+                    await self.page.wait_for_selector('div[class*="comment"]', timeout=self.time_left_ms(5000), state='visible')
+                    logger.info("Alternative comment selector found!")
+                except:
+                    screenshot = self.debug_path('comments.png')
+                    logger.error("No comment selectors found. Taking screenshot for debugging...")
+                    await self.page.screenshot(path=screenshot)
+                    logger.error(f"Screenshot saved as {screenshot}")
+            
+            # Find comments with retry logic - try multiple selectors
+            comment_selector = None
+            max_retries = 3
+            selector_strategies = COMMENT_SELECTOR_STRATEGIES
+            
+            for attempt in range(max_retries):
+                logger.info(f"Attempt {attempt + 1}/{max_retries} to find comments...")
+                
+                comment_selector = await self.find_comment_selector()
+                if comment_selector:
+                    break
+                else:
+                    if attempt < max_retries - 1:
+                        logger.warning(f"No comments found on attempt {attempt + 1}, waiting and retrying...")
+                        # Try scrolling again to trigger lazy loading
+                        await self.page.evaluate("window.scrollBy(0, 200)")
+                        await async_wait_for_any_selector(self.page, COMMENT_SELECTOR_STRATEGIES, self.time_left_ms(5000))
+            
+            if not comment_selector:
+                logger.error(f"No comment elements found after {max_retries} attempts with {len(selector_strategies)} different selectors")
+                # Save HTML for manual inspection
+                try:
+                    self._save_page_source(await self.page.content())
+                except Exception as e:
+                    logger.warning(f"Failed to save HTML: {e}")
+            
+            # Load more comments, extracting them as they render
+            if comment_selector:
+                await self.set_phase('loading_comments')
+                comments.extend(await self.harvest_comments(comment_selector, TIKTOK_COMMENT_FIELDS,
+                                                            tiktok_comment_from_row, url, max_comments,
+                                                            self._load_more_comments))
+            
+            logger.info(f"Successfully crawled {self.emitted} comments from TikTok")
             
-            # Extract likes count
-            likes_elem = element.query_selector('[data-e2e="comment-like-count"]')
-            likes_text = likes_elem.inner_text() if likes_elem else "0"
-            likes = self._parse_number(likes_text)
-            
-            # Extract timestamp
-            time_elem = element.query_selector('[data-e2e="comment-time"]')
-            timestamp = time_elem.inner_text() if time_elem else None
-            
-            return {
-                'comment_id': f"tt_{index}_{hash(text)}",
-                'username': username,
-                'user_id': username,
-                'text': text,
-                'timestamp': timestamp,
-                'likes': likes,
-                'replies_count': 0,
-                'platform': 'tiktok'
-            }
         except Exception as e:
-            logger.error(f"Failed to parse TikTok comment: {e}")
-            return None
+            logger.error(f"TikTok crawl failed: {e}")
+            raise
+        finally:
+            await self.close_browser()
+        
+        return comments
+    
+    async def find_comment_selector(self) -> str:
+        """First comment selector strategy that matches any node (see TikTokCrawler)"""
+        return self._found_comment_selector(*await self.first_matching_selector('comment_item', COMMENT_SELECTOR_STRATEGIES))
     
-    def _parse_number(self, text: str) -> int:
-        """Parse number from text (e.g., '1.2K' -> 1200)"""
+    async def extract_rendered_comments(self, url: str, max_comments: int, comment_selector: str = None) -> list:
+        """Extract the comments rendered on the page and emit them (see TikTokCrawler)"""
+        await self.set_phase('extracting')
+        if comment_selector is None:
+            comment_selector = await self.find_comment_selector()
+        # Read every comment node in a single page.evaluate round trip
+        rows = []
+        if comment_selector:
+            rows = await self.extract_comments_batch(comment_selector, TIKTOK_COMMENT_FIELDS, max_comments)
+        return await self.emit_comments(self._rendered_comments(rows, url, max_comments))
+    
+    async def _wait_for_comment_responses(self, capture: TikTokCommentCapture, timeout: int, need_new: bool = False) -> bool:
+        """Wait for a comment-list response and parse whatever has been captured (see TikTokCrawler)"""
+        if not capture.pending and (need_new or not capture.count):
+            try:
+                await self.page.wait_for_event('response', predicate=capture.matches, timeout=self.time_left_ms(timeout))
+            except Exception:
+                pass  # Timed out - the caller decides whether to fall back
+        await capture.async_collect()
+        return capture.count > 0
+    
+    async def _page_comment_responses(self, capture: TikTokCommentCapture, max_comments: int) -> list:
+        """Scroll the comment panel so TikTok fetches the next cursor until enough comments are captured (see TikTokCrawler)"""
+        kept = []
+        stalls = 0
+        while self._wants_next_page(capture, max_comments, stalls):
+            before = capture.count
+            if not await self.throttle('load_more'):
+                break
+            await self.page.evaluate(SCROLL_COMMENT_LIST_SCRIPT)
+            await self._wait_for_comment_responses(capture, 10000, need_new=True)
+            stalls = stalls + 1 if capture.count == before else 0
+            kept.extend(await self.emit_comments(capture.take(max_comments - self.emitted)))
+            await async_human_jitter()
+        
+        self._log_capture(capture)
+        return kept
+    
+    async def _scroll_to_comments(self):
+        """Scroll page to reveal comments section"""
+        # Slower, more human-like scrolling for TikTok
+        for _ in range(4):
+            await self.page.evaluate("window.scrollBy(0, 400)")
+            await async_human_jitter()  # Human-like pause between scrolls
+    
+    async def _load_more_comments(self):
+        """One load-more step: click 'View more comments' when shown, otherwise scroll the comment list"""
+        if not await self.throttle('load_more'):
+            return
         try:
-            text = text.strip().upper()
-            if 'K' in text:
-                return int(float(text.replace('K', '')) * 1000)
-            elif 'M' in text:
-                return int(float(text.replace('M', '')) * 1000000)
-            else:
-                return int(text)
+            view_more = await self.page.query_selector('button:has-text("View more")')
+            if view_more:
+                await view_more.click()
+                return
         except:
-            return 0
+            pass
+        await self.page.evaluate(SCROLL_COMMENT_LIST_SCRIPT)
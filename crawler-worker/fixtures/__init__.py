@@ -0,0 +1 @@
+# Offline fixtures for replaying platform pages
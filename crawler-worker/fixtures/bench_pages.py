@@ -0,0 +1,93 @@
+import html
+import random
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+
+# Comment counts the extraction benchmark runs by default
+BENCH_SIZES = (100, 1000, 10000)
+
+PLATFORMS = ('tiktok', 'instagram', 'facebook')
+
+WORDS = (
+    'enak', 'banget', 'resepnya', 'mantap', 'coba', 'besok', 'wow', 'keren', 'makasih', 'kak',
+    'love', 'this', 'so', 'good', 'where', 'can', 'I', 'buy', 'it', 'please', 'share', 'the',
+    'recipe', 'lucu', 'sekali', 'haha', 'setuju', 'info', 'dong', 'nice', 'video', '🔥', '😍', '👍',
+)
+
+PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{platform} benchmark fixture ({count} comments)</title>
+</head>
+<body>
+{body}
+</body>
+</html>
+"""
+
+def _comments(platform: str, count: int):
+    """Deterministic (username, text, likes, time) tuples - same page on every run"""
+    rng = random.Random(f"{platform}:{count}")
+    start = datetime(2024, 3, 1, tzinfo=timezone.utc)
+    for i in range(count):
+        username = f"user_{rng.randrange(10 ** 6):06d}"
+        text = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(3, 40)))
+        likes = rng.choice((str(rng.randint(0, 999)), f"{rng.randint(1, 99)}.{rng.randint(0, 9)}K"))
+        yield username, text, likes, start + timedelta(minutes=i)
+
+def _tiktok(count: int) -> str:
+    # Same markup the replayed video.html renders from comment-list responses
+    items = []
+    for username, text, likes, created in _comments('tiktok', count):
+        items.append(
+            '<div data-e2e="comment-item">'
+            f'<div data-e2e="comment-username-1"><a href="/@{username}">{username.upper()}</a></div>'
+            f'<span data-e2e="comment-level-1">{html.escape(text)}</span>'
+            f'<span data-e2e="comment-like-count">{likes}</span>'
+            f'<span data-e2e="comment-time">{created:%Y-%m-%d}</span>'
+            '</div>'
+        )
+    return ('<video data-e2e="browse-video" width="320" height="180"></video>'
+            f'<div class="DivCommentListContainer" data-e2e="comment-list">{"".join(items)}</div>')
+
+def _instagram(count: int) -> str:
+    items = []
+    for username, text, _, created in _comments('instagram', count):
+        items.append(
+            f'<li><a href="/{username}/">{username}</a> <span>{html.escape(text)}</span> '
+            f'<time datetime="{created.isoformat()}">{created:%b %d}</time></li>'
+        )
+    return f'<article><ul><li><ul>{"".join(items)}</ul></li></ul></article>'
+
+def _facebook(count: int) -> str:
+    items = []
+    for username, text, _, created in _comments('facebook', count):
+        items.append(
+            f'<div role="article"><a role="link" href="/{username}">{username}</a>'
+            f'<div data-ad-preview="message">{html.escape(text)}<abbr data-utime="{int(created.timestamp())}"></abbr></div>'
+            '</div>'
+        )
+    return f'<div role="feed">{"".join(items)}</div>'
+
+RENDERERS = {
+    'tiktok': _tiktok,
+    'instagram': _instagram,
+    'facebook': _facebook,
+}
+
+@lru_cache(maxsize=16)
+def render_page(platform: str, count: int) -> bytes:
+    """
+    A post page with count comments in the platform's comment markup
+    
+    Args:
+        platform: tiktok, instagram or facebook
+        count: Number of comment nodes
+    
+    Returns:
+        bytes: UTF-8 HTML
+    """
+    if platform not in RENDERERS:
+        raise KeyError(platform)
+    return PAGE.format(platform=platform, count=count, body=RENDERERS[platform](count)).encode('utf-8')
@@ -0,0 +1,101 @@
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+class ProcessingStubHandler(BaseHTTPRequestHandler):
+    """
+    Accepts chunked uploads like the Processing API's POST /api/process,
+    without a database: every comment counts as processed
+    
+    Routes:
+        POST /api/process -> {"processed": n, "duplicates": 0}
+        GET  /health      -> {"status": "healthy"}
+    """
+    
+    def do_POST(self):
+        if self.path.rstrip('/') != '/api/process':
+            self._send_json(404, {'error': 'Not found'})
+            return
+        try:
+            payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            job_id = payload['job_id']
+            comments = payload.get('comments') or []
+        except (KeyError, TypeError, ValueError) as e:
+            self._send_json(400, {'error': 'Invalid request format', 'details': str(e)})
+            return
+        
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.server.stub.record(job_id, len(comments), payload.get('complete', True))
+        self._send_json(200, {'processed': len(comments), 'duplicates': 0})
+    
+    def do_GET(self):
+        if self.path.rstrip('/') == '/health':
+            self._send_json(200, {'status': 'healthy'})
+        else:
+            self._send_json(404, {'error': 'Not found'})
+    
+    def _send_json(self, status: int, body: dict):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+class ProcessingStub:
+    """
+    Runs ProcessingStubHandler on a background thread and remembers, per job,
+    when its first and final chunk arrived (port 0 picks a free port)
+    """
+    
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency_ms: int = 0):
+        self.httpd = ThreadingHTTPServer((host, port), ProcessingStubHandler)
+        self.httpd.stub = self
+        self.httpd.latency = latency_ms / 1000
+        self.thread = None
+        self.uploads = {}
+        self._lock = threading.Lock()
+    
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/api/process"
+    
+    def record(self, job_id: str, comments: int, complete: bool):
+        now = time.time()
+        with self._lock:
+            upload = self.uploads.setdefault(job_id, {'first_chunk_at': now, 'completed_at': None,
+                                                      'chunks': 0, 'comments': 0})
+            upload['chunks'] += 1
+            upload['comments'] += comments
+            if complete:
+                upload['completed_at'] = now
+    
+    def upload(self, job_id: str) -> dict:
+        """Chunks and comments received for a job and when (None before its first chunk)"""
+        with self._lock:
+            upload = self.uploads.get(job_id)
+            return dict(upload) if upload else None
+    
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+    
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, *exc):
+        self.stop()
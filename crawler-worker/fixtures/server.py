@@ -0,0 +1,113 @@
+import argparse
+import json
+import logging
+import os
+import threading
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+from fixtures.bench_pages import render_page
+
+logger = logging.getLogger(__name__)
+
+FIXTURES_DIR = os.path.dirname(os.path.abspath(__file__))
+
+class FixtureRequestHandler(SimpleHTTPRequestHandler):
+    """
+    Serves recorded platform pages and API responses from the fixtures directory
+    
+    Routes:
+        /@<user>/video/<id>   -> tiktok/video.html
+        /api/comment/list/    -> tiktok/comment_list/cursor_<cursor>.json
+        /bench/<platform>/<n> -> generated post page with n comments (fixtures.bench_pages)
+        anything else         -> static file under fixtures/
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, directory=FIXTURES_DIR, **kwargs)
+    
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        
+        if parsed.path.startswith('/api/comment/list/'):
+            cursor = parse_qs(parsed.query).get('cursor', ['0'])[0]
+            self._send_comment_page(cursor)
+        elif parsed.path.startswith('/bench/'):
+            self._send_bench_page(parsed.path)
+        elif parsed.path.startswith('/@') and '/video/' in parsed.path:
+            self.path = '/tiktok/video.html'
+            super().do_GET()
+        else:
+            super().do_GET()
+    
+    def _send_comment_page(self, cursor: str):
+        """Replay one recorded comment-list page (an empty last page past the recording)"""
+        path = os.path.join(FIXTURES_DIR, 'tiktok', 'comment_list', f"cursor_{int(cursor)}.json")
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                body = f.read()
+        else:
+            body = json.dumps({'status_code': 0, 'cursor': int(cursor), 'has_more': 0, 'comments': []}).encode()
+        
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def _send_bench_page(self, path: str):
+        """Serve a generated benchmark page (/bench/<platform>/<count>)"""
+        try:
+            _, _, platform, count = path.rstrip('/').split('/')
+            body = render_page(platform, int(count))
+        except (KeyError, ValueError):
+            self.send_error(404, 'Expected /bench/<tiktok|instagram|facebook>/<count>')
+            return
+        
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+class FixtureServer:
+    """Runs FixtureRequestHandler on a background thread (port 0 picks a free port)"""
+    
+    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+        self.httpd = ThreadingHTTPServer((host, port), FixtureRequestHandler)
+        self.thread = None
+    
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+    
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, *exc):
+        self.stop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Serve recorded platform fixtures for offline crawls')
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+    
+    server = FixtureServer(port=args.port)
+    print(f"Serving fixtures on {server.url} (e.g. {server.url}/@dapur_rina/video/7351234567890000000)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
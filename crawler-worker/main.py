@@ -1,13 +1,28 @@
 import redis
-import json
 import logging
-import os
+import signal
 import sys
-import requests
 from dotenv import load_dotenv
+
+# Load environment variables before the crawler modules read their settings
+load_dotenv('../.env')
+
 from crawlers.instagram_crawler import InstagramCrawler
 from crawlers.tiktok_crawler import TikTokCrawler
 from crawlers.facebook_crawler import FacebookCrawler
+from utils.browser_pool import BrowserPool
+from utils.deadline import Deadline, Watchdog
+from utils.fingerprint import COMMENT_FILTER, CommentFilter
+from utils.job_queue import JobQueue
+from utils.job_state import JobState
+from utils.metrics import JOBS_IN_PROGRESS, record_browser_pool, record_job, start_metrics_server
+from utils.rate_limiter import RATE_LIMIT, RateLimiter
+from utils.selector_cache import SELECTOR_CACHE, SelectorCache
+from utils.session_store import SessionStore
+from utils.tracing import trace_for_job
+from utils.watermark import Watermark
+from utils.uploader import ChunkedUpload, UploadError, create_session
+from worker_config import REDIS_HOST, REDIS_PORT, HEADLESS, PROCESSING_API_URL, redis_options
 
 # Setup logging
 logging.basicConfig(
@@ -16,59 +31,35 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Load environment variables
-load_dotenv('../.env')
+# Initialize Redis client
+redis_client = redis.Redis(**redis_options())
 
-# Configuration
-REDIS_HOST = os.getenv('REDIS_HOST', 'localhost')
-REDIS_PORT = int(os.getenv('REDIS_PORT', 6379))
-REDIS_PASSWORD = os.getenv('REDIS_PASSWORD', '')
-PROCESSING_API_URL = f"http://localhost:{os.getenv('PROCESSING_API_PORT', '8081')}/api/process"
+# Long-lived browser shared by every job this worker process runs
+browser_pool = BrowserPool(headless=HEADLESS)
 
-# Initialize Redis client
-redis_client = redis.Redis(
-    host=REDIS_HOST,
-    port=REDIS_PORT,
-    password=REDIS_PASSWORD if REDIS_PASSWORD else None,
-    decode_responses=True
-)
+# Login sessions cached on disk and shared with other worker processes
+session_store = SessionStore()
 
-def update_job_status(job_id: str, status: str, error_message: str = None):
-    """Update job status in Redis"""
-    try:
-        redis_client.set(f"job_status:{job_id}", status, ex=86400)  # 24 hours
-        
-        if error_message:
-            job_data = redis_client.get(f"job_data:{job_id}")
-            if job_data:
-                job_dict = json.loads(job_data)
-                job_dict['error_message'] = error_message
-                job_dict['status'] = status
-                redis_client.set(f"job_data:{job_id}", json.dumps(job_dict), ex=86400)
-        
-        logger.info(f"Updated job {job_id} status to: {status}")
-    except Exception as e:
-        logger.error(f"Failed to update job status: {e}")
+# Keep-alive connections to the Processing API, reused by every upload
+processing_session = create_session()
 
-def send_to_processing_api(job_id: str, comments: list):
-    """Send crawled comments to Processing API"""
-    try:
-        payload = {
-            'job_id': job_id,
-            'comments': comments
-        }
-        
-        response = requests.post(PROCESSING_API_URL, json=payload, timeout=30)
-        
-        if response.status_code == 200:
-            logger.info(f"Successfully sent {len(comments)} comments to Processing API")
-            return True
-        else:
-            logger.error(f"Processing API error: {response.status_code} - {response.text}")
-            return False
-    except Exception as e:
-        logger.error(f"Failed to send data to Processing API: {e}")
-        return False
+# Cross-worker filter of comments already delivered to the Processing API
+comment_filter = CommentFilter(redis_client) if COMMENT_FILTER else None
+
+# Per-platform request budget shared by every worker
+rate_limiter = RateLimiter(redis_client) if RATE_LIMIT else None
+
+# Which selector strategies matched recently, learned across jobs and workers
+selector_cache = SelectorCache(redis_client) if SELECTOR_CACHE else None
+
+def update_job_status(job_id: str, status: str, error_message: str = None, phase: str = None):
+    """Update job status in the job's Redis hash (one pipelined round trip)"""
+    JobState(redis_client, job_id).set_status(status, error_message, phase)
+
+def fail_dead_letter_job(job_data: dict):
+    """Mark a job that kept killing its workers as failed (it is not retried again)"""
+    update_job_status(job_data.get('job_id'), 'failed', 'Job was abandoned by crashed workers too many times')
+    record_job(job_data.get('platform'), 'failed', 'dead_letter')
 
 def process_crawl_job(job_data: dict):
     """Process a single crawl job"""
@@ -79,47 +70,119 @@ def process_crawl_job(job_data: dict):
     
     logger.info(f"Processing job {job_id}: {platform} - {target_url}")
     
-    # Update status to processing
-    update_job_status(job_id, 'processing')
+    # Monitor runs only emit comments newer than the post's watermark
+    watermark = None
+    if job_data.get('incremental') and job_data.get('dedupe_key'):
+        watermark = Watermark(redis_client, job_data['dedupe_key']).load()
+    
+    # Update status to processing; crawler and upload report live progress to the same hash
+    job_state = JobState(redis_client, job_id)
+    job_state.set_status('processing', phase='starting')
+    
+    # Per-phase budgets within WORKER_TIMEOUT; the watchdog kills the browser under a hung call
+    deadline = Deadline()
+    watchdog = Watchdog(deadline, browser_pool.kill).start()
+    # Span timeline (and cProfile + Playwright trace) for jobs submitted with trace/profile
+    trace = trace_for_job(job_data)
+    outcome, reason = 'failed', 'crawl'
+    JOBS_IN_PROGRESS.inc()
     
     try:
+        # Comments are streamed to the Processing API in chunks while the crawl runs
+        upload = ChunkedUpload(job_id, processing_session, PROCESSING_API_URL, job_state=job_state,
+                               comment_filter=comment_filter, deadline=deadline, trace=trace)
+        
         # Select appropriate crawler
         crawler = None
+        crawler_options = dict(headless=HEADLESS, browser_pool=browser_pool, session_store=session_store,
+                               comment_sink=upload, job_state=job_state, watermark=watermark,
+                               rate_limiter=rate_limiter, deadline=deadline, trace=trace,
+                               selector_cache=selector_cache)
         if platform == 'instagram':
-            crawler = InstagramCrawler(headless=False)  # Visual debugging
+            crawler = InstagramCrawler(**crawler_options)
         elif platform == 'tiktok':
-            crawler = TikTokCrawler(headless=False)  # Visual debugging enabled
+            crawler = TikTokCrawler(**crawler_options)
         elif platform == 'facebook':
-            crawler = FacebookCrawler(headless=False)  # Visual debugging
+            crawler = FacebookCrawler(**crawler_options)
         else:
             raise ValueError(f"Unsupported platform: {platform}")
         
         # Perform crawl
         logger.info(f"Starting crawl with {crawler.__class__.__name__}")
-        comments = crawler.crawl(target_url, max_comments)
+        try:
+            crawler.crawl(target_url, max_comments)
+        except Exception as e:
+            # Out of time: keep whatever was extracted before the deadline
+            if not deadline.ran_out():
+                raise
+            logger.warning(f"⏱️ Crawl of job {job_id} cut short: {e}")
+        logger.info(f"🧭 Browser pool stats: {browser_pool.stats()}")
+        if selector_cache:
+            logger.info(f"🎯 Selector cache stats: {selector_cache.stats()}")
+        partial = deadline.exceeded is not None
         
-        if not comments:
-            logger.warning(f"No comments found for job {job_id}")
-            update_job_status(job_id, 'completed')
+        if upload.total == 0:
+            if partial:
+                raise TimeoutError(deadline.message())
+            logger.warning(f"No {'new ' if watermark else ''}comments found for job {job_id}")
+            if watermark:
+                watermark.save()
+            job_state.set_status('completed', phase='done')
+            outcome = 'completed'
             return
         
-        # Send to Processing API
-        success = send_to_processing_api(job_id, comments)
-        
-        if success:
-            update_job_status(job_id, 'completed')
-            logger.info(f"Job {job_id} completed successfully with {len(comments)} comments")
-        else:
-            update_job_status(job_id, 'failed', 'Failed to send data to Processing API')
+        # Send the last chunk with the complete marker
+        deadline.enter('uploading')
+        if trace:
+            trace.phase('uploading')
+        job_state.set_phase('uploading')
+        upload.finish()
+        # A partial run may have skipped comments between this run and the last, so the
+        # watermark stays put and the next run crawls past them again
+        if watermark and not partial:
+            watermark.save()
+        job_state.set_status('completed', deadline.message() if partial else None, phase='done', partial=partial)
+        outcome = 'partial' if partial else 'completed'
+        logger.info(f"Job {job_id} completed {'with partial results ' if partial else 'successfully '}with {upload.sent} comments in {upload.chunk_index} chunk(s) ({upload.skipped} already stored)")
     
+    except UploadError as e:
+        logger.error(f"Job {job_id} failed: {e}")
+        job_state.set_status('failed', 'Failed to send data to Processing API')
+        reason = 'upload'
     except Exception as e:
         error_msg = f"Crawl failed: {str(e)}"
         logger.error(f"Job {job_id} failed: {error_msg}")
-        update_job_status(job_id, 'failed', error_msg)
+        job_state.set_status('failed', error_msg)
+        if deadline.exceeded is not None:
+            reason = 'deadline'
+    finally:
+        watchdog.stop()
+        JOBS_IN_PROGRESS.dec()
+        record_job(platform, outcome, reason, deadline.finish())
+        record_browser_pool(browser_pool.stats())
+        if trace:
+            trace.finish(outcome=outcome)
+
+# Set by SIGTERM: finish the job in hand, then exit instead of taking another
+shutdown_requested = False
+
+def request_shutdown(signum=None, frame=None):
+    """Signal handler that lets the current job drain before the worker exits"""
+    global shutdown_requested
+    shutdown_requested = True
+    logger.info("🛑 Shutdown requested - finishing in-flight job before exiting")
 
-def main():
-    """Main worker loop - listens to Redis queue and processes jobs"""
+def main(jobs_counter=None):
+    """
+    Main worker loop - listens to Redis queue and processes jobs
+    
+    Args:
+        jobs_counter: Optional shared multiprocessing.Value incremented per finished job
+    """
+    signal.signal(signal.SIGTERM, request_shutdown)
+    
     logger.info("🚀 Crawler Worker started")
+    start_metrics_server()
     logger.info(f"📡 Connected to Redis at {REDIS_HOST}:{REDIS_PORT}")
     logger.info("⏳ Waiting for jobs...")
     
@@ -131,20 +194,31 @@ def main():
         logger.error(f"❌ Failed to connect to Redis: {e}")
         sys.exit(1)
     
+    # Jobs stay pending in the consumer group until acked, so a crash never loses one
+    job_queue = JobQueue(redis_client, on_dead_letter=fail_dead_letter_job)
+    job_queue.ensure_group()
+    heartbeat = job_queue.start_heartbeat()
+    prefetched = []
+    
     # Main worker loop
-    while True:
+    while not shutdown_requested:
         try:
-            # Block and wait for job from queue (BRPOP for blocking right pop)
-            result = redis_client.brpop('crawl_jobs', timeout=5)
+            # Block and wait for up to QUEUE_PREFETCH jobs
+            if not prefetched:
+                prefetched = job_queue.fetch(block_ms=5000)
+                if not prefetched:
+                    continue
+            
+            entry, job_data = prefetched.pop(0)
+            logger.info(f"📥 Received new job: {job_data.get('job_id')}")
+            
+            # Process the job, then ack it so it is not handed out again
+            process_crawl_job(job_data)
+            job_queue.ack(entry)
             
-            if result:
-                queue_name, job_json = result
-                job_data = json.loads(job_json)
-                
-                logger.info(f"📥 Received new job: {job_data.get('job_id')}")
-                
-                # Process the job
-                process_crawl_job(job_data)
+            if jobs_counter is not None:
+                with jobs_counter.get_lock():
+                    jobs_counter.value += 1
             
         except KeyboardInterrupt:
             logger.info("Worker stopped by user")
@@ -152,6 +226,17 @@ def main():
         except Exception as e:
             logger.error(f"Worker error: {e}")
             continue
+    
+    # Prefetched jobs that never started go back to the queue for other workers
+    for entry, job_data in prefetched:
+        try:
+            job_queue.release(entry, job_data)
+        except Exception as e:
+            logger.warning(f"Failed to release job {job_data.get('job_id')}: {e}")
+    heartbeat.set()
+    
+    browser_pool.close()
+    logger.info("👋 Worker exited")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,194 @@
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import tempfile
+import time
+import redis
+from dotenv import load_dotenv
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('supervisor')
+
+# Load environment variables before the worker modules read their settings
+load_dotenv('../.env')
+
+from utils.deadline import job_budget
+from worker_config import redis_options
+
+# Configuration
+WORKER_PROCESSES = int(os.getenv('WORKER_PROCESSES', 0)) or os.cpu_count() or 1
+WORKER_MODE = os.getenv('WORKER_MODE', 'sync')
+# How long SIGTERM waits for in-flight jobs before children are killed: a job's full deadline
+DRAIN_TIMEOUT = int(job_budget())
+STATS_INTERVAL = 60
+# Crash-loop protection: back off when a slot restarts this often per minute
+MAX_RESTARTS_PER_MINUTE = 5
+# Port of the /metrics endpoint merging every worker's metrics (0 = off)
+METRICS_PORT = int(os.getenv('METRICS_PORT', 9464))
+
+def run_worker(mode: str, jobs_counter):
+    """Child process entry point - runs one sync or async worker loop"""
+    # Ctrl+C reaches the whole process group; only the supervisor reacts to it
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    
+    if mode == 'async':
+        import asyncio
+        import async_worker
+        asyncio.run(async_worker.main(jobs_counter=jobs_counter))
+    else:
+        import main as worker
+        worker.main(jobs_counter=jobs_counter)
+
+class WorkerSupervisor:
+    """Runs N worker processes, restarts crashed ones and drains them on shutdown"""
+    
+    def __init__(self, processes: int, mode: str):
+        self.processes = processes
+        self.mode = mode
+        self.ctx = multiprocessing.get_context('spawn')
+        self.jobs_counter = self.ctx.Value('l', 0)
+        self.workers = {}  # slot -> Process
+        self.restart_times = {}  # slot -> recent restart timestamps
+        self.stopping = False
+        self.started_at = time.time()
+        self.stats_key = f"worker_supervisor:{socket.gethostname()}:{os.getpid()}"
+        self.metrics_dir = None
+        self.redis_client = redis.Redis(**redis_options())
+    
+    def start_worker(self, slot: int):
+        """Spawn the worker process for a slot"""
+        process = self.ctx.Process(
+            target=run_worker,
+            args=(self.mode, self.jobs_counter),
+            name=f"crawler-worker-{slot}"
+        )
+        process.start()
+        self.workers[slot] = process
+        logger.info(f"▶️ Started {process.name} (pid {process.pid}, {self.mode} mode)")
+    
+    def request_stop(self, signum=None, frame=None):
+        """Signal handler - stop restarting children and begin draining"""
+        if not self.stopping:
+            logger.info("🛑 Shutdown requested - draining workers")
+        self.stopping = True
+    
+    def run(self):
+        """Supervise workers until SIGTERM/SIGINT, then drain them"""
+        signal.signal(signal.SIGTERM, self.request_stop)
+        signal.signal(signal.SIGINT, self.request_stop)
+        
+        logger.info(f"🚀 Supervisor starting {self.processes} worker process(es)")
+        if METRICS_PORT:
+            self._start_metrics_server()
+        for slot in range(self.processes):
+            self.start_worker(slot)
+        
+        last_stats_at = time.time()
+        last_jobs = 0
+        while not self.stopping:
+            time.sleep(1)
+            self._restart_dead_workers()
+            
+            now = time.time()
+            if now - last_stats_at >= STATS_INTERVAL:
+                jobs = self.jobs_counter.value
+                self._report_stats(jobs, (jobs - last_jobs) * 60 / (now - last_stats_at))
+                last_stats_at, last_jobs = now, jobs
+        
+        self._drain()
+    
+    def _restart_dead_workers(self):
+        """Replace children that exited while we are not shutting down"""
+        for slot, process in list(self.workers.items()):
+            if process.is_alive() or self.stopping:
+                continue
+            
+            now = time.time()
+            recent = [t for t in self.restart_times.get(slot, []) if now - t < 60]
+            if len(recent) >= MAX_RESTARTS_PER_MINUTE:
+                continue  # Crash loop - retry once the window has passed
+            recent.append(now)
+            self.restart_times[slot] = recent
+            
+            logger.warning(f"💥 {process.name} (pid {process.pid}) exited with code {process.exitcode} - restarting")
+            if self.metrics_dir:
+                from prometheus_client import multiprocess
+                multiprocess.mark_process_dead(process.pid)
+            self.start_worker(slot)
+    
+    def _start_metrics_server(self):
+        """
+        Serve the metrics of all workers from one endpoint
+        
+        Workers write their samples to PROMETHEUS_MULTIPROC_DIR (set here before
+        they are spawned) and the supervisor merges them on every scrape.
+        """
+        self.metrics_dir = os.environ.get('PROMETHEUS_MULTIPROC_DIR') or tempfile.mkdtemp(prefix='crawler-metrics-')
+        os.environ['PROMETHEUS_MULTIPROC_DIR'] = self.metrics_dir
+        # Samples of a previous run would be merged into this one
+        for name in os.listdir(self.metrics_dir):
+            if name.endswith('.db'):
+                os.remove(os.path.join(self.metrics_dir, name))
+        
+        from prometheus_client import CollectorRegistry, start_http_server
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        try:
+            start_http_server(METRICS_PORT, registry=registry)
+            logger.info(f"📈 Metrics on http://localhost:{METRICS_PORT}/metrics")
+        except OSError as e:
+            logger.warning(f"Metrics endpoint not started on port {METRICS_PORT}: {e}")
+    
+    def _report_stats(self, jobs_total: int, jobs_per_minute: float):
+        """Log aggregate throughput and publish it to Redis for dashboards"""
+        alive = sum(1 for p in self.workers.values() if p.is_alive())
+        logger.info(f"📊 {jobs_per_minute:.1f} jobs/min across {alive} worker(s), {jobs_total} jobs total")
+        try:
+            self.redis_client.hset(self.stats_key, mapping={
+                'workers': alive,
+                'mode': self.mode,
+                'jobs_total': jobs_total,
+                'jobs_per_minute': round(jobs_per_minute, 2),
+                'started_at': int(self.started_at),
+                'updated_at': int(time.time()),
+            })
+            self.redis_client.expire(self.stats_key, STATS_INTERVAL * 3)
+        except Exception as e:
+            logger.warning(f"Failed to publish supervisor stats: {e}")
+    
+    def _drain(self):
+        """Ask children to finish their jobs, then kill whatever is left after DRAIN_TIMEOUT"""
+        for process in self.workers.values():
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGTERM)
+        
+        deadline = time.time() + DRAIN_TIMEOUT
+        for process in self.workers.values():
+            process.join(max(0, deadline - time.time()))
+            if process.is_alive():
+                logger.warning(f"⏱️ {process.name} still busy after {DRAIN_TIMEOUT}s - killing it")
+                process.kill()
+                process.join()
+        
+        logger.info(f"👋 Supervisor exited after {self.jobs_counter.value} jobs")
+
+def main():
+    parser = argparse.ArgumentParser(description='Run and supervise multiple crawler worker processes')
+    parser.add_argument('--workers', type=int, default=WORKER_PROCESSES,
+                        help='number of worker processes (default: WORKER_PROCESSES or CPU count)')
+    parser.add_argument('--mode', choices=['sync', 'async'], default=WORKER_MODE,
+                        help='sync runs main.py loops, async runs async_worker.py loops')
+    args = parser.parse_args()
+    
+    WorkerSupervisor(args.workers, args.mode).run()
+
+if __name__ == "__main__":
+    main()
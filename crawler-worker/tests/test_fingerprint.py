@@ -0,0 +1,52 @@
+import unittest
+
+from utils.fingerprint import comment_fingerprint, normalize_post_url
+
+class NormalizePostUrlTest(unittest.TestCase):
+    """normalize_post_url must agree with the trigger API's queue.NormalizeURL"""
+    
+    def test_facebook_query_identifies_the_post(self):
+        cases = {
+            'https://www.facebook.com/watch/?v=123': 'facebook.com/watch?v=123',
+            'https://www.facebook.com/permalink.php?story_fbid=456&id=789': 'facebook.com/permalink.php?id=789&story_fbid=456',
+            'https://www.facebook.com/photo.php?fbid=42&set=a.1': 'facebook.com/photo.php?fbid=42&set=a.1',
+        }
+        for url, expected in cases.items():
+            with self.subTest(url=url):
+                self.assertEqual(normalize_post_url(url), expected)
+        self.assertNotEqual(normalize_post_url('https://www.facebook.com/watch/?v=1'),
+                            normalize_post_url('https://www.facebook.com/watch/?v=2'))
+    
+    def test_shares_of_one_post_agree(self):
+        urls = [
+            'https://www.facebook.com/permalink.php?story_fbid=456&id=789',
+            'https://m.facebook.com/permalink.php?id=789&story_fbid=456&fbclid=abc',
+            'https://facebook.com/permalink.php?story_fbid=456&id=789&mibextid=x&utm_source=share#comments',
+            '  HTTPS://WWW.Facebook.com/permalink.php/?story_fbid=456&id=789  ',
+        ]
+        self.assertEqual({normalize_post_url(url) for url in urls}, {'facebook.com/permalink.php?id=789&story_fbid=456'})
+    
+    def test_tracking_parameters_are_dropped(self):
+        self.assertEqual(normalize_post_url('https://www.tiktok.com/@user/video/1?is_from_webapp=1&sender_device=pc&_r=1&_t=x&lang=en'),
+                         'tiktok.com/@user/video/1')
+        self.assertEqual(normalize_post_url('https://www.instagram.com/p/abc/?igshid=1&igsh=2'), 'instagram.com/p/abc')
+    
+    def test_query_values_are_escaped_like_go(self):
+        self.assertEqual(normalize_post_url('https://example.com/post?q=a b&x=~y/z'), 'example.com/post?q=a+b&x=~y%2Fz')
+    
+    def test_url_without_host_is_returned_trimmed(self):
+        self.assertEqual(normalize_post_url(' facebook.com/watch?v=1 '), 'facebook.com/watch?v=1')
+
+class CommentFingerprintTest(unittest.TestCase):
+    
+    def test_same_comment_on_different_posts_differs(self):
+        first = comment_fingerprint('facebook', 'https://www.facebook.com/watch/?v=1', 'alice', 'nice')
+        second = comment_fingerprint('facebook', 'https://www.facebook.com/watch/?v=2', 'alice', 'nice')
+        self.assertNotEqual(first, second)
+    
+    def test_same_comment_shared_differently_agrees(self):
+        self.assertEqual(comment_fingerprint('facebook', 'https://m.facebook.com/watch/?v=1&fbclid=x', '@Alice', 'nice  '),
+                         comment_fingerprint('facebook', 'https://www.facebook.com/watch?v=1', 'alice', 'nice'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+import json
+import unittest
+from unittest import mock
+from urllib.request import urlopen
+
+from crawlers.tiktok_capture import TikTokCommentCapture
+from fixtures.server import FixtureServer
+
+VIDEO_PATH = '/@dapur_rina/video/7351234567890000000'
+
+# The five comments recorded in fixtures/tiktok/comment_list, in cursor order
+RECORDED_IDS = [f"735123456789012300{n}" for n in range(1, 6)]
+
+class RecordedResponse:
+    """A fixture server response in the shape TikTokCommentCapture reads from Playwright"""
+    
+    def __init__(self, url: str):
+        self.url = url
+        with urlopen(url) as resp:
+            self.status = resp.status
+            self.body = resp.read()
+    
+    def json(self) -> dict:
+        return json.loads(self.body)
+
+class TikTokCommentCaptureTest(unittest.TestCase):
+    """The capture parser over the recorded comment-list pages, served by fixtures.server"""
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.server = FixtureServer().start()
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+    
+    def capture_page(self, capture: TikTokCommentCapture, cursor, path: str = '/api/comment/list/') -> int:
+        capture.on_response(RecordedResponse(f"{self.server.url}{path}?aweme_id=7351234567890000000&cursor={cursor}&count=20"))
+        return capture.collect()
+    
+    def test_first_page_carries_ids_reply_counts_and_create_times(self):
+        capture = TikTokCommentCapture()
+        self.assertEqual(self.capture_page(capture, 0), 3)
+        
+        comments = capture.take()
+        self.assertEqual([c['comment_id'] for c in comments], RECORDED_IDS[:3])
+        self.assertEqual([c['replies_count'] for c in comments], [12, 3, 0])
+        self.assertEqual([c['raw_data']['create_time'] for c in comments], [1711929600, 1711933200, 1711936800])
+        self.assertEqual(comments[0]['timestamp'], '2024-04-01 00:00:00')
+        self.assertEqual(comments[0]['username'], 'dapur_rina')
+        self.assertTrue(all(c['parent_comment_id'] is None for c in comments))
+        self.assertEqual(capture.take(), [])
+    
+    def test_follows_the_cursor_until_has_more_ends(self):
+        capture = TikTokCommentCapture()
+        cursors = []
+        cursor = 0
+        while capture.has_more:
+            cursors.append(cursor)
+            self.capture_page(capture, cursor)
+            cursor = capture.cursor
+        
+        self.assertEqual(cursors, [0, 3])
+        self.assertEqual(capture.cursor, 5)
+        self.assertEqual(capture.total, 5)
+        self.assertEqual(capture.responses, 2)
+        self.assertEqual([c['comment_id'] for c in capture.take()], RECORDED_IDS)
+    
+    def test_replayed_pages_add_nothing(self):
+        capture = TikTokCommentCapture()
+        self.capture_page(capture, 0)
+        self.assertEqual(self.capture_page(capture, 0), 0)
+        self.assertEqual(capture.count, 3)
+    
+    def test_reply_lists_do_not_move_the_cursor(self):
+        capture = TikTokCommentCapture()
+        self.capture_page(capture, 0)
+        self.capture_page(capture, 3, path='/api/comment/list/reply/')
+        self.assertEqual(capture.cursor, 3)
+        self.assertTrue(capture.has_more)
+        self.assertEqual(capture.count, 5)
+    
+    def test_nothing_captured_without_comment_list_responses(self):
+        # The crawler falls back to DOM scraping when capture.count stays 0
+        capture = TikTokCommentCapture()
+        capture.on_response(RecordedResponse(f"{self.server.url}{VIDEO_PATH}"))
+        missing = RecordedResponse(f"{self.server.url}/api/comment/list/?cursor=0")
+        missing.status = 500
+        capture.on_response(missing)
+        self.assertEqual(capture.collect(), 0)
+        self.assertEqual(capture.count, 0)
+        self.assertEqual(capture.take(), [])
+
+class TikTokCrawlFixtureTest(unittest.TestCase):
+    """TikTokCrawler against the recorded video page (needs Playwright's Chromium)"""
+    
+    @classmethod
+    def setUpClass(cls):
+        try:
+            from playwright.sync_api import sync_playwright
+            with sync_playwright() as p:
+                p.chromium.launch(headless=True).close()
+        except Exception as e:
+            raise unittest.SkipTest(f"Chromium not available: {str(e).splitlines()[0]}")
+        cls.server = FixtureServer().start()
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+    
+    def crawl(self) -> list:
+        from crawlers.tiktok_crawler import TikTokCrawler
+        return TikTokCrawler(headless=True).crawl(f"{self.server.url}{VIDEO_PATH}", max_comments=10)
+    
+    def test_comments_come_from_the_comment_api(self):
+        comments = self.crawl()
+        self.assertEqual([c['comment_id'] for c in comments], RECORDED_IDS)
+        self.assertTrue(all(c['raw_data']['source'] == 'comment_api' for c in comments))
+    
+    def test_falls_back_to_the_dom_without_captured_responses(self):
+        with mock.patch('crawlers.tiktok_capture.COMMENT_API_PATTERN', '/api/not-recorded/'):
+            comments = self.crawl()
+        self.assertTrue(comments)
+        self.assertTrue(all(c['comment_id'].startswith('tt_') and 'raw_data' not in c for c in comments))
+        self.assertEqual([c['username'] for c in comments[:3]], ['dapur_rina', 'budi.s', 'sari_02'])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,5 @@
+import asyncio
+import os
 import random
 import time
 from typing import List
@@ -11,6 +13,9 @@ USER_AGENTS = [
     'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
 ]
 
+# Upper bound of the human-like pause kept on top of event-driven waits (0 disables it)
+HUMAN_JITTER_MAX_MS = int(os.getenv('HUMAN_JITTER_MAX_MS', 800))
+
 def get_random_user_agent() -> str:
     """Returns a random user agent from the list"""
     return random.choice(USER_AGENTS)
@@ -20,6 +25,11 @@ def random_delay(min_ms: int = 1000, max_ms: int = 3000):
     delay_seconds = random.uniform(min_ms / 1000, max_ms / 1000)
     time.sleep(delay_seconds)
 
+async def async_random_delay(min_ms: int = 1000, max_ms: int = 3000):
+    """Async counterpart of random_delay - yields to other crawls while waiting"""
+    delay_seconds = random.uniform(min_ms / 1000, max_ms / 1000)
+    await asyncio.sleep(delay_seconds)
+
 def human_like_scroll(page, scroll_count: int = 3):
     """Simulate human-like scrolling behavior"""
     for _ in range(scroll_count):
@@ -28,7 +38,80 @@ def human_like_scroll(page, scroll_count: int = 3):
         page.evaluate(f"window.scrollBy(0, {scroll_amount})")
         
         # Random delay between scrolls
-        random_delay(500, 1500)
+        human_jitter()
+
+async def async_human_like_scroll(page, scroll_count: int = 3):
+    """Async counterpart of human_like_scroll for playwright.async_api pages"""
+    for _ in range(scroll_count):
+        scroll_amount = random.randint(300, 800)
+        await page.evaluate(f"window.scrollBy(0, {scroll_amount})")
+        await async_human_jitter()
+
+def human_jitter(max_ms: int = None):
+    """Short random pause capped at HUMAN_JITTER_MAX_MS"""
+    cap = HUMAN_JITTER_MAX_MS if max_ms is None else min(max_ms, HUMAN_JITTER_MAX_MS)
+    if cap > 0:
+        random_delay(cap // 4, cap)
+
+async def async_human_jitter(max_ms: int = None):
+    """Async counterpart of human_jitter"""
+    cap = HUMAN_JITTER_MAX_MS if max_ms is None else min(max_ms, HUMAN_JITTER_MAX_MS)
+    if cap > 0:
+        await async_random_delay(cap // 4, cap)
+
+def wait_for_any_selector(page, selectors, timeout_ms: int = 10000) -> bool:
+    """
+    Wait until any of the selectors is visible, then pause for a human-like jitter
+    
+    Args:
+        page: Playwright page
+        selectors: Selector or list of selectors (Playwright syntax allowed)
+        timeout_ms: Give up after this many milliseconds
+        
+    Returns:
+        bool: True if a selector matched before the timeout
+    """
+    if isinstance(selectors, str):
+        selectors = [selectors]
+    try:
+        page.wait_for_selector(', '.join(selectors), timeout=timeout_ms, state='visible')
+        found = True
+    except Exception:
+        found = False
+    human_jitter()
+    return found
+
+async def async_wait_for_any_selector(page, selectors, timeout_ms: int = 10000) -> bool:
+    """Async counterpart of wait_for_any_selector"""
+    if isinstance(selectors, str):
+        selectors = [selectors]
+    try:
+        await page.wait_for_selector(', '.join(selectors), timeout=timeout_ms, state='visible')
+        found = True
+    except Exception:
+        found = False
+    await async_human_jitter()
+    return found
+
+def wait_for_network_idle(page, timeout_ms: int = 10000) -> bool:
+    """Wait until the page has had no network traffic for 500ms, then jitter"""
+    try:
+        page.wait_for_load_state('networkidle', timeout=timeout_ms)
+        idle = True
+    except Exception:
+        idle = False
+    human_jitter()
+    return idle
+
+async def async_wait_for_network_idle(page, timeout_ms: int = 10000) -> bool:
+    """Async counterpart of wait_for_network_idle"""
+    try:
+        await page.wait_for_load_state('networkidle', timeout=timeout_ms)
+        idle = True
+    except Exception:
+        idle = False
+    await async_human_jitter()
+    return idle
 
 def get_stealth_config() -> dict:
     """Returns Playwright stealth configuration"""
@@ -44,28 +127,38 @@ def get_stealth_config() -> dict:
         'permissions': []
     }
 
-def setup_stealth_page(page):
-    """Apply stealth techniques to a Playwright page"""
+STEALTH_INIT_SCRIPTS = [
     # Hide webdriver property
-    page.add_init_script("""
+    """
         Object.defineProperty(navigator, 'webdriver', {
             get: () => undefined
         });
-    """)
-    
+    """,
     # Mock plugins
-    page.add_init_script("""
+    """
         Object.defineProperty(navigator, 'plugins', {
             get: () => [1, 2, 3, 4, 5]
         });
-    """)
-    
+    """,
     # Mock languages
-    page.add_init_script("""
+    """
         Object.defineProperty(navigator, 'languages', {
             get: () => ['en-US', 'en']
         });
-    """)
+    """,
+]
+
+def setup_stealth_page(page):
+    """Apply stealth techniques to a Playwright page"""
+    for script in STEALTH_INIT_SCRIPTS:
+        page.add_init_script(script)
+    
+    return page
+
+async def async_setup_stealth_page(page):
+    """Async counterpart of setup_stealth_page"""
+    for script in STEALTH_INIT_SCRIPTS:
+        await page.add_init_script(script)
     
     return page
 
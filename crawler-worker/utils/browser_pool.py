@@ -0,0 +1,307 @@
+import asyncio
+import logging
+import os
+import time
+
+import psutil
+from playwright.async_api import async_playwright
+from playwright.sync_api import sync_playwright
+
+logger = logging.getLogger(__name__)
+
+# Chromium flags shared by pooled and standalone browsers
+BROWSER_LAUNCH_ARGS = [
+    '--disable-blink-features=AutomationControlled',
+    '--no-sandbox',
+    '--disable-dev-shm-usage'
+]
+
+# Seconds to wait for a context or page to close before giving up on a wedged browser
+CONTEXT_CLOSE_TIMEOUT = 10
+
+# Process names of Chromium (the Playwright driver is node and is left alone)
+BROWSER_PROCESS_NAMES = ('chrome', 'chromium', 'headless_shell')
+
+def browser_tree_rss_mb() -> float:
+    """Resident memory (MB) of every process spawned by this worker (Playwright driver + Chromium)"""
+    total = 0
+    try:
+        for child in psutil.Process().children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+    except psutil.Error:
+        return 0.0
+    return total / (1024 * 1024)
+
+def kill_browser_processes() -> int:
+    """Kill every Chromium process spawned by this worker; returns how many were killed"""
+    killed = 0
+    try:
+        for child in psutil.Process().children(recursive=True):
+            try:
+                if any(name in child.name().lower() for name in BROWSER_PROCESS_NAMES):
+                    child.kill()
+                    killed += 1
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+    except psutil.Error:
+        pass
+    return killed
+
+class _BrowserPoolBase:
+    """Recycling policy and counters shared by the sync and async pools"""
+    
+    def __init__(self, headless: bool = True, max_jobs: int = None, max_rss_mb: int = None):
+        self.headless = headless
+        self.max_jobs = max_jobs or int(os.getenv('BROWSER_MAX_JOBS', 50))
+        self.max_rss_mb = max_rss_mb or int(os.getenv('BROWSER_MAX_RSS_MB', 1500))
+        self.playwright = None
+        self.browser = None
+        self.jobs_served = 0
+        self.hits = 0
+        self.misses = 0
+        self.launches = 0
+        self.recycles = 0
+        self.last_launch_ms = 0.0
+        self.total_launch_ms = 0.0
+        self.hung = False  # Set by the crawl watchdog; the browser is replaced on the next acquire
+    
+    def stats(self) -> dict:
+        """Pool counters for logging and monitoring"""
+        requests = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / requests, 3) if requests else 0.0,
+            'launches': self.launches,
+            'recycles': self.recycles,
+            'jobs_on_current_browser': self.jobs_served,
+            'last_launch_ms': round(self.last_launch_ms, 1),
+            'avg_launch_ms': round(self.total_launch_ms / self.launches, 1) if self.launches else 0.0,
+            'rss_mb': round(browser_tree_rss_mb(), 1),
+        }
+    
+    def _recycle_reason(self):
+        """Explain why the current browser should be replaced, or None to keep it"""
+        if self.browser is None:
+            return None
+        if self.hung:
+            return "a crawl hung past its deadline"
+        if self.jobs_served >= self.max_jobs:
+            return f"served {self.jobs_served} jobs (limit {self.max_jobs})"
+        rss_mb = browser_tree_rss_mb()
+        if rss_mb > self.max_rss_mb:
+            return f"RSS {rss_mb:.0f}MB over limit {self.max_rss_mb}MB"
+        return None
+    
+    def _record_launch(self, started: float):
+        """Update launch counters after a browser came up"""
+        self.jobs_served = 0
+        self.hung = False
+        self.launches += 1
+        self.last_launch_ms = (time.monotonic() - started) * 1000
+        self.total_launch_ms += self.last_launch_ms
+        logger.info(f"🚀 Browser launched in {self.last_launch_ms:.0f}ms (launch #{self.launches})")
+
+class BrowserPool(_BrowserPoolBase):
+    """
+    Long-lived Chromium owned by the worker process.
+    
+    Every job gets a fresh BrowserContext (isolated cookies, storage and cache)
+    while the expensive driver start and browser launch are paid only once.
+    The browser is recycled after `max_jobs` contexts or when the browser
+    process tree grows past `max_rss_mb`.
+    """
+    
+    def acquire_context(self, **context_options):
+        """Return a new BrowserContext, launching or recycling the browser when needed"""
+        recycle_reason = self._recycle_reason()
+        if recycle_reason:
+            logger.info(f"♻️ Recycling browser: {recycle_reason}")
+            self.recycles += 1
+            self._close_browser()
+        
+        if self.browser is None or not self.browser.is_connected():
+            self.misses += 1
+            self._launch()
+        else:
+            self.hits += 1
+        
+        self.jobs_served += 1
+        return self.browser.new_context(**context_options)
+    
+    def release_context(self, context):
+        """Close a context handed out by acquire_context (the browser stays up)"""
+        if context is None:
+            return
+        try:
+            context.close()
+        except Exception as e:
+            logger.warning(f"Failed to close browser context: {e}")
+    
+    def kill(self):
+        """
+        Kill the browser from the watchdog thread
+        
+        Sync Playwright objects cannot be used from another thread, so the
+        Chromium processes are killed instead: the blocked call fails right away
+        and the next job gets a fresh browser.
+        """
+        self.hung = True
+        killed = kill_browser_processes()
+        logger.warning(f"💀 Killed {killed} browser process(es) of a hung crawl")
+    
+    def close(self):
+        """Shut down the browser and the Playwright driver"""
+        self._close_browser()
+        if self.playwright:
+            try:
+                self.playwright.stop()
+            except Exception as e:
+                logger.warning(f"Failed to stop Playwright: {e}")
+            self.playwright = None
+        logger.info("Browser pool closed")
+    
+    def _launch(self):
+        """Start the Playwright driver (once) and launch Chromium"""
+        started = time.monotonic()
+        if self.playwright is None:
+            self.playwright = sync_playwright().start()
+        self.browser = self.playwright.chromium.launch(
+            headless=self.headless,
+            args=BROWSER_LAUNCH_ARGS
+        )
+        self._record_launch(started)
+    
+    def _close_browser(self):
+        """Close the current browser, ignoring errors from an already-dead process"""
+        if self.browser:
+            try:
+                self.browser.close()
+            except Exception as e:
+                logger.warning(f"Failed to close browser: {e}")
+            self.browser = None
+
+class AsyncBrowserPool(_BrowserPoolBase):
+    """
+    playwright.async_api version of BrowserPool for the async worker.
+    
+    Many crawls share one browser concurrently, so a browser picked for
+    recycling is only closed once its last in-flight context is released;
+    new jobs meanwhile go to a freshly launched browser.
+    """
+    
+    def __init__(self, headless: bool = True, max_jobs: int = None, max_rss_mb: int = None):
+        super().__init__(headless, max_jobs, max_rss_mb)
+        self._lock = asyncio.Lock()
+        self._active = {}  # browser -> number of open contexts
+        self._retiring = set()
+        self._context_browser = {}
+    
+    async def acquire_context(self, **context_options):
+        """Return a new BrowserContext, launching or recycling the browser when needed"""
+        async with self._lock:
+            recycle_reason = self._recycle_reason()
+            if recycle_reason:
+                logger.info(f"♻️ Recycling browser: {recycle_reason}")
+                self.recycles += 1
+                await self._retire_browser(self.browser)
+                self.browser = None
+            
+            if self.browser is not None and not self.browser.is_connected():
+                logger.warning("Pooled browser disconnected - launching a new one")
+                await self._retire_browser(self.browser)
+                self.browser = None
+            
+            if self.browser is None:
+                self.misses += 1
+                await self._launch()
+            else:
+                self.hits += 1
+            
+            browser = self.browser
+            self.jobs_served += 1
+            self._active[browser] = self._active.get(browser, 0) + 1
+        
+        try:
+            context = await browser.new_context(**context_options)
+        except Exception:
+            await self._context_closed(browser)
+            raise
+        self._context_browser[context] = browser
+        return context
+    
+    async def release_context(self, context):
+        """Close a context handed out by acquire_context (the browser stays up)"""
+        if context is None:
+            return
+        try:
+            await asyncio.wait_for(context.close(), CONTEXT_CLOSE_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"Failed to close browser context: {e}")
+        browser = self._context_browser.pop(context, None)
+        if browser is not None:
+            await self._context_closed(browser)
+    
+    def mark_hung(self):
+        """
+        Retire the current browser after a crawl hung on it (called by the watchdog)
+        
+        Other crawls keep their contexts until they finish; new jobs get a
+        freshly launched browser.
+        """
+        self.hung = True
+    
+    async def close(self):
+        """Shut down every browser and the Playwright driver"""
+        browsers = set(self._active) | self._retiring
+        if self.browser:
+            browsers.add(self.browser)
+        for browser in browsers:
+            await self._close(browser)
+        self._active.clear()
+        self._retiring.clear()
+        self.browser = None
+        if self.playwright:
+            try:
+                await self.playwright.stop()
+            except Exception as e:
+                logger.warning(f"Failed to stop Playwright: {e}")
+            self.playwright = None
+        logger.info("Browser pool closed")
+    
+    async def _launch(self):
+        """Start the Playwright driver (once) and launch Chromium"""
+        started = time.monotonic()
+        if self.playwright is None:
+            self.playwright = await async_playwright().start()
+        self.browser = await self.playwright.chromium.launch(
+            headless=self.headless,
+            args=BROWSER_LAUNCH_ARGS
+        )
+        self._record_launch(started)
+    
+    async def _retire_browser(self, browser):
+        """Close the browser now if idle, otherwise once its last context is released"""
+        if self._active.get(browser, 0) == 0:
+            self._active.pop(browser, None)
+            await self._close(browser)
+        else:
+            self._retiring.add(browser)
+    
+    async def _context_closed(self, browser):
+        """Bookkeeping after a context closed; finishes deferred recycling"""
+        self._active[browser] = self._active.get(browser, 1) - 1
+        if self._active[browser] <= 0 and browser in self._retiring:
+            self._retiring.discard(browser)
+            self._active.pop(browser, None)
+            await self._close(browser)
+    
+    async def _close(self, browser):
+        """Close one browser, ignoring errors from an already-dead process"""
+        try:
+            await browser.close()
+        except Exception as e:
+            logger.warning(f"Failed to close browser: {e}")
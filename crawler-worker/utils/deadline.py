@@ -0,0 +1,169 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Wall-clock budget (seconds) of one crawl, from browser start to the last extracted comment
+WORKER_TIMEOUT = int(os.getenv('WORKER_TIMEOUT', 600))
+
+# Budget per crawl phase in seconds; override with DEADLINE_<PHASE> (e.g. DEADLINE_LOADING_COMMENTS).
+# Uploading has its own budget on top of WORKER_TIMEOUT, so partial results still go out.
+PHASE_BUDGETS = {
+    'starting': 60,
+    'login': 120,
+    'loading_page': 150,
+    'loading_comments': 300,
+    'extracting': 60,
+    'uploading': 120,
+}
+
+# Phases that run in the browser (the watchdog only steps in during these)
+BROWSER_PHASES = ('starting', 'login', 'loading_page', 'loading_comments', 'extracting')
+
+# Seconds a phase may overrun its budget before the watchdog assumes a hung call
+WATCHDOG_GRACE = int(os.getenv('WATCHDOG_GRACE', 30))
+
+def phase_budget(phase: str) -> float:
+    """Budget in seconds for a crawl phase (DEADLINE_<PHASE>, or the PHASE_BUDGETS default)"""
+    return float(os.getenv(f"DEADLINE_{phase.upper()}", PHASE_BUDGETS.get(phase, WORKER_TIMEOUT)))
+
+def job_budget() -> float:
+    """Longest a job can run: the browser phases' WORKER_TIMEOUT, the upload budget on top, and the watchdog's grace"""
+    return WORKER_TIMEOUT + phase_budget('uploading') + WATCHDOG_GRACE
+
+class Deadline:
+    """
+    Time budget of one job, split into per-phase budgets
+    
+    Crawlers move it along with set_phase(). Load-more loops stop once the
+    current phase is out of time, and Playwright timeouts are clamped to what
+    is left, so a slow job ends with the comments it has instead of hanging.
+    Calls that ignore the budget (a wedged browser) are caught by the watchdog.
+    """
+    
+    def __init__(self, total: float = None):
+        self.total = total or WORKER_TIMEOUT
+        self.started = time.monotonic()
+        self.phase = 'starting'
+        self.phase_started = self.started
+        self.exceeded = None  # First phase that ran out of time
+        self.exhausted = None  # Phase ended early by exhaust()
+        self.durations = {}  # Phase -> seconds spent in it, for metrics
+    
+    def enter(self, phase: str):
+        """Start the budget of a new phase (re-entering the current phase keeps its clock)"""
+        if phase != self.phase:
+            now = time.monotonic()
+            self.durations[self.phase] = self.durations.get(self.phase, 0.0) + now - self.phase_started
+            self.phase = phase
+            self.phase_started = now
+    
+    def finish(self) -> dict:
+        """End the current phase; returns the seconds spent per phase"""
+        self.enter('done')
+        return self.durations
+    
+    def remaining(self) -> float:
+        """Seconds left in the current phase (and, for browser phases, in the whole crawl)"""
+        now = time.monotonic()
+        left = self.phase_started + phase_budget(self.phase) - now
+        if self.phase in BROWSER_PHASES:
+            left = min(left, self.started + self.total - now)
+        if self.phase == self.exhausted:
+            left = min(left, 0.0)
+        return left
+    
+    def exhaust(self):
+        """End the current phase's budget now (its next step would not fit in what is left)"""
+        self.exhausted = self.phase
+        self.expired()
+    
+    def expired(self) -> bool:
+        """True once the current phase is out of time; the phase is remembered in exceeded"""
+        if self.remaining() > 0:
+            return False
+        if self.exceeded is None:
+            self.exceeded = self.phase
+            logger.warning(f"⏱️ Deadline reached in phase {self.phase}")
+        return True
+    
+    def ran_out(self) -> bool:
+        """True if this or any earlier phase ran out of time"""
+        return self.expired() or self.exceeded is not None
+    
+    def timeout_ms(self, timeout_ms: int) -> int:
+        """A Playwright timeout clamped to the time left (at least 1ms, 0 would mean no timeout)"""
+        return max(1, int(min(timeout_ms, self.remaining() * 1000)))
+    
+    def timeout(self, seconds: float) -> float:
+        """An HTTP timeout clamped to the time left (at least one second)"""
+        return max(1.0, min(seconds, self.remaining()))
+    
+    def message(self) -> str:
+        """Error message for a job that ran out of time"""
+        return f"Deadline exceeded in phase {self.exceeded} (WORKER_TIMEOUT={self.total:g}s)"
+    
+    def hung(self) -> bool:
+        """A browser phase overran its budget by more than WATCHDOG_GRACE"""
+        return self.phase in BROWSER_PHASES and self.remaining() < -WATCHDOG_GRACE
+
+class Watchdog:
+    """
+    Thread that calls on_hang() once when a browser phase overruns its budget
+    by WATCHDOG_GRACE seconds - a call is stuck and the budget checks inside
+    the crawler will never run. The sync worker kills the browser, which makes
+    the blocked Playwright call fail so the job can finish with partial results.
+    """
+    
+    def __init__(self, deadline: Deadline, on_hang):
+        self.deadline = deadline
+        self.on_hang = on_hang
+        self.fired = False
+        self._stop = threading.Event()
+    
+    def start(self):
+        threading.Thread(target=self._run, name='crawl-watchdog', daemon=True).start()
+        return self
+    
+    def stop(self):
+        self._stop.set()
+    
+    def _run(self):
+        while not self._stop.wait(1):
+            if self.deadline.hung():
+                self._fire()
+                return
+    
+    def _fire(self):
+        self.fired = True
+        self.deadline.expired()
+        logger.error(f"🐕 Watchdog: phase {self.deadline.phase} is {-self.deadline.remaining():.0f}s over budget - aborting crawl")
+        try:
+            self.on_hang()
+        except Exception as e:
+            logger.warning(f"Watchdog action failed: {e}")
+
+class AsyncWatchdog(Watchdog):
+    """asyncio counterpart of Watchdog: a task on the worker's event loop"""
+    
+    def __init__(self, deadline: Deadline, on_hang):
+        super().__init__(deadline, on_hang)
+        self._task = None
+    
+    def start(self):
+        self._task = asyncio.create_task(self._watch())
+        return self
+    
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+    
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(1)
+            if self.deadline.hung():
+                self._fire()
+                return
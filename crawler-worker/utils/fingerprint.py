@@ -0,0 +1,132 @@
+import hashlib
+import logging
+import os
+import re
+import unicodedata
+from urllib.parse import parse_qsl, quote_plus, urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Skip comments already delivered by any worker (Bloom filter on a plain Redis bitmap)
+COMMENT_FILTER = os.getenv('COMMENT_FILTER', 'true').lower() == 'true'
+# Filter size per platform: 2^28 bits (32MB) keeps false positives under 0.01% up to 10M comments
+COMMENT_FILTER_BITS = int(os.getenv('COMMENT_FILTER_BITS', 2 ** 28))
+COMMENT_FILTER_HASHES = int(os.getenv('COMMENT_FILTER_HASHES', 7))
+
+# Query parameters that only track where a link was shared from (same list as the
+# trigger API's queue.NormalizeURL); every other parameter can identify the post
+TRACKING_PARAMS = {'fbclid', 'igshid', 'igsh', 'is_from_webapp', 'sender_device', '_r', '_t', 'lang', 'mibextid'}
+
+_WHITESPACE = re.compile(r'\s+')
+
+def normalize_text(text: str) -> str:
+    """Unicode-normalized, whitespace-collapsed text (rendering differences don't change identity)"""
+    return _WHITESPACE.sub(' ', unicodedata.normalize('NFC', text or '')).strip()
+
+def normalize_post_url(url: str) -> str:
+    """
+    Post URL reduced like the trigger API's queue.NormalizeURL: lowercase host
+    without www./m., no fragment, no trailing slash, no tracking parameters and
+    the remaining query parameters (e.g. Facebook's v, story_fbid, id, fbid) sorted
+    """
+    raw = (url or '').strip()
+    parts = urlsplit(raw)
+    if not parts.netloc:
+        return raw
+    host = parts.netloc.lower()
+    host = host[4:] if host.startswith('www.') else host
+    host = host[2:] if host.startswith('m.') else host
+    
+    query = {}
+    for key, value in parse_qsl(parts.query, keep_blank_values=True):
+        if key in TRACKING_PARAMS or key.startswith('utm_'):
+            continue
+        query.setdefault(key, value)  # First value, like Go's url.Values.Get
+    
+    normalized = host + parts.path.rstrip('/')
+    if query:
+        normalized += '?' + '&'.join(f"{quote_plus(key)}={quote_plus(query[key])}" for key in sorted(query))
+    return normalized
+
+def comment_fingerprint(platform: str, post_url: str, username: str, text: str) -> str:
+    """
+    Deterministic identity of a scraped comment
+    
+    Built from the post, the author and the normalized text, so every worker
+    and every re-crawl derives the same value (unlike the per-process salted
+    hash()). Timestamps are left out because pages render them relative. A
+    comment whose author was not extracted is identified by its text alone.
+    
+    Returns:
+        str: 20 hex characters
+    """
+    key = '\x1f'.join([
+        platform,
+        normalize_post_url(post_url),
+        (username or '').strip().lstrip('@').lower(),
+        normalize_text(text),
+    ])
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=10).hexdigest()
+
+class CommentFilter:
+    """
+    Cross-worker "already stored" check for comments
+    
+    A Bloom filter kept in one Redis bitmap per platform (plain SETBIT/GETBIT, no
+    module needed). Checking or adding a whole chunk is one pipelined round trip.
+    A false positive drops a new comment, so the filter is sized for a low rate
+    (see COMMENT_FILTER_BITS); there are no false negatives. Redis errors fail
+    open: the comments are sent and the Processing API dedupes them.
+    """
+    
+    def __init__(self, client, bits: int = None, hashes: int = None):
+        self.client = client
+        self.bits = bits or COMMENT_FILTER_BITS
+        self.hashes = hashes or COMMENT_FILTER_HASHES
+    
+    def filter_new(self, comments: list) -> list:
+        """Comments not in the filter yet (keeps order)"""
+        if not comments:
+            return comments
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for comment in comments:
+                key = self._key(comment)
+                for offset in self._offsets(comment):
+                    pipe.getbit(key, offset)
+            bits = pipe.execute()
+        except Exception as e:
+            logger.warning(f"Comment filter unavailable, sending all comments: {e}")
+            return comments
+        
+        fresh = []
+        for i, comment in enumerate(comments):
+            if not all(bits[i * self.hashes:(i + 1) * self.hashes]):
+                fresh.append(comment)
+        return fresh
+    
+    def add(self, comments: list):
+        """Record comments the Processing API has accepted"""
+        if not comments:
+            return
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for comment in comments:
+                key = self._key(comment)
+                for offset in self._offsets(comment):
+                    pipe.setbit(key, offset, 1)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to update comment filter: {e}")
+    
+    @staticmethod
+    def _key(comment: dict) -> str:
+        return f"comment_filter:{comment.get('platform')}"
+    
+    def _offsets(self, comment: dict) -> list:
+        """Bit positions via double hashing of (platform, comment_id)"""
+        digest = hashlib.blake2b(f"{comment.get('platform')}:{comment.get('comment_id')}".encode('utf-8'),
+                                 digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'big')
+        h2 = int.from_bytes(digest[8:], 'big') | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
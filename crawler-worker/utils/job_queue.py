@@ -0,0 +1,475 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from collections import namedtuple
+
+import redis
+
+from utils.metrics import QUEUE_DEAD_LETTERED, QUEUE_RECLAIMED, record_queue_wait
+
+logger = logging.getLogger(__name__)
+
+# One stream per queue class (platform x priority), named
+# crawl_jobs_stream:{platform}:{priority}, all read through one consumer group
+JOB_STREAM_PREFIX = 'crawl_jobs_stream'
+JOB_GROUP = 'crawler_workers'
+PLATFORMS = ('tiktok', 'instagram', 'facebook')
+PRIORITIES = ('high', 'normal', 'low')
+DEFAULT_PRIORITY = 'normal'
+# Jobs that crashed workers too often are moved here instead of being retried forever
+DEAD_LETTER_STREAM = 'crawl_jobs_dead'
+# Per-class dequeue counters (wait times), read by GET /api/queues
+QUEUE_STATS_PREFIX = 'queue_stats'
+
+# Jobs fetched per read and held by a worker before they are started
+QUEUE_PREFETCH = int(os.getenv('QUEUE_PREFETCH', 1))
+# A job nobody heartbeats for this long is handed to another worker
+QUEUE_VISIBILITY_TIMEOUT = int(os.getenv('QUEUE_VISIBILITY_TIMEOUT', 120))
+# Deliveries after which a job counts as poison and goes to the dead-letter stream
+QUEUE_MAX_DELIVERIES = int(os.getenv('QUEUE_MAX_DELIVERIES', 3))
+
+# Share of dequeues each class gets while it has work: priority weight x platform weight
+PRIORITY_WEIGHTS = {
+    'high': float(os.getenv('QUEUE_WEIGHT_HIGH', 8)),
+    'normal': float(os.getenv('QUEUE_WEIGHT_NORMAL', 4)),
+    'low': float(os.getenv('QUEUE_WEIGHT_LOW', 1)),
+}
+
+# A fetched job: the class stream it came from and its entry id there
+JobEntry = namedtuple('JobEntry', ['stream', 'entry_id'])
+
+# A queue class and its dequeue weight
+QueueClass = namedtuple('QueueClass', ['platform', 'priority', 'stream', 'weight'])
+
+# Non-blocking XREADGROUP on each stream in KEYS (the fair order) until one
+# has new entries, all in one round trip. Returns {index, XREADGROUP reply}.
+# ARGV: group, consumer, count
+READ_FIRST_SCRIPT = """
+for i, stream in ipairs(KEYS) do
+    local reply = redis.call('XREADGROUP', 'GROUP', ARGV[1], ARGV[2], 'COUNT', ARGV[3], 'STREAMS', stream, '>')
+    if reply then
+        return {i, reply}
+    end
+end
+return false
+"""
+
+def job_stream(platform: str, priority: str = None) -> str:
+    """Stream a job of this platform and priority is queued on"""
+    return f"{JOB_STREAM_PREFIX}:{platform}:{priority or DEFAULT_PRIORITY}"
+
+def queue_classes() -> list:
+    """Every queue class with its weight (QUEUE_WEIGHT_<PRIORITY> x QUEUE_WEIGHT_<PLATFORM>)"""
+    classes = []
+    for platform in PLATFORMS:
+        platform_weight = float(os.getenv(f"QUEUE_WEIGHT_{platform.upper()}", 1))
+        for priority in PRIORITIES:
+            weight = PRIORITY_WEIGHTS[priority] * platform_weight
+            if weight > 0:
+                classes.append(QueueClass(platform, priority, job_stream(platform, priority), weight))
+    return classes
+
+def consumer_name() -> str:
+    """Unique consumer name for this worker process"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def decode_entry(fields: dict) -> dict:
+    """Job dict from a stream entry's fields"""
+    return json.loads(fields['job'])
+
+def entry_wait_ms(entry_id: str) -> int:
+    """Milliseconds since the entry was added (stream ids start with the add time)"""
+    return max(int(time.time() * 1000) - int(entry_id.split('-')[0]), 0)
+
+def _fields_dict(fields) -> dict:
+    """Entry fields from a raw script reply (flat [field, value, ...] list)"""
+    if isinstance(fields, dict):
+        return fields
+    return dict(zip(fields[::2], fields[1::2]))
+
+class _JobQueueBase:
+    """Settings, fair ordering and bookkeeping shared by the sync and async queues"""
+    
+    def __init__(self, client, consumer: str = None, prefetch: int = None,
+                 visibility_timeout: int = None, max_deliveries: int = None, on_dead_letter=None):
+        self.client = client
+        self.consumer = consumer or consumer_name()
+        self.prefetch = max(prefetch or QUEUE_PREFETCH, 1)
+        self.visibility_timeout_ms = (visibility_timeout or QUEUE_VISIBILITY_TIMEOUT) * 1000
+        self.max_deliveries = max_deliveries or QUEUE_MAX_DELIVERIES
+        self.on_dead_letter = on_dead_letter  # Called with the job dict of a poison job (awaited by AsyncJobQueue)
+        self.classes = queue_classes()
+        self.streams = [queue_class.stream for queue_class in self.classes]
+        self.held = set()  # JobEntry of every job fetched by this worker and not acked yet
+        self.passes = {stream: 0.0 for stream in self.streams}
+        self.reclaimed = 0
+        self.dead_lettered = 0
+    
+    @property
+    def heartbeat_interval(self) -> float:
+        """Seconds between heartbeats - well inside the visibility timeout"""
+        return self.visibility_timeout_ms / 1000 / 3
+    
+    def _fair_order(self) -> list:
+        """
+        Classes in the order to try them (stride scheduling)
+        
+        Every dequeue from a class advances its pass by 1/weight, and the class
+        with the lowest pass goes first. Under load each class gets dequeues in
+        proportion to its weight, so a TikTok backlog cannot starve Instagram,
+        and low priority work still moves while high priority work waits.
+        """
+        return sorted(self.classes, key=lambda queue_class: (self.passes[queue_class.stream], -queue_class.weight))
+    
+    def _charge(self, order: list, index: int, taken: int):
+        """Advance the pass of the class that served a read; classes tried before it were empty"""
+        served = order[index]
+        now = self.passes[served.stream]
+        for empty in order[:index]:
+            # An idle class must not bank credit and then monopolize workers
+            self.passes[empty.stream] = max(self.passes[empty.stream], now)
+        self.passes[served.stream] += taken / served.weight
+    
+    def _idle(self):
+        """Nothing was queued: start every class level again"""
+        level = max(self.passes.values())
+        for stream in self.passes:
+            self.passes[stream] = level
+    
+    def _read_first_args(self, order: list, count: int) -> list:
+        return [len(order), *(queue_class.stream for queue_class in order), JOB_GROUP, self.consumer, count]
+    
+    def _stats_pipeline(self, entries: list):
+        """Record per-class dequeue counts and queue wait times"""
+        pipe = self.client.pipeline(transaction=False)
+        for entry in entries:
+            key = f"{QUEUE_STATS_PREFIX}:{entry.stream[len(JOB_STREAM_PREFIX) + 1:]}"
+            wait_ms = entry_wait_ms(entry.entry_id)
+            pipe.hincrby(key, 'dequeued', 1)
+            pipe.hincrby(key, 'wait_ms_total', wait_ms)
+            pipe.hset(key, 'last_wait_ms', wait_ms)
+            record_queue_wait(entry.stream, wait_ms)
+        return pipe
+    
+    def _heartbeat_pipeline(self):
+        pipe = self.client.pipeline(transaction=False)
+        by_stream = {}
+        for entry in self.held:
+            by_stream.setdefault(entry.stream, []).append(entry.entry_id)
+        for stream, entry_ids in by_stream.items():
+            pipe.xclaim(stream, JOB_GROUP, self.consumer, 0, entry_ids, justid=True)
+        return pipe
+    
+    def _dead_letter_fields(self, entry: JobEntry, fields: dict, deliveries: int) -> dict:
+        return {
+            'job': fields.get('job', ''),
+            'stream': entry.stream,
+            'entry_id': entry.entry_id,
+            'deliveries': deliveries,
+            'consumer': self.consumer,
+            'dead_at': int(time.time()),
+        }
+
+class JobQueue(_JobQueueBase):
+    """
+    Redis Streams job queue with a consumer group (sync redis client)
+    
+    Jobs are spread over one stream per platform and priority, and fetch()
+    serves the streams weighted-fair (see _fair_order). Jobs stay in the
+    group's pending list until ack() is called, so a job whose worker died is
+    not lost: once nobody has heartbeated it for the visibility timeout,
+    fetch() in another worker reclaims it with XAUTOCLAIM. Jobs delivered more
+    than max_deliveries times are moved to the dead-letter stream.
+    """
+    
+    def ensure_group(self):
+        """Create every class stream and its consumer group if they do not exist yet"""
+        pipe = self.client.pipeline(transaction=False)
+        for stream in self.streams:
+            pipe.xgroup_create(stream, JOB_GROUP, id='0', mkstream=True)
+        for result in pipe.execute(raise_on_error=False):
+            if isinstance(result, redis.ResponseError) and 'BUSYGROUP' not in str(result):
+                raise result
+    
+    def fetch(self, count: int = None, block_ms: int = 5000) -> list:
+        """
+        Take up to count jobs: stale ones from dead workers first, then new ones
+        from the class whose turn it is
+        
+        Returns:
+            list: (JobEntry, job_data) tuples; ack each one when it is done
+        """
+        count = count or self.prefetch
+        jobs = self._reclaim(count)
+        if not jobs:
+            jobs = self._read_fair(count)
+        if not jobs:
+            # Everything is empty: wait for the next job on any class
+            result = self.client.xreadgroup(JOB_GROUP, self.consumer, {stream: '>' for stream in self.streams},
+                                            count=count, block=block_ms)
+            for stream, entries in result or []:
+                jobs.extend(self._decode(stream, entries))
+            self._record_waits(jobs)
+        self.held.update(entry for entry, _ in jobs)
+        return jobs
+    
+    def ack(self, entry: JobEntry):
+        """Mark a job as done and drop it from its stream"""
+        pipe = self.client.pipeline()
+        pipe.xack(entry.stream, JOB_GROUP, entry.entry_id)
+        pipe.xdel(entry.stream, entry.entry_id)
+        try:
+            pipe.execute()
+        finally:
+            # Stop heartbeating it either way - if the ack was lost the job is reclaimed later
+            self.held.discard(entry)
+    
+    def release(self, entry: JobEntry, job_data: dict):
+        """Give back a job that was fetched but never started (re-queued at the tail of its class)"""
+        pipe = self.client.pipeline()
+        pipe.xadd(entry.stream, {'job': json.dumps(job_data)})
+        pipe.xack(entry.stream, JOB_GROUP, entry.entry_id)
+        pipe.xdel(entry.stream, entry.entry_id)
+        try:
+            pipe.execute()
+        finally:
+            self.held.discard(entry)
+    
+    def heartbeat(self):
+        """Reset the idle time of every held job so no other worker reclaims it"""
+        if not self.held:
+            return
+        try:
+            self._heartbeat_pipeline().execute()
+        except Exception as e:
+            logger.warning(f"Job heartbeat failed: {e}")
+    
+    def start_heartbeat(self) -> threading.Event:
+        """Heartbeat held jobs from a daemon thread until the returned event is set"""
+        stop = threading.Event()
+        
+        def beat():
+            while not stop.wait(self.heartbeat_interval):
+                self.heartbeat()
+        
+        threading.Thread(target=beat, name='job-heartbeat', daemon=True).start()
+        return stop
+    
+    def _read_fair(self, count: int) -> list:
+        """Read new jobs from the first non-empty class in fair order (one round trip)"""
+        order = self._fair_order()
+        reply = self.client.eval(READ_FIRST_SCRIPT, *self._read_first_args(order, count))
+        if not reply:
+            self._idle()
+            return []
+        index, streams = int(reply[0]) - 1, reply[1]
+        jobs = []
+        for stream, entries in streams:
+            jobs.extend(self._decode(stream, entries))
+        self._charge(order, index, max(len(jobs), 1))
+        self._record_waits(jobs)
+        return jobs
+    
+    def _record_waits(self, jobs: list):
+        if not jobs:
+            return
+        try:
+            self._stats_pipeline([entry for entry, _ in jobs]).execute()
+        except Exception as e:
+            logger.warning(f"Failed to record queue stats: {e}")
+    
+    def _reclaim(self, count: int) -> list:
+        """XAUTOCLAIM entries idle past the visibility timeout, dead-lettering poison jobs"""
+        pipe = self.client.pipeline(transaction=False)
+        for stream in self.streams:
+            pipe.xautoclaim(stream, JOB_GROUP, self.consumer, self.visibility_timeout_ms,
+                            start_id='0-0', count=count)
+        jobs = []
+        for stream, result in zip(self.streams, pipe.execute()):
+            for entry_id, fields in (result[1] if result else []):
+                if fields is None:
+                    continue  # Deleted from the stream while pending
+                entry = JobEntry(stream, entry_id)
+                deliveries = self._deliveries(entry)
+                if deliveries > self.max_deliveries:
+                    self._dead_letter(entry, fields, deliveries)
+                    continue
+                logger.info(f"♻️ Reclaimed stale job entry {entry_id} from {stream} (delivery {deliveries})")
+                self.reclaimed += 1
+                QUEUE_RECLAIMED.inc()
+                jobs.extend(self._decode(stream, [(entry_id, fields)]))
+        return jobs
+    
+    def _deliveries(self, entry: JobEntry) -> int:
+        pending = self.client.xpending_range(entry.stream, JOB_GROUP, min=entry.entry_id, max=entry.entry_id, count=1)
+        return pending[0]['times_delivered'] if pending else 1
+    
+    def _dead_letter(self, entry: JobEntry, fields: dict, deliveries: int):
+        pipe = self.client.pipeline()
+        pipe.xadd(DEAD_LETTER_STREAM, self._dead_letter_fields(entry, fields, deliveries))
+        pipe.xack(entry.stream, JOB_GROUP, entry.entry_id)
+        pipe.xdel(entry.stream, entry.entry_id)
+        pipe.execute()
+        self.dead_lettered += 1
+        QUEUE_DEAD_LETTERED.inc()
+        logger.error(f"☠️ Moved job entry {entry.entry_id} from {entry.stream} to {DEAD_LETTER_STREAM} (deliveries: {deliveries})")
+        if self.on_dead_letter:
+            try:
+                self.on_dead_letter(decode_entry(fields))
+            except Exception as e:
+                logger.warning(f"Dead-letter callback failed: {e}")
+    
+    def _decode(self, stream: str, entries) -> list:
+        """(JobEntry, job_data) tuples; unreadable entries are dead-lettered right away"""
+        jobs = []
+        for entry_id, fields in entries:
+            entry = JobEntry(stream, entry_id)
+            fields = _fields_dict(fields)
+            try:
+                jobs.append((entry, decode_entry(fields)))
+            except (KeyError, ValueError) as e:
+                logger.error(f"Unreadable job entry {entry_id} in {stream}: {e}")
+                self._dead_letter(entry, fields, 0)
+        return jobs
+
+class AsyncJobQueue(_JobQueueBase):
+    """redis.asyncio counterpart of JobQueue, used by the async worker"""
+    
+    async def ensure_group(self):
+        """Create every class stream and its consumer group if they do not exist yet"""
+        pipe = self.client.pipeline(transaction=False)
+        for stream in self.streams:
+            pipe.xgroup_create(stream, JOB_GROUP, id='0', mkstream=True)
+        for result in await pipe.execute(raise_on_error=False):
+            if isinstance(result, redis.ResponseError) and 'BUSYGROUP' not in str(result):
+                raise result
+    
+    async def fetch(self, count: int = None, block_ms: int = 5000) -> list:
+        """Take up to count jobs: stale ones from dead workers first, then new ones from the class whose turn it is"""
+        count = count or self.prefetch
+        jobs = await self._reclaim(count)
+        if not jobs:
+            jobs = await self._read_fair(count)
+        if not jobs:
+            result = await self.client.xreadgroup(JOB_GROUP, self.consumer, {stream: '>' for stream in self.streams},
+                                                  count=count, block=block_ms)
+            for stream, entries in result or []:
+                jobs.extend(await self._decode(stream, entries))
+            await self._record_waits(jobs)
+        self.held.update(entry for entry, _ in jobs)
+        return jobs
+    
+    async def ack(self, entry: JobEntry):
+        """Mark a job as done and drop it from its stream"""
+        pipe = self.client.pipeline()
+        pipe.xack(entry.stream, JOB_GROUP, entry.entry_id)
+        pipe.xdel(entry.stream, entry.entry_id)
+        try:
+            await pipe.execute()
+        finally:
+            self.held.discard(entry)
+    
+    async def release(self, entry: JobEntry, job_data: dict):
+        """Give back a job that was fetched but never started (re-queued at the tail of its class)"""
+        pipe = self.client.pipeline()
+        pipe.xadd(entry.stream, {'job': json.dumps(job_data)})
+        pipe.xack(entry.stream, JOB_GROUP, entry.entry_id)
+        pipe.xdel(entry.stream, entry.entry_id)
+        try:
+            await pipe.execute()
+        finally:
+            self.held.discard(entry)
+    
+    async def heartbeat(self):
+        """Reset the idle time of every held job so no other worker reclaims it"""
+        if not self.held:
+            return
+        try:
+            await self._heartbeat_pipeline().execute()
+        except Exception as e:
+            logger.warning(f"Job heartbeat failed: {e}")
+    
+    async def run_heartbeat(self):
+        """Heartbeat held jobs until the task is cancelled"""
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            await self.heartbeat()
+    
+    async def _read_fair(self, count: int) -> list:
+        order = self._fair_order()
+        reply = await self.client.eval(READ_FIRST_SCRIPT, *self._read_first_args(order, count))
+        if not reply:
+            self._idle()
+            return []
+        index, streams = int(reply[0]) - 1, reply[1]
+        jobs = []
+        for stream, entries in streams:
+            jobs.extend(await self._decode(stream, entries))
+        self._charge(order, index, max(len(jobs), 1))
+        await self._record_waits(jobs)
+        return jobs
+    
+    async def _record_waits(self, jobs: list):
+        if not jobs:
+            return
+        try:
+            await self._stats_pipeline([entry for entry, _ in jobs]).execute()
+        except Exception as e:
+            logger.warning(f"Failed to record queue stats: {e}")
+    
+    async def _reclaim(self, count: int) -> list:
+        pipe = self.client.pipeline(transaction=False)
+        for stream in self.streams:
+            pipe.xautoclaim(stream, JOB_GROUP, self.consumer, self.visibility_timeout_ms,
+                            start_id='0-0', count=count)
+        jobs = []
+        for stream, result in zip(self.streams, await pipe.execute()):
+            for entry_id, fields in (result[1] if result else []):
+                if fields is None:
+                    continue
+                entry = JobEntry(stream, entry_id)
+                deliveries = await self._deliveries(entry)
+                if deliveries > self.max_deliveries:
+                    await self._dead_letter(entry, fields, deliveries)
+                    continue
+                logger.info(f"♻️ Reclaimed stale job entry {entry_id} from {stream} (delivery {deliveries})")
+                self.reclaimed += 1
+                QUEUE_RECLAIMED.inc()
+                jobs.extend(await self._decode(stream, [(entry_id, fields)]))
+        return jobs
+    
+    async def _deliveries(self, entry: JobEntry) -> int:
+        pending = await self.client.xpending_range(entry.stream, JOB_GROUP, min=entry.entry_id, max=entry.entry_id,
+                                                   count=1)
+        return pending[0]['times_delivered'] if pending else 1
+    
+    async def _dead_letter(self, entry: JobEntry, fields: dict, deliveries: int):
+        pipe = self.client.pipeline()
+        pipe.xadd(DEAD_LETTER_STREAM, self._dead_letter_fields(entry, fields, deliveries))
+        pipe.xack(entry.stream, JOB_GROUP, entry.entry_id)
+        pipe.xdel(entry.stream, entry.entry_id)
+        await pipe.execute()
+        self.dead_lettered += 1
+        QUEUE_DEAD_LETTERED.inc()
+        logger.error(f"☠️ Moved job entry {entry.entry_id} from {entry.stream} to {DEAD_LETTER_STREAM} (deliveries: {deliveries})")
+        if self.on_dead_letter:
+            try:
+                await self.on_dead_letter(decode_entry(fields))
+            except Exception as e:
+                logger.warning(f"Dead-letter callback failed: {e}")
+    
+    async def _decode(self, stream: str, entries) -> list:
+        jobs = []
+        for entry_id, fields in entries:
+            entry = JobEntry(stream, entry_id)
+            fields = _fields_dict(fields)
+            try:
+                jobs.append((entry, decode_entry(fields)))
+            except (KeyError, ValueError) as e:
+                logger.error(f"Unreadable job entry {entry_id} in {stream}: {e}")
+                await self._dead_letter(entry, fields, 0)
+        return jobs
@@ -0,0 +1,137 @@
+import logging
+import os
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+# Job state is one Redis hash per job, created by the Crawl Trigger API
+JOB_STATE_TTL = 86400  # 24 hours
+
+# Live progress counters workers add to while a job runs
+PROGRESS_COUNTERS = ('comments_found', 'comments_sent', 'chunks_sent', 'bytes_sent', 'rate_limited_ms')
+
+# How long a completed crawl answers duplicate submissions of the same post
+CRAWL_RESULT_CACHE_TTL = int(os.getenv('CRAWL_RESULT_CACHE_TTL', 600))
+
+# Statuses that end a job and hand its dedupe slot back
+TERMINAL_STATUSES = ('completed', 'failed')
+
+# Runs with the terminal status write. Reads the job's dedupe_key (set by the
+# Crawl Trigger API), frees the in-flight slot if this job still owns it and,
+# on success, caches the job unless a larger crawl of the post is cached.
+# Incremental (monitor) jobs only hold a delta and partial jobs (stopped by
+# their deadline) may miss comments, so neither is cached.
+# KEYS: job hash. ARGV: job ID, status, cache TTL
+FINISH_DEDUPE_SCRIPT = """
+local job = redis.call('HMGET', KEYS[1], 'dedupe_key', 'max_comments', 'incremental', 'partial')
+if not job[1] then
+    return 0
+end
+local inflight = 'crawl_inflight:' .. job[1]
+if redis.call('HGET', inflight, 'job_id') == ARGV[1] then
+    redis.call('DEL', inflight)
+end
+if ARGV[2] == 'completed' and job[3] ~= '1' and job[4] ~= '1' then
+    local result = 'crawl_result:' .. job[1]
+    local cached = tonumber(redis.call('HGET', result, 'max_comments') or '0')
+    if tonumber(job[2] or '0') >= cached then
+        redis.call('HSET', result, 'job_id', ARGV[1], 'max_comments', job[2])
+        redis.call('EXPIRE', result, ARGV[3])
+    end
+end
+return 1
+"""
+
+def job_key(job_id: str) -> str:
+    """Redis key of a job's state hash"""
+    return f"job:{job_id}"
+
+def _now() -> str:
+    """RFC 3339 timestamp, as the Crawl Trigger API writes them"""
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+class _JobStateBase:
+    """Builds the pipelined writes shared by the sync and async job state"""
+    
+    def __init__(self, client, job_id: str):
+        self.client = client
+        self.job_id = job_id
+        self.key = job_key(job_id)
+    
+    def _pipeline(self, fields: dict, counters: dict = None):
+        """HINCRBY every counter and HSET every field in one round trip"""
+        pipe = self.client.pipeline(transaction=False)
+        for name, amount in (counters or {}).items():
+            if amount:
+                pipe.hincrby(self.key, name, amount)
+        pipe.hset(self.key, mapping={**fields, 'updated_at': _now()})
+        pipe.expire(self.key, JOB_STATE_TTL)
+        return pipe
+    
+    def _status_pipeline(self, status: str, error_message: str = None, phase: str = None, partial: bool = False):
+        """Status write, plus the dedupe slot/result cache update when the job ends"""
+        pipe = self._pipeline(self._status_fields(status, error_message, phase, partial))
+        if status in TERMINAL_STATUSES:
+            pipe.eval(FINISH_DEDUPE_SCRIPT, 1, self.key, self.job_id, status, CRAWL_RESULT_CACHE_TTL)
+        return pipe
+    
+    @staticmethod
+    def _status_fields(status: str, error_message: str = None, phase: str = None, partial: bool = False) -> dict:
+        fields = {'status': status}
+        if error_message:
+            fields['error_message'] = error_message
+        if phase:
+            fields['phase'] = phase
+        if partial:
+            fields['partial'] = 1
+        return fields
+
+class JobState(_JobStateBase):
+    """
+    Writes a job's status and live progress to its `job:{id}` hash
+    
+    Every update is a single pipelined round trip, and the Crawl Trigger API
+    reads the whole hash with one HGETALL. Failures are logged, never raised, so
+    a Redis hiccup does not fail the crawl.
+    """
+    
+    def set_status(self, status: str, error_message: str = None, phase: str = None, partial: bool = False):
+        """Set status (and optionally error_message and phase); partial marks a job cut short by its deadline"""
+        try:
+            self._status_pipeline(status, error_message, phase, partial).execute()
+            logger.info(f"Updated job {self.job_id} status to: {status}")
+        except Exception as e:
+            logger.error(f"Failed to update job status: {e}")
+    
+    def set_phase(self, phase: str):
+        """Record which step of the crawl the job is in"""
+        self.add_progress(phase=phase)
+    
+    def add_progress(self, phase: str = None, **counters):
+        """Add to progress counters (see PROGRESS_COUNTERS), optionally moving to a new phase"""
+        try:
+            self._pipeline({'phase': phase} if phase else {}, counters).execute()
+        except Exception as e:
+            logger.warning(f"Failed to update job progress: {e}")
+
+class AsyncJobState(_JobStateBase):
+    """redis.asyncio counterpart of JobState, used by async crawlers"""
+    
+    async def set_status(self, status: str, error_message: str = None, phase: str = None, partial: bool = False):
+        """Set status (and optionally error_message and phase); partial marks a job cut short by its deadline"""
+        try:
+            await self._status_pipeline(status, error_message, phase, partial).execute()
+            logger.info(f"Updated job {self.job_id} status to: {status}")
+        except Exception as e:
+            logger.error(f"Failed to update job status: {e}")
+    
+    async def set_phase(self, phase: str):
+        """Record which step of the crawl the job is in"""
+        await self.add_progress(phase=phase)
+    
+    async def add_progress(self, phase: str = None, **counters):
+        """Add to progress counters, optionally moving to a new phase"""
+        try:
+            await self._pipeline({'phase': phase} if phase else {}, counters).execute()
+        except Exception as e:
+            logger.warning(f"Failed to update job progress: {e}")
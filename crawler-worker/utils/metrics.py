@@ -0,0 +1,99 @@
+import logging
+import os
+
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+
+logger = logging.getLogger(__name__)
+
+# Port of the /metrics endpoint (0 = off). Under the supervisor the worker
+# processes write to PROMETHEUS_MULTIPROC_DIR and the supervisor serves them all.
+METRICS_PORT = int(os.getenv('METRICS_PORT', 9464))
+
+# Seconds - crawl phases range from a cached login to a 10 minute comment scroll
+DURATION_BUCKETS = (0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300, 600)
+
+JOBS = Counter('crawler_jobs_total', 'Finished crawl jobs by outcome (completed, partial, failed)',
+               ['platform', 'outcome'])
+FAILURES = Counter('crawler_job_failures_total', 'Failed crawl jobs by reason (crawl, deadline, upload, dead_letter)',
+                   ['platform', 'reason'])
+JOB_DURATION = Histogram('crawler_job_duration_seconds', 'Wall time of a crawl job from start to final status',
+                         ['platform'], buckets=DURATION_BUCKETS)
+PHASE_DURATION = Histogram('crawler_phase_duration_seconds', 'Time spent in each crawl phase',
+                           ['platform', 'phase'], buckets=DURATION_BUCKETS)
+JOBS_IN_PROGRESS = Gauge('crawler_jobs_in_progress', 'Crawl jobs currently running', multiprocess_mode='livesum')
+
+COMMENTS = Counter('crawler_comments_total', 'Comments extracted and handed to the upload', ['platform'])
+SELECTOR_LOOKUPS = Counter('crawler_selector_lookups_total', 'Comment selector strategy lookups by result (hit, miss)',
+                           ['platform', 'selector', 'result'])
+SELECTOR_CACHE = Counter('crawler_selector_cache_lookups_total',
+                         'Selector lookups by which ranked strategy answered (first_try, fallback, miss)',
+                         ['platform', 'group', 'result'])
+RATE_LIMITED = Counter('crawler_rate_limited_seconds_total', 'Time spent waiting for rate-limit tokens', ['platform'])
+
+QUEUE_WAIT = Histogram('crawler_queue_wait_seconds', 'Time a job waited in its queue class before a worker took it',
+                       ['platform', 'priority'], buckets=DURATION_BUCKETS)
+QUEUE_RECLAIMED = Counter('crawler_queue_reclaimed_total', 'Jobs reclaimed from dead or stuck workers')
+QUEUE_DEAD_LETTERED = Counter('crawler_queue_dead_lettered_total', 'Jobs moved to the dead-letter stream')
+
+BROWSER_POOL = Gauge('crawler_browser_pool', 'Browser pool counters (hits, misses, launches, recycles, jobs on current browser)',
+                     ['stat'], multiprocess_mode='livesum')
+BROWSER_RSS = Gauge('crawler_browser_rss_bytes', 'Resident memory of the Playwright driver and Chromium processes',
+                    multiprocess_mode='livesum')
+
+def start_metrics_server():
+    """Serve /metrics for a worker started on its own (the supervisor serves its workers itself)"""
+    if not METRICS_PORT or os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        return
+    try:
+        start_http_server(METRICS_PORT)
+        logger.info(f"📈 Metrics on http://localhost:{METRICS_PORT}/metrics")
+    except OSError as e:
+        logger.warning(f"Metrics endpoint not started on port {METRICS_PORT}: {e}")
+
+def record_job(platform: str, outcome: str, reason: str = None, durations: dict = None):
+    """
+    Count a finished job and observe how long each of its phases took
+    
+    Args:
+        platform: Job platform
+        outcome: completed, partial or failed
+        reason: Failure reason for failed jobs
+        durations: Phase -> seconds (see utils.deadline.Deadline.finish)
+    """
+    platform = platform or 'unknown'
+    JOBS.labels(platform, outcome).inc()
+    if outcome == 'failed':
+        FAILURES.labels(platform, reason or 'crawl').inc()
+    durations = durations or {}
+    for phase, seconds in durations.items():
+        PHASE_DURATION.labels(platform, phase).observe(seconds)
+    JOB_DURATION.labels(platform).observe(sum(durations.values()))
+
+def record_comments(platform: str, count: int):
+    """Count comments a crawler extracted"""
+    COMMENTS.labels(platform or 'unknown').inc(count)
+
+def record_rate_limited(platform: str, seconds: float):
+    """Add time a crawler waited for rate-limit tokens"""
+    RATE_LIMITED.labels(platform or 'unknown').inc(seconds)
+
+def record_selector(platform: str, selector: str, hit: bool):
+    """Count one lookup of a comment selector strategy"""
+    SELECTOR_LOOKUPS.labels(platform or 'unknown', selector, 'hit' if hit else 'miss').inc()
+
+def record_selector_cache(platform: str, group: str, first_try: int, fallback: int, miss: int):
+    """Count lookups of a selector cache group by whether the top-ranked strategy answered them"""
+    for result, count in (('first_try', first_try), ('fallback', fallback), ('miss', miss)):
+        if count:
+            SELECTOR_CACHE.labels(platform or 'unknown', group, result).inc(count)
+
+def record_queue_wait(stream: str, wait_ms: int):
+    """Observe the queue wait of a job taken from a class stream (crawl_jobs_stream:{platform}:{priority})"""
+    _, platform, priority = stream.split(':', 2)
+    QUEUE_WAIT.labels(platform, priority).observe(wait_ms / 1000)
+
+def record_browser_pool(stats: dict):
+    """Publish a browser pool's stats() as gauges"""
+    for stat in ('hits', 'misses', 'launches', 'recycles', 'jobs_on_current_browser'):
+        BROWSER_POOL.labels(stat).set(stats.get(stat, 0))
+    BROWSER_RSS.set(stats.get('rss_mb', 0) * 1024 * 1024)
@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# Fleet-wide cap on page loads and load-more actions, shared by every worker through Redis
+RATE_LIMIT = os.getenv('RATE_LIMIT', 'true').lower() == 'true'
+
+# Defaults per platform; override with RATE_LIMIT_<PLATFORM>_PER_MIN / RATE_LIMIT_<PLATFORM>_BURST
+# (a rate of 0 leaves the platform unthrottled)
+DEFAULT_RATE_PER_MIN = 30
+DEFAULT_BURST = 10
+
+# Optional extra bucket per login account (0 = off), on top of the platform bucket
+RATE_LIMIT_ACCOUNT_PER_MIN = float(os.getenv('RATE_LIMIT_ACCOUNT_PER_MIN', 0))
+RATE_LIMIT_ACCOUNT_BURST = int(os.getenv('RATE_LIMIT_ACCOUNT_BURST', 5))
+
+# Takes one token from every bucket in KEYS in one atomic step. Each bucket is
+# a hash of {tokens, ts} refilled at its rate up to its burst. A token is
+# reserved even when the bucket is empty (tokens go negative), so callers queue
+# up in arrival order and sleep exactly once. Time comes from the Redis server,
+# so worker clocks don't matter.
+# ARGV: per bucket a (tokens per ms, burst) pair
+# Returns the milliseconds the caller must wait before acting
+TOKEN_BUCKET_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) * 1000 + math.floor(tonumber(now_parts[2]) / 1000)
+local wait = 0
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[i * 2 - 1])
+    local burst = tonumber(ARGV[i * 2])
+    local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(bucket[1]) or burst
+    local ts = tonumber(bucket[2]) or now
+    tokens = math.min(burst, tokens + math.max(0, now - ts) * rate) - 1
+    if tokens < 0 then
+        wait = math.max(wait, math.ceil(-tokens / rate))
+    end
+    redis.call('HSET', key, 'tokens', tostring(tokens), 'ts', now)
+    redis.call('PEXPIRE', key, math.ceil((burst - tokens) / rate) + 60000)
+end
+return wait
+"""
+
+def platform_limits(platform: str) -> tuple:
+    """(tokens per minute, burst) for a platform, from RATE_LIMIT_<PLATFORM>_PER_MIN / _BURST"""
+    prefix = f"RATE_LIMIT_{platform.upper()}"
+    per_min = float(os.getenv(f"{prefix}_PER_MIN", DEFAULT_RATE_PER_MIN))
+    burst = int(os.getenv(f"{prefix}_BURST", DEFAULT_BURST))
+    return per_min, burst
+
+class _RateLimiterBase:
+    """Bucket selection shared by the sync and async rate limiter"""
+    
+    def __init__(self, client):
+        self.client = client
+    
+    @staticmethod
+    def _buckets(platform: str, account: str = None) -> tuple:
+        """Keys and script arguments for the platform bucket and, when enabled, the account bucket"""
+        keys, args = [], []
+        per_min, burst = platform_limits(platform)
+        if per_min > 0:
+            keys.append(f"rate_limit:{platform}")
+            args.extend([per_min / 60000, burst])
+        if account and RATE_LIMIT_ACCOUNT_PER_MIN > 0:
+            keys.append(f"rate_limit:{platform}:account:{account}")
+            args.extend([RATE_LIMIT_ACCOUNT_PER_MIN / 60000, RATE_LIMIT_ACCOUNT_BURST])
+        return keys, args
+    
+    @staticmethod
+    def _log_wait(platform: str, action: str, wait_ms: int):
+        if wait_ms:
+            logger.info(f"⏳ Rate limit: waiting {wait_ms / 1000:.1f}s before {platform} {action}")
+    
+    @staticmethod
+    def _too_long(platform: str, action: str, wait_ms: int, max_wait: float) -> bool:
+        if max_wait is None or wait_ms / 1000 <= max_wait:
+            return False
+        logger.warning(f"⏳ Rate limit: skipping {platform} {action}, a {wait_ms / 1000:.1f}s wait exceeds "
+                       f"the {max(max_wait, 0):.1f}s left in the phase")
+        return True
+    
+    def _refund_pipeline(self, keys: list):
+        """Give back a reserved token that will not be used"""
+        pipe = self.client.pipeline(transaction=False)
+        for key in keys:
+            pipe.hincrbyfloat(key, 'tokens', 1)
+        return pipe
+
+class RateLimiter(_RateLimiterBase):
+    """
+    Distributed token bucket per platform (and optionally per account)
+    
+    Crawlers call acquire() before each navigation and load-more action, so the
+    total request rate against a platform stays under its configured cap no
+    matter how many workers run. Redis errors don't block crawling: the action
+    goes ahead unthrottled.
+    """
+    
+    def acquire(self, platform: str, account: str = None, action: str = 'request', max_wait: float = None) -> float:
+        """
+        Take a token, sleeping until it is available
+        
+        Args:
+            platform: Platform whose bucket to take from
+            account: Login account (for the per-account bucket)
+            action: What the token is for (logged)
+            max_wait: Longest acceptable wait in seconds; a longer wait is not slept
+                (the token is given back)
+        
+        Returns:
+            float: Seconds spent waiting, or None if the wait would exceed max_wait
+        """
+        keys, args = self._buckets(platform, account)
+        if not keys:
+            return 0.0
+        try:
+            wait_ms = int(self.client.eval(TOKEN_BUCKET_SCRIPT, len(keys), *keys, *args))
+        except Exception as e:
+            logger.warning(f"Rate limiter unavailable, not throttling: {e}")
+            return 0.0
+        if self._too_long(platform, action, wait_ms, max_wait):
+            try:
+                self._refund_pipeline(keys).execute()
+            except Exception as e:
+                logger.warning(f"Failed to give back rate-limit token: {e}")
+            return None
+        self._log_wait(platform, action, wait_ms)
+        if wait_ms:
+            time.sleep(wait_ms / 1000)
+        return wait_ms / 1000
+
+class AsyncRateLimiter(_RateLimiterBase):
+    """redis.asyncio counterpart of RateLimiter"""
+    
+    async def acquire(self, platform: str, account: str = None, action: str = 'request', max_wait: float = None) -> float:
+        """Take a token, sleeping until it is available; returns seconds spent waiting (see RateLimiter)"""
+        keys, args = self._buckets(platform, account)
+        if not keys:
+            return 0.0
+        try:
+            wait_ms = int(await self.client.eval(TOKEN_BUCKET_SCRIPT, len(keys), *keys, *args))
+        except Exception as e:
+            logger.warning(f"Rate limiter unavailable, not throttling: {e}")
+            return 0.0
+        if self._too_long(platform, action, wait_ms, max_wait):
+            try:
+                await self._refund_pipeline(keys).execute()
+            except Exception as e:
+                logger.warning(f"Failed to give back rate-limit token: {e}")
+            return None
+        self._log_wait(platform, action, wait_ms)
+        if wait_ms:
+            await asyncio.sleep(wait_ms / 1000)
+        return wait_ms / 1000
@@ -0,0 +1,152 @@
+import logging
+import os
+from fnmatch import fnmatch
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Set BLOCK_RESOURCES=false to let every request through (e.g. when debugging with HEADLESS=false)
+BLOCK_RESOURCES = os.getenv('BLOCK_RESOURCES', 'true').lower() == 'true'
+
+# Resource types no crawler needs to read comment text
+DEFAULT_BLOCKED_TYPES = ('media', 'image', 'font')
+
+# Tracking and telemetry endpoints, matched as URL substrings
+ANALYTICS_PATTERNS = (
+    'google-analytics.com',
+    'googletagmanager.com',
+    'doubleclick.net',
+    'connect.facebook.net/signals',
+)
+
+# reCAPTCHA, used by Facebook and Instagram challenges
+RECAPTCHA_ALLOW = (('www.google.com', '/recaptcha/'), ('www.gstatic.com', '/recaptcha/'))
+
+# Per platform: extra blocked types, extra analytics URLs, and the CAPTCHA and login
+# challenge endpoints that must always load, as (host glob, path prefix) pairs
+PLATFORM_RULES = {
+    'tiktok': {
+        'types': (),
+        'block': ('mon.tiktokv.com', 'mcs.tiktokw', '/web/report', 'analytics.tiktok.com'),
+        # The CAPTCHA puzzle is an image the user has to see to solve it
+        'allow': (
+            ('verification*.tiktokv.com', '/captcha/'),
+            ('verify*.tiktokv.com', '/captcha/'),
+            ('verification*.tiktokw.us', '/captcha/'),
+            ('*.ibyteimg.com', '/img/security-captcha'),
+        ),
+    },
+    'instagram': {
+        'types': (),
+        'block': ('/logging_client_events', '/ajax/bz', '/falco'),
+        'allow': (('www.instagram.com', '/challenge/'), ('i.instagram.com', '/challenge/')) + RECAPTCHA_ALLOW,
+    },
+    'facebook': {
+        'types': (),
+        'block': ('/ajax/bz', '/ajax/bnzai', '/falco', '/tr/'),
+        'allow': (
+            ('www.facebook.com', '/checkpoint/'),
+            ('m.facebook.com', '/checkpoint/'),
+            ('www.facebook.com', '/captcha/'),
+            ('www.fbsbx.com', '/captcha/'),
+        ) + RECAPTCHA_ALLOW,
+    },
+}
+
+# Typical transfer size per aborted request. The bandwidth saved is only estimated from
+# these (aborted requests never report a size), hence estimated_bytes_saved.
+ESTIMATED_BYTES_PER_REQUEST = {
+    'media': 1_500_000,
+    'image': 40_000,
+    'font': 60_000,
+    'script': 30_000,
+}
+DEFAULT_ESTIMATED_BYTES_PER_REQUEST = 5_000
+
+def blocked_types_from_env() -> tuple:
+    """Resource types to abort (BLOCK_RESOURCE_TYPES, comma separated)"""
+    value = os.getenv('BLOCK_RESOURCE_TYPES')
+    if value is None:
+        return DEFAULT_BLOCKED_TYPES
+    return tuple(t.strip() for t in value.split(',') if t.strip())
+
+class ResourceBlocker:
+    """
+    Aborts requests a crawl does not need, via BrowserContext.route
+    
+    Media, images and fonts are dropped by resource type and analytics beacons by
+    URL. Requests to the platform's CAPTCHA and login challenge endpoints (allow
+    list host and path) always load. One blocker is attached per job context, so
+    its counters are the job's totals.
+    """
+    
+    def __init__(self, platform: str = None, blocked_types=None):
+        rules = PLATFORM_RULES.get(platform, {})
+        self.platform = platform
+        self.blocked_types = set(blocked_types if blocked_types is not None else blocked_types_from_env())
+        self.blocked_types.update(rules.get('types', ()))
+        self.block_patterns = ANALYTICS_PATTERNS + tuple(rules.get('block', ()))
+        self.allow_rules = tuple(rules.get('allow', ()))
+        self.allowed = 0
+        self.blocked = 0
+        self.blocked_by_type = {}
+        self.estimated_bytes_saved = 0
+    
+    def allowed_url(self, url: str) -> bool:
+        """True for a CAPTCHA or login challenge endpoint of the platform"""
+        parts = urlsplit(url)
+        host = (parts.hostname or '').lower()
+        return any(fnmatch(host, host_glob) and parts.path.startswith(path)
+                   for host_glob, path in self.allow_rules)
+    
+    def should_block(self, request) -> bool:
+        """Decide from the request's resource type and URL"""
+        if self.allowed_url(request.url):
+            return False
+        url = request.url.lower()
+        if request.resource_type in self.blocked_types:
+            return True
+        return any(pattern in url for pattern in self.block_patterns)
+    
+    def attach(self, context):
+        """Route every request of a sync BrowserContext through the blocker"""
+        context.route('**/*', self.handle)
+    
+    async def async_attach(self, context):
+        """Route every request of an async BrowserContext through the blocker"""
+        await context.route('**/*', self.async_handle)
+    
+    def handle(self, route):
+        """Route handler (sync API)"""
+        if self._decide(route.request):
+            route.abort('blockedbyclient')
+        else:
+            route.continue_()
+    
+    async def async_handle(self, route):
+        """Route handler (async API)"""
+        if self._decide(route.request):
+            await route.abort('blockedbyclient')
+        else:
+            await route.continue_()
+    
+    def stats(self) -> dict:
+        """Per-job counters for logging"""
+        return {
+            'allowed': self.allowed,
+            'blocked': self.blocked,
+            'blocked_by_type': dict(self.blocked_by_type),
+            'estimated_bytes_saved': self.estimated_bytes_saved,
+        }
+    
+    def _decide(self, request) -> bool:
+        """should_block plus bookkeeping"""
+        if not self.should_block(request):
+            self.allowed += 1
+            return False
+        
+        resource_type = request.resource_type
+        self.blocked += 1
+        self.blocked_by_type[resource_type] = self.blocked_by_type.get(resource_type, 0) + 1
+        self.estimated_bytes_saved += ESTIMATED_BYTES_PER_REQUEST.get(resource_type, DEFAULT_ESTIMATED_BYTES_PER_REQUEST)
+        return True
@@ -0,0 +1,195 @@
+import logging
+import os
+import time
+
+from utils.metrics import record_selector_cache
+
+logger = logging.getLogger(__name__)
+
+# Try the selector strategies that matched recently first (off = always the declared order)
+SELECTOR_CACHE = os.getenv('SELECTOR_CACHE', 'true').lower() == 'true'
+# Seconds between reloads of a ranking from Redis (rankings learned by other workers)
+SELECTOR_CACHE_REFRESH = int(os.getenv('SELECTOR_CACHE_REFRESH', 60))
+# A ranking expires this long after it was first written, so the declared order is re-probed now and then
+SELECTOR_CACHE_TTL = int(os.getenv('SELECTOR_CACHE_TTL', 21600))  # 6 hours
+
+# Applies one lookup's outcome to a ranking hash of selector -> score: a hit
+# adds 1, a miss (tried ahead of the match, matched nothing) resets to 0. The
+# TTL is only set on a new hash, so the ranking starts over SELECTOR_CACHE_TTL
+# after it was first learned however often it is updated.
+# KEYS: ranking hash. ARGV: TTL, then (selector, 1 = hit / 0 = miss) pairs
+RECORD_SCRIPT = """
+for i = 2, #ARGV, 2 do
+    if ARGV[i + 1] == '1' then
+        redis.call('HINCRBY', KEYS[1], ARGV[i], 1)
+    else
+        redis.call('HSET', KEYS[1], ARGV[i], 0)
+    end
+end
+if redis.call('TTL', KEYS[1]) < 0 then
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+return 1
+"""
+
+def ranking_key(platform: str, group: str) -> str:
+    """Redis key of the ranking of one group of selector strategies"""
+    return f"selector_rank:{platform}:{group}"
+
+class _SelectorCacheBase:
+    """In-process rankings and hit-rate bookkeeping shared by the sync and async cache"""
+    
+    def __init__(self, client, refresh: int = None):
+        self.client = client
+        self.refresh = SELECTOR_CACHE_REFRESH if refresh is None else refresh
+        self.scores = {}  # (platform, group) -> {selector: score}
+        self.loaded_at = {}  # (platform, group) -> monotonic time of the last reload
+        self.lookups = {}  # (platform, group) -> {'first_try': n, 'fallback': n, 'miss': n}
+    
+    def _stale(self, platform: str, group: str) -> bool:
+        loaded_at = self.loaded_at.get((platform, group))
+        return loaded_at is None or time.monotonic() - loaded_at >= self.refresh
+    
+    def _loaded(self, platform: str, group: str, scores: dict = None):
+        """Replace the local ranking with the fleet's (None keeps it, after a failed reload)"""
+        if scores is not None:
+            self.scores[(platform, group)] = {selector: int(score) for selector, score in scores.items()}
+        self.loaded_at[(platform, group)] = time.monotonic()
+    
+    def _order(self, platform: str, group: str, strategies: list) -> list:
+        # Stable sort: strategies without a score keep their declared order
+        scores = self.scores.get((platform, group), {})
+        return sorted(strategies, key=lambda selector: -scores.get(selector, 0))
+    
+    def _pruned(self, platform: str, group: str, strategies: list) -> list:
+        # A score of 0 means the strategy missed since it last matched; the rest keep their declared order
+        scores = self.scores.get((platform, group), {})
+        kept = [selector for selector in strategies if scores.get(selector) != 0]
+        return kept or list(strategies)
+    
+    def _outcome(self, platform: str, group: str, tried: list, hits: dict, lookups: int) -> list:
+        """
+        Count a lookup's hit rate and update the local ranking
+        
+        Returns:
+            list: (selector, 1 = hit / 0 = miss) pairs for RECORD_SCRIPT
+        """
+        matched = [selector for selector in tried if hits.get(selector)]
+        first_try = hits.get(tried[0], 0) if tried else 0
+        found = sum(hits.get(selector, 0) for selector in tried)
+        counts = self.lookups.setdefault((platform, group), {'first_try': 0, 'fallback': 0, 'miss': 0})
+        counts['first_try'] += first_try
+        counts['fallback'] += found - first_try
+        counts['miss'] += max(0, lookups - found)
+        record_selector_cache(platform, group, first_try, found - first_try, max(0, lookups - found))
+        
+        if not matched:
+            # Nothing matched (page not rendered yet, or blocked): no evidence against any strategy
+            return []
+        # Strategies tried ahead of the last match that never matched are demoted
+        last = tried.index(matched[-1])
+        updates = [(selector, 1 if hits.get(selector) else 0) for selector in tried[:last + 1]]
+        scores = self.scores.setdefault((platform, group), {})
+        for selector, hit in updates:
+            scores[selector] = scores.get(selector, 0) + 1 if hit else 0
+        return updates
+    
+    @staticmethod
+    def _script_args(updates: list) -> list:
+        args = [SELECTOR_CACHE_TTL]
+        for selector, hit in updates:
+            args.extend([selector, hit])
+        return args
+    
+    def stats(self) -> dict:
+        """First-try hit rate per platform/group since this process started"""
+        stats = {}
+        for (platform, group), counts in self.lookups.items():
+            total = sum(counts.values())
+            stats[f"{platform}/{group}"] = {
+                **counts,
+                'first_try_rate': round(counts['first_try'] / total, 3) if total else None,
+            }
+        return stats
+
+class SelectorCache(_SelectorCacheBase):
+    """
+    Ranks a crawler's selector strategies by how recently they matched
+    
+    Crawlers walk their strategies in ranked() order and report what matched
+    to record(): strategies that keep matching move to the front, strategies
+    that stop matching drop back to their declared place. Precedence lists
+    (field specs, where the first match wins) are walked in pruned() order
+    instead, which keeps the declared order. Rankings are shared
+    by the fleet through Redis and cached in-process for SELECTOR_CACHE_REFRESH
+    seconds. Redis errors are logged, never raised: crawlers fall back to the
+    local (or declared) order.
+    """
+    
+    def _reload(self, platform: str, group: str):
+        if self._stale(platform, group):
+            try:
+                self._loaded(platform, group, self.client.hgetall(ranking_key(platform, group)))
+            except Exception as e:
+                logger.warning(f"Failed to load selector ranking {platform}/{group}: {e}")
+                self._loaded(platform, group)
+    
+    def ranked(self, platform: str, group: str, strategies: list) -> list:
+        """Strategies in the order to try them: recent winners first, then the declared order"""
+        self._reload(platform, group)
+        return self._order(platform, group, strategies)
+    
+    def pruned(self, platform: str, group: str, strategies: list) -> list:
+        """Strategies in their declared order, without those that recently missed (all of them if every one did)"""
+        self._reload(platform, group)
+        return self._pruned(platform, group, strategies)
+    
+    def record(self, platform: str, group: str, tried: list, hits: dict, lookups: int = 1):
+        """
+        Report the outcome of walking strategies in ranked() or pruned() order
+        
+        Args:
+            platform: Crawler platform
+            group: Name of the strategy list (e.g. comment_item, field:text)
+            tried: Strategies in the order they were tried
+            hits: Strategy -> number of lookups it answered
+            lookups: Lookups made (1 for a single probe, one per node for field specs)
+        """
+        updates = self._outcome(platform, group, tried, hits, lookups)
+        if not updates:
+            return
+        try:
+            self.client.eval(RECORD_SCRIPT, 1, ranking_key(platform, group), *self._script_args(updates))
+        except Exception as e:
+            logger.warning(f"Failed to update selector ranking {platform}/{group}: {e}")
+
+class AsyncSelectorCache(_SelectorCacheBase):
+    """redis.asyncio counterpart of SelectorCache, used by async crawlers"""
+    
+    async def _reload(self, platform: str, group: str):
+        if self._stale(platform, group):
+            try:
+                self._loaded(platform, group, await self.client.hgetall(ranking_key(platform, group)))
+            except Exception as e:
+                logger.warning(f"Failed to load selector ranking {platform}/{group}: {e}")
+                self._loaded(platform, group)
+    
+    async def ranked(self, platform: str, group: str, strategies: list) -> list:
+        """Strategies in the order to try them: recent winners first, then the declared order"""
+        await self._reload(platform, group)
+        return self._order(platform, group, strategies)
+    
+    async def pruned(self, platform: str, group: str, strategies: list) -> list:
+        """Strategies in their declared order, without those that recently missed (see SelectorCache)"""
+        await self._reload(platform, group)
+        return self._pruned(platform, group, strategies)
+    
+    async def record(self, platform: str, group: str, tried: list, hits: dict, lookups: int = 1):
+        """Report the outcome of walking strategies in ranked() or pruned() order (see SelectorCache)"""
+        updates = self._outcome(platform, group, tried, hits, lookups)
+        if not updates:
+            return
+        try:
+            await self.client.eval(RECORD_SCRIPT, 1, ranking_key(platform, group), *self._script_args(updates))
+        except Exception as e:
+            logger.warning(f"Failed to update selector ranking {platform}/{group}: {e}")
@@ -0,0 +1,93 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SESSION_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sessions')
+
+# Treat cookies expiring within this window as already expired
+EXPIRY_MARGIN_SECONDS = 600
+
+def has_valid_auth_cookie(cookies: list, auth_cookie_names, now: float = None) -> bool:
+    """True if any of the platform's auth cookies is present, non-empty and not about to expire"""
+    now = now or time.time()
+    for cookie in cookies:
+        if cookie.get('name') not in auth_cookie_names or not cookie.get('value'):
+            continue
+        expires = cookie.get('expires', -1)
+        # -1 means a browser-session cookie, which Playwright persists fine
+        if expires == -1 or expires > now + EXPIRY_MARGIN_SECONDS:
+            return True
+    return False
+
+class SessionStore:
+    """
+    Disk cache of Playwright storage_state (cookies + localStorage) per platform account.
+    
+    Files are written atomically so several worker processes can share one
+    directory. Validation is local only: a session is considered usable while
+    its auth cookie exists and has not expired.
+    """
+    
+    def __init__(self, base_dir: str = None):
+        self.base_dir = base_dir or os.getenv('SESSION_DIR', DEFAULT_SESSION_DIR)
+        os.makedirs(self.base_dir, exist_ok=True)
+    
+    def path_for(self, platform: str, account: str) -> str:
+        """Session file for an account (the account name is hashed out of the filename)"""
+        account_hash = hashlib.sha1(account.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.base_dir, f"{platform}_{account_hash}.json")
+    
+    def load(self, platform: str, account: str, auth_cookie_names) -> dict:
+        """Return the cached storage_state if it still holds a valid auth cookie, else None"""
+        path = self.path_for(platform, account)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Unreadable {platform} session file, ignoring it: {e}")
+            return None
+        
+        if not has_valid_auth_cookie(state.get('cookies', []), auth_cookie_names):
+            logger.info(f"Saved {platform} session for {account} has expired")
+            self.invalidate(platform, account)
+            return None
+        
+        return state
+    
+    def save(self, platform: str, account: str, state: dict, auth_cookie_names) -> bool:
+        """Persist a context's storage_state if it contains a logged-in session"""
+        if not has_valid_auth_cookie(state.get('cookies', []), auth_cookie_names):
+            logger.warning(f"No {platform} auth cookie after login - session not saved")
+            return False
+        
+        path = self.path_for(platform, account)
+        fd, tmp_path = tempfile.mkstemp(dir=self.base_dir, prefix='.tmp_', suffix='.json')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(state, f)
+            os.chmod(tmp_path, 0o600)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to save {platform} session: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+        
+        logger.info(f"💾 Saved {platform} session for {account}")
+        return True
+    
+    def invalidate(self, platform: str, account: str):
+        """Forget the cached session so the next job logs in again"""
+        try:
+            os.remove(self.path_for(platform, account))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Failed to remove {platform} session file: {e}")
@@ -0,0 +1,320 @@
+import contextvars
+import cProfile
+import inspect
+import json
+import logging
+import os
+import secrets
+import time
+from contextlib import contextmanager
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Trace every job (otherwise only jobs submitted with "trace" or "profile")
+TRACE_JOBS = os.getenv('TRACE_JOBS', 'false').lower() == 'true'
+# Where traces, cProfile dumps and Playwright traces are written
+TRACE_DIR = os.getenv('TRACE_DIR', 'traces')
+# OTLP/HTTP traces endpoint of a local collector, e.g. http://localhost:4318/v1/traces (empty = JSON files only)
+TRACE_OTLP_ENDPOINT = os.getenv('TRACE_OTLP_ENDPOINT', '')
+# Spans kept per job; later ones are counted as dropped so a runaway loop cannot eat the worker's memory
+TRACE_MAX_SPANS = int(os.getenv('TRACE_MAX_SPANS', 20000))
+
+# Playwright calls that only build a handle locally - returned traced, without a span of their own
+LOCAL_CALLS = ('locator', 'first', 'last', 'nth', 'filter', 'on', 'once', 'remove_listener', 'is_closed')
+
+# Longest argument kept as a span attribute (selectors, URLs, script heads)
+MAX_ATTRIBUTE_LENGTH = 200
+
+# Innermost open span of the running crawl (per thread and per asyncio task)
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+def job_flag(job_data: dict, name: str) -> bool:
+    """Whether a boolean job option is set (true in the stream payload, '1' in the job hash)"""
+    return str(job_data.get(name, '')).lower() in ('true', '1')
+
+def trace_for_job(job_data: dict):
+    """JobTrace for a job that asked for one (or for every job with TRACE_JOBS), else None"""
+    profile = job_flag(job_data, 'profile')
+    if not (TRACE_JOBS or profile or job_flag(job_data, 'trace')):
+        return None
+    return JobTrace(job_data.get('job_id'), job_data.get('platform'), profile=profile)
+
+def _short(value) -> str:
+    text = str(value)
+    return text if len(text) <= MAX_ATTRIBUTE_LENGTH else text[:MAX_ATTRIBUTE_LENGTH] + '…'
+
+class Span:
+    """One timed step of a job"""
+    
+    __slots__ = ('trace', 'span_id', 'parent_id', 'name', 'start_ns', 'end_ns', 'attributes', 'error')
+    
+    def __init__(self, trace, name: str, parent_id: str, attributes: dict):
+        self.trace = trace
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes
+        self.error = None
+    
+    def set(self, **attributes):
+        """Add attributes known only once the step has run (match counts, status codes)"""
+        self.attributes.update(attributes)
+    
+    def end(self, error: BaseException = None):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+        if error is not None:
+            self.error = f"{error.__class__.__name__}: {_short(error)}"
+    
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+class JobTrace:
+    """
+    Timeline of one crawl job: a root span, one span per crawl phase and
+    nested spans for selector probes, Playwright calls and upload chunks
+    
+    finish() writes it to TRACE_DIR/<job_id>.json and, with TRACE_OTLP_ENDPOINT,
+    exports it to an OpenTelemetry collector. With profile=True the worker side
+    also runs under cProfile (<job_id>.prof) and crawlers record a Playwright
+    trace of the browser side (<job_id>.playwright.zip, open with
+    `playwright show-trace`).
+    """
+    
+    def __init__(self, job_id: str, platform: str, profile: bool = False):
+        self.job_id = job_id
+        self.platform = platform
+        self.profile = profile
+        self.trace_id = secrets.token_hex(16)
+        self.spans = []
+        self.dropped = 0
+        self.root = self._add(Span(self, 'crawl_job', None, {'job_id': job_id, 'platform': platform}))
+        self.phase_span = None
+        self.phase('starting')
+        self.profiler = None
+        if profile:
+            os.makedirs(TRACE_DIR, exist_ok=True)
+            self._start_profiler()
+    
+    @property
+    def browser_trace_path(self) -> str:
+        """Where crawlers save the Playwright trace of a profiled job"""
+        return os.path.join(TRACE_DIR, f"{self.job_id}.playwright.zip")
+    
+    def _add(self, span: Span) -> Span:
+        if len(self.spans) < TRACE_MAX_SPANS:
+            self.spans.append(span)
+        else:
+            self.dropped += 1
+        return span
+    
+    def _parent_id(self) -> str:
+        current = _current_span.get()
+        if current is not None and current.trace is self and current.end_ns is None:
+            return current.span_id
+        return (self.phase_span or self.root).span_id
+    
+    def start_span(self, name: str, **attributes) -> Span:
+        """Open a span under the innermost open one; the caller ends it"""
+        return self._add(Span(self, name, self._parent_id(), attributes))
+    
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """Time a block (sync or async code) as a span; spans opened inside it become its children"""
+        span = self.start_span(name, **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.end(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+    
+    def phase(self, phase: str):
+        """Close the current phase span and open the next (called with every set_phase)"""
+        if self.phase_span is not None:
+            if self.phase_span.name == f"phase:{phase}":
+                return
+            self.phase_span.end()
+        self.phase_span = self._add(Span(self, f"phase:{phase}", self.root.span_id, {'phase': phase}))
+    
+    def wrap(self, obj):
+        """Proxy for a Playwright page (or any Playwright object) that records a span per call"""
+        return TracedPlaywright(obj, self)
+    
+    def _start_profiler(self):
+        self.profiler = cProfile.Profile()
+        try:
+            self.profiler.enable()
+        except ValueError as e:
+            # Another job of this process is being profiled (async worker)
+            logger.warning(f"cProfile not started for job {self.job_id}: {e}")
+            self.profiler = None
+    
+    def finish(self, **attributes):
+        """End all spans, write the trace (and profile) and export it to the collector"""
+        if self.profiler:
+            self.profiler.disable()
+        if self.phase_span is not None:
+            self.phase_span.end()
+        self.root.set(**attributes)
+        self.root.end()
+        
+        try:
+            os.makedirs(TRACE_DIR, exist_ok=True)
+            path = os.path.join(TRACE_DIR, f"{self.job_id}.json")
+            with open(path, 'w') as f:
+                json.dump(self.to_dict(), f)
+            if self.profiler:
+                self.profiler.dump_stats(os.path.join(TRACE_DIR, f"{self.job_id}.prof"))
+        except OSError as e:
+            logger.warning(f"Failed to write trace of job {self.job_id}: {e}")
+            return
+        logger.info(f"🧵 Trace of job {self.job_id}: {len(self.spans)} spans in {path} ({self.summary()})")
+        
+        if TRACE_OTLP_ENDPOINT:
+            self.export_otlp(TRACE_OTLP_ENDPOINT)
+    
+    def summary(self) -> str:
+        """Time per phase, e.g. 'loading_page 12.3s, loading_comments 80.1s'"""
+        phases = [span for span in self.spans if span.name.startswith('phase:')]
+        return ', '.join(f"{span.attributes['phase']} {span.duration_ms / 1000:.1f}s" for span in phases)
+    
+    def to_dict(self) -> dict:
+        """Trace as written to TRACE_DIR: span offsets and durations in milliseconds from the job start"""
+        return {
+            'job_id': self.job_id,
+            'platform': self.platform,
+            'trace_id': self.trace_id,
+            'started_at': self.root.start_ns / 1e9,
+            'duration_ms': round(self.root.duration_ms, 3),
+            'dropped_spans': self.dropped,
+            'spans': [{
+                'name': span.name,
+                'span_id': span.span_id,
+                'parent_id': span.parent_id,
+                'start_ms': round((span.start_ns - self.root.start_ns) / 1e6, 3),
+                'duration_ms': round(span.duration_ms, 3),
+                'attributes': span.attributes,
+                'error': span.error,
+            } for span in self.spans],
+        }
+    
+    def to_otlp(self) -> dict:
+        """Trace as an OTLP/HTTP JSON ExportTraceServiceRequest"""
+        def attribute(key, value):
+            if isinstance(value, bool):
+                return {'key': key, 'value': {'boolValue': value}}
+            if isinstance(value, int):
+                return {'key': key, 'value': {'intValue': str(value)}}
+            if isinstance(value, float):
+                return {'key': key, 'value': {'doubleValue': value}}
+            return {'key': key, 'value': {'stringValue': str(value)}}
+        
+        spans = []
+        for span in self.spans:
+            otlp_span = {
+                'traceId': self.trace_id,
+                'spanId': span.span_id,
+                'name': span.name,
+                'kind': 1,
+                'startTimeUnixNano': str(span.start_ns),
+                'endTimeUnixNano': str(span.end_ns or span.start_ns),
+                'attributes': [attribute(key, value) for key, value in span.attributes.items()],
+            }
+            if span.parent_id:
+                otlp_span['parentSpanId'] = span.parent_id
+            if span.error:
+                otlp_span['status'] = {'code': 2, 'message': span.error}
+            spans.append(otlp_span)
+        
+        return {'resourceSpans': [{
+            'resource': {'attributes': [attribute('service.name', 'crawler-worker')]},
+            'scopeSpans': [{'scope': {'name': 'crawler-worker.tracing'}, 'spans': spans}],
+        }]}
+    
+    def export_otlp(self, endpoint: str):
+        """POST the trace to an OTLP/HTTP collector (failures are logged, never raised)"""
+        try:
+            response = requests.post(endpoint, json=self.to_otlp(), timeout=10)
+            if response.status_code >= 300:
+                logger.warning(f"Trace collector rejected job {self.job_id}: {response.status_code} - {response.text[:200]}")
+        except requests.RequestException as e:
+            logger.warning(f"Failed to export trace of job {self.job_id}: {e}")
+
+class TracedPlaywright:
+    """
+    Wraps a Playwright object so every call becomes a span named after the
+    class and method (Page.goto, Locator.count, ...). Sync and async API alike:
+    awaitables are timed until they resolve. Playwright objects the call
+    returns (locators, element handles, frames) are wrapped too; a locator's
+    spans carry the selector it was built from.
+    """
+    
+    def __init__(self, target, trace: JobTrace, selector: str = None):
+        object.__setattr__(self, '_target', target)
+        object.__setattr__(self, '_trace', trace)
+        object.__setattr__(self, '_selector', selector)
+    
+    def __getattr__(self, name):
+        value = getattr(self._target, name)
+        if name.startswith('_'):
+            return value
+        if not callable(value):
+            return self._wrap(value)
+        
+        def call(*args, **kwargs):
+            args = [_unwrap(arg) for arg in args]
+            kwargs = {key: _unwrap(arg) for key, arg in kwargs.items()}
+            if name in LOCAL_CALLS:
+                selector = args[0] if name == 'locator' and args else self._selector
+                return self._wrap(value(*args, **kwargs), selector)
+            
+            attributes = {'selector': self._selector} if self._selector else {}
+            if args and isinstance(args[0], str):
+                attributes['arg'] = _short(args[0])
+            span = self._trace.start_span(f"{self._target.__class__.__name__}.{name}", **attributes)
+            try:
+                result = value(*args, **kwargs)
+            except BaseException as e:
+                span.end(e)
+                raise
+            if inspect.isawaitable(result):
+                return self._await(span, result)
+            span.end()
+            return self._wrap(result)
+        
+        return call
+    
+    def __setattr__(self, name, value):
+        setattr(self._target, name, value)
+    
+    async def _await(self, span: Span, awaitable):
+        try:
+            result = await awaitable
+        except BaseException as e:
+            span.end(e)
+            raise
+        span.end()
+        return self._wrap(result)
+    
+    def _wrap(self, value, selector: str = None):
+        if isinstance(value, list):
+            return [self._wrap(item) for item in value]
+        if hasattr(value, '_impl_obj') and not isinstance(value, TracedPlaywright):
+            return TracedPlaywright(value, self._trace, selector)
+        return value
+    
+    def __repr__(self):
+        return f"<traced {self._target!r}>"
+
+def _unwrap(value):
+    """The Playwright object behind a traced proxy (Playwright rejects proxies as arguments)"""
+    return value._target if isinstance(value, TracedPlaywright) else value
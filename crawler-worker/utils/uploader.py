@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import os
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+def processing_api_url() -> str:
+    """Processing API endpoint (PROCESSING_API_URL, or localhost on PROCESSING_API_PORT)"""
+    return os.getenv('PROCESSING_API_URL') or f"http://localhost:{os.getenv('PROCESSING_API_PORT', '8081')}/api/process"
+
+def create_session(pool_size: int = 4) -> requests.Session:
+    """
+    Keep-alive HTTP session for Processing API uploads
+    
+    Connections are pooled per host and failed POSTs are retried on 502/503/504 and
+    connection errors - safe because the Processing API ignores duplicate comments.
+    """
+    retry = Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset(['POST'])
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+class UploadError(Exception):
+    """A chunk could not be delivered to the Processing API"""
+
+class ChunkedUpload:
+    """
+    Streams one job's comments to the Processing API while the crawl is running
+    
+    Comments are buffered until chunk_size are waiting, then POSTed with an
+    increasing chunk_index. finish() sends the remainder with complete=true,
+    which is when the Processing API marks the job as stored. With a job_state
+    (utils.job_state.JobState) every delivered chunk is added to the job's progress.
+    With a deadline (utils.deadline.Deadline) request timeouts are capped to the
+    time left in the job's current phase.
+    With a comment_filter (utils.fingerprint.CommentFilter) comments some worker
+    already delivered are dropped before the chunk is serialized.
+    With a trace (utils.tracing.JobTrace) every POST is recorded as a span.
+    """
+    
+    def __init__(self, job_id: str, session: requests.Session, api_url: str = None, chunk_size: int = None,
+                 job_state=None, comment_filter=None, deadline=None, trace=None):
+        self.job_id = job_id
+        self.session = session
+        self.job_state = job_state
+        self.comment_filter = comment_filter
+        self.deadline = deadline
+        self.trace = trace
+        self.api_url = api_url or processing_api_url()
+        self.chunk_size = chunk_size or int(os.getenv('UPLOAD_CHUNK_SIZE', 200))
+        self.timeout = int(os.getenv('UPLOAD_TIMEOUT', 30))
+        self.buffer = []
+        self.chunk_index = 0
+        self.sent = 0
+        self.skipped = 0  # Already stored according to the comment filter
+        self.processed = 0
+        self.duplicates = 0
+        self.finished = False
+    
+    @property
+    def total(self) -> int:
+        """Comments handed to this upload so far (sent, skipped or still buffered)"""
+        return self.sent + self.skipped + len(self.buffer)
+    
+    def add_many(self, comments: list):
+        """Buffer comments and send every full chunk"""
+        self.buffer.extend(comments)
+        self._send_full_chunks()
+    
+    async def async_add_many(self, comments: list):
+        """Async counterpart of add_many - chunks are sent from a worker thread"""
+        self.buffer.extend(comments)
+        if len(self.buffer) >= self.chunk_size:
+            await asyncio.to_thread(self._send_full_chunks)
+    
+    def finish(self):
+        """Send the remaining comments with the complete marker (no-op for empty jobs)"""
+        if self.finished or self.total == 0:
+            return
+        chunk, self.buffer = self.buffer, []
+        self._send(chunk, complete=True)
+        self.finished = True
+    
+    def _send_full_chunks(self):
+        while len(self.buffer) >= self.chunk_size:
+            chunk = self.buffer[:self.chunk_size]
+            del self.buffer[:self.chunk_size]
+            self._send(chunk, complete=False)
+    
+    def _send(self, chunk: list, complete: bool):
+        """POST one chunk; raises UploadError when the Processing API does not accept it"""
+        if self.comment_filter:
+            fresh = self.comment_filter.filter_new(chunk)
+            self.skipped += len(chunk) - len(fresh)
+            chunk = fresh
+            # Nothing new - only the final chunk still has to go out to close the job
+            if not chunk and not complete:
+                return
+        
+        payload = {
+            'job_id': self.job_id,
+            'comments': chunk,
+            'chunk_index': self.chunk_index,
+            'complete': complete
+        }
+        
+        span = self.trace.start_span('upload_chunk', chunk_index=self.chunk_index, comments=len(chunk),
+                                     complete=complete) if self.trace else None
+        try:
+            timeout = self.deadline.timeout(self.timeout) if self.deadline else self.timeout
+            response = self.session.post(self.api_url, json=payload, timeout=timeout)
+        except requests.RequestException as e:
+            if span:
+                span.end(e)
+            raise UploadError(f"Chunk {self.chunk_index} of job {self.job_id} failed: {e}")
+        if span:
+            span.set(status=response.status_code, bytes=len(response.request.body or b''))
+            span.end()
+        
+        if response.status_code != 200:
+            raise UploadError(f"Processing API error on chunk {self.chunk_index}: {response.status_code} - {response.text}")
+        
+        result = response.json()
+        self.processed += result.get('processed', 0)
+        self.duplicates += result.get('duplicates', 0)
+        self.sent += len(chunk)
+        if self.comment_filter:
+            self.comment_filter.add(chunk)
+        if self.job_state:
+            self.job_state.add_progress(comments_sent=len(chunk), chunks_sent=1,
+                                        bytes_sent=len(response.request.body or b''))
+        logger.info(f"📤 Sent chunk {self.chunk_index} ({len(chunk)} comments{', final' if complete else ''}) for job {self.job_id}")
+        self.chunk_index += 1
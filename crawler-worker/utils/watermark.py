@@ -0,0 +1,118 @@
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# How long a monitored post's watermark outlives its last run
+WATERMARK_TTL = int(os.getenv('WATERMARK_TTL', 30 * 86400))
+
+# Already delivered comments in a row before an incremental crawl stops loading. A single
+# one is not enough: lists are sorted by relevance, so pinned or popular old comments
+# show up among new ones.
+WATERMARK_STOP_AFTER = int(os.getenv('WATERMARK_STOP_AFTER', 10))
+
+# Comment IDs a watermark keeps: the ones runs came across most recently. Runs stop near
+# the top of the list, so only those are needed to recognise where the last run left off.
+WATERMARK_SIZE = int(os.getenv('WATERMARK_SIZE', 200))
+
+def watermark_key(dedupe_key: str) -> str:
+    """Redis sorted set of a post's most recently seen comment IDs, scored by run time (keyed like the crawl dedupe slot)"""
+    return f"watermark_recent:{dedupe_key}"
+
+class _WatermarkBase:
+    """Seen-comment bookkeeping shared by the sync and async watermark"""
+    
+    def __init__(self, client, dedupe_key: str, stop_after: int = None, size: int = None):
+        self.client = client
+        self.key = watermark_key(dedupe_key)
+        self.stop_after = max(stop_after or WATERMARK_STOP_AFTER, 1)
+        self.size = max(size or WATERMARK_SIZE, self.stop_after)
+        self.seen = set()
+        self.recent = {}  # First `size` comment IDs this run came across (new or not), in list order
+        self.known_run = 0  # Already delivered comments in a row, across batches
+        self.reached = False
+    
+    def filter_new(self, comments: list) -> list:
+        """
+        Drop comments the watermark holds; the rest becomes this run's delta
+        
+        The watermark counts as reached once stop_after known comments come
+        in a row (in list order, across batches). The first `size` comments,
+        known or not, are what save() keeps for the next run.
+        """
+        for comment in comments:
+            if len(self.recent) >= self.size:
+                break
+            self.recent.setdefault(comment.get('comment_id'))
+        if not self.seen:
+            return comments
+        fresh = []
+        for comment in comments:
+            if comment.get('comment_id') in self.seen:
+                self.known_run += 1
+                if self.known_run >= self.stop_after:
+                    self.reached = True
+            else:
+                self.known_run = 0
+                fresh.append(comment)
+        return fresh
+    
+    def _loaded(self, members):
+        self.seen = set(members)
+        logger.info(f"🔖 Watermark has {len(self.seen)} recently seen comments")
+        return self
+    
+    def _save_pipeline(self):
+        pipe = self.client.pipeline(transaction=False)
+        if self.recent:
+            # This run's IDs become the newest; the set is trimmed to the newest `size`
+            now = time.time()
+            pipe.zadd(self.key, {comment_id: now for comment_id in self.recent})
+            pipe.zremrangebyrank(self.key, 0, -self.size - 1)
+        pipe.expire(self.key, WATERMARK_TTL)
+        return pipe
+
+class Watermark(_WatermarkBase):
+    """
+    Per-post watermark for incremental (monitor) crawls
+    
+    Keeps the WATERMARK_SIZE comment IDs runs came across most recently, in
+    one Redis sorted set. Load-more loops stop once WATERMARK_STOP_AFTER
+    harvested comments in a row are among them, and only unseen comments are
+    emitted. save() runs after a successful upload, so a failed run leaves the
+    watermark where it was. Redis errors fall back to a full crawl.
+    """
+    
+    def load(self):
+        """Read the recently seen comment IDs (empty on the first run)"""
+        try:
+            return self._loaded(self.client.zrange(self.key, 0, -1))
+        except Exception as e:
+            logger.warning(f"Failed to load watermark, crawling in full: {e}")
+            return self
+    
+    def save(self):
+        """Make the comments this run came across the newest in the watermark"""
+        try:
+            self._save_pipeline().execute()
+        except Exception as e:
+            logger.warning(f"Failed to save watermark: {e}")
+
+class AsyncWatermark(_WatermarkBase):
+    """redis.asyncio counterpart of Watermark"""
+    
+    async def load(self):
+        """Read the recently seen comment IDs (empty on the first run)"""
+        try:
+            return self._loaded(await self.client.zrange(self.key, 0, -1))
+        except Exception as e:
+            logger.warning(f"Failed to load watermark, crawling in full: {e}")
+            return self
+    
+    async def save(self):
+        """Make the comments this run came across the newest in the watermark"""
+        try:
+            await self._save_pipeline().execute()
+        except Exception as e:
+            logger.warning(f"Failed to save watermark: {e}")
@@ -0,0 +1,22 @@
+import os
+
+from utils.uploader import processing_api_url
+
+# Settings shared by the sync (main.py) and async (async_worker.py) workers.
+# Importing this module creates no clients, pools or sessions: each worker
+# builds the ones it uses. Callers load .env before importing it.
+
+REDIS_HOST = os.getenv('REDIS_HOST', 'localhost')
+REDIS_PORT = int(os.getenv('REDIS_PORT', 6379))
+REDIS_PASSWORD = os.getenv('REDIS_PASSWORD', '')
+PROCESSING_API_URL = processing_api_url()
+HEADLESS = os.getenv('HEADLESS', 'false').lower() == 'true'  # Visible browser by default for debugging
+
+def redis_options() -> dict:
+    """Connection options for redis.Redis and redis.asyncio.Redis"""
+    return {
+        'host': REDIS_HOST,
+        'port': REDIS_PORT,
+        'password': REDIS_PASSWORD if REDIS_PASSWORD else None,
+        'decode_responses': True,
+    }
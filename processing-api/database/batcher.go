@@ -0,0 +1,189 @@
+package database
+
+import (
+	"crawling/processing-api/models"
+	"fmt"
+	"sync/atomic"
+	"time"
+)
+
+// CommentBatcher merges concurrent SaveComments calls into group commits.
+// Requests that arrive while a commit is running are written together by the
+// next one: one transaction and one fsync for the whole group. Each request
+// gets its own SAVEPOINT, so a bad request is rolled back alone and the
+// processed/duplicate counts stay per request.
+type CommentBatcher struct {
+	db       *MySQLDB
+	requests chan *saveRequest
+	stopped  chan struct{}
+	maxRows  int
+	maxWait  time.Duration
+
+	// Counters since start (GET /metrics)
+	commits       int64
+	failedCommits int64
+	answered      int64
+	failed        int64
+	inserted      int64
+	duplicates    int64
+	commitNanos   int64
+}
+
+// BatcherStats counts group commits and the comments they stored
+type BatcherStats struct {
+	Commits       int64
+	FailedCommits int64
+	// Requests answered, and those that got an error
+	Requests int64
+	Failed   int64
+	// Comments inserted and comments skipped as already stored
+	Inserted   int64
+	Duplicates int64
+	CommitTime time.Duration
+}
+
+type saveRequest struct {
+	jobID    string
+	comments []models.Comment
+	done     chan saveResult
+}
+
+type saveResult struct {
+	processed  int
+	duplicates int
+	err        error
+}
+
+// NewCommentBatcher starts the write-behind loop. A group is committed once it
+// holds maxRows comments or maxWait has passed since its first request.
+func NewCommentBatcher(db *MySQLDB, maxRows int, maxWait time.Duration) *CommentBatcher {
+	b := &CommentBatcher{
+		db:       db,
+		requests: make(chan *saveRequest, 256),
+		stopped:  make(chan struct{}),
+		maxRows:  maxRows,
+		maxWait:  maxWait,
+	}
+	go b.run()
+	return b
+}
+
+// SaveComments queues comments for the next group commit and waits for it
+func (b *CommentBatcher) SaveComments(jobID string, comments []models.Comment) (int, int, error) {
+	req := &saveRequest{
+		jobID:    jobID,
+		comments: comments,
+		done:     make(chan saveResult, 1),
+	}
+	b.requests <- req
+
+	result := <-req.done
+	return result.processed, result.duplicates, result.err
+}
+
+// Stats returns the commit counters
+func (b *CommentBatcher) Stats() BatcherStats {
+	return BatcherStats{
+		Commits:       atomic.LoadInt64(&b.commits),
+		FailedCommits: atomic.LoadInt64(&b.failedCommits),
+		Requests:      atomic.LoadInt64(&b.answered),
+		Failed:        atomic.LoadInt64(&b.failed),
+		Inserted:      atomic.LoadInt64(&b.inserted),
+		Duplicates:    atomic.LoadInt64(&b.duplicates),
+		CommitTime:    time.Duration(atomic.LoadInt64(&b.commitNanos)),
+	}
+}
+
+// Close commits whatever is queued and stops the loop
+func (b *CommentBatcher) Close() {
+	close(b.requests)
+	<-b.stopped
+}
+
+func (b *CommentBatcher) run() {
+	defer close(b.stopped)
+
+	for first := range b.requests {
+		group := []*saveRequest{first}
+		rows := len(first.comments)
+
+		// Linger briefly so concurrent requests can join this commit
+		timer := time.NewTimer(b.maxWait)
+	collect:
+		for rows < b.maxRows {
+			select {
+			case req, ok := <-b.requests:
+				if !ok {
+					break collect
+				}
+				group = append(group, req)
+				rows += len(req.comments)
+			case <-timer.C:
+				break collect
+			}
+		}
+		timer.Stop()
+
+		b.commit(group)
+	}
+}
+
+// commit writes a group in one transaction and answers every request
+func (b *CommentBatcher) commit(group []*saveRequest) {
+	started := time.Now()
+	defer func() { atomic.AddInt64(&b.commitNanos, int64(time.Since(started))) }()
+	results := make([]saveResult, len(group))
+
+	tx, err := b.db.db.Begin()
+	if err != nil {
+		b.fail(group, fmt.Errorf("failed to begin transaction: %v", err))
+		return
+	}
+
+	for i, req := range group {
+		savepoint := fmt.Sprintf("req_%d", i)
+		if _, err := tx.Exec("SAVEPOINT " + savepoint); err != nil {
+			tx.Rollback()
+			b.fail(group, fmt.Errorf("failed to create savepoint: %v", err))
+			return
+		}
+
+		processed, duplicates, err := insertComments(tx, req.jobID, req.comments)
+		if err != nil {
+			// Undo only this request; the rest of the group still commits
+			if _, rbErr := tx.Exec("ROLLBACK TO SAVEPOINT " + savepoint); rbErr != nil {
+				tx.Rollback()
+				b.fail(group, fmt.Errorf("failed to roll back request: %v", rbErr))
+				return
+			}
+			results[i] = saveResult{err: err}
+			continue
+		}
+		results[i] = saveResult{processed: processed, duplicates: duplicates}
+	}
+
+	if err := tx.Commit(); err != nil {
+		b.fail(group, fmt.Errorf("failed to commit comments: %v", err))
+		return
+	}
+
+	atomic.AddInt64(&b.commits, 1)
+	atomic.AddInt64(&b.answered, int64(len(group)))
+	for i, req := range group {
+		if results[i].err != nil {
+			atomic.AddInt64(&b.failed, 1)
+		}
+		atomic.AddInt64(&b.inserted, int64(results[i].processed))
+		atomic.AddInt64(&b.duplicates, int64(results[i].duplicates))
+		req.done <- results[i]
+	}
+}
+
+func (b *CommentBatcher) fail(group []*saveRequest, err error) {
+	atomic.AddInt64(&b.failedCommits, 1)
+	atomic.AddInt64(&b.answered, int64(len(group)))
+	atomic.AddInt64(&b.failed, int64(len(group)))
+	for _, req := range group {
+		req.done <- saveResult{err: err}
+	}
+}
@@ -1,10 +1,12 @@
 package database
 
 import (
+	"context"
 	"crawling/processing-api/models"
 	"database/sql"
 	"encoding/json"
 	"fmt"
+	"strings"
 	"time"
 
 	_ "github.com/go-sql-driver/mysql"
@@ -51,50 +53,89 @@ func (db *MySQLDB) Close() error {
 	return db.db.Close()
 }
 
-// SaveComments saves multiple comments to the database
+// insertBatchSize caps the rows per multi-row INSERT (11 placeholders per row,
+// MySQL allows 65535 per statement)
+const insertBatchSize = 500
+
+const insertCommentsQuery = `
+		INSERT INTO comments (
+			job_id, platform, comment_id, username, user_id, 
+			text, timestamp, likes, replies_count, parent_comment_id, raw_data
+		) VALUES %s
+		ON DUPLICATE KEY UPDATE id=id
+	`
+
+// SaveComments saves multiple comments in a single transaction using
+// multi-row inserts
 func (db *MySQLDB) SaveComments(jobID string, comments []models.Comment) (int, int, error) {
+	tx, err := db.db.Begin()
+	if err != nil {
+		return 0, 0, fmt.Errorf("failed to begin transaction: %v", err)
+	}
+
+	processed, duplicates, err := insertComments(tx, jobID, comments)
+	if err != nil {
+		tx.Rollback()
+		return 0, 0, err
+	}
+
+	if err := tx.Commit(); err != nil {
+		return 0, 0, fmt.Errorf("failed to commit comments: %v", err)
+	}
+
+	return processed, duplicates, nil
+}
+
+// insertComments writes comments with multi-row INSERTs on an open transaction.
+// Duplicates hit ON DUPLICATE KEY UPDATE id=id, which leaves them unchanged and
+// reports 0 affected rows, so duplicates = rows sent - rows affected.
+func insertComments(tx *sql.Tx, jobID string, comments []models.Comment) (int, int, error) {
 	processed := 0
-	duplicates := 0
 
-	for _, comment := range comments {
-		isDuplicate, err := db.SaveComment(jobID, comment)
-		if err != nil {
-			return processed, duplicates, fmt.Errorf("failed to save comment: %v", err)
+	for start := 0; start < len(comments); start += insertBatchSize {
+		end := start + insertBatchSize
+		if end > len(comments) {
+			end = len(comments)
+		}
+		batch := comments[start:end]
+
+		placeholders := make([]string, len(batch))
+		args := make([]interface{}, 0, len(batch)*11)
+		for i, comment := range batch {
+			commentArgs, err := commentInsertArgs(jobID, comment)
+			if err != nil {
+				return 0, 0, err
+			}
+			placeholders[i] = "(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+			args = append(args, commentArgs...)
 		}
 
-		if isDuplicate {
-			duplicates++
-		} else {
-			processed++
+		query := fmt.Sprintf(insertCommentsQuery, strings.Join(placeholders, ", "))
+		result, err := tx.Exec(query, args...)
+		if err != nil {
+			return 0, 0, fmt.Errorf("failed to insert comments: %v", err)
 		}
+
+		rowsAffected, _ := result.RowsAffected()
+		processed += int(rowsAffected)
 	}
 
-	return processed, duplicates, nil
+	return processed, len(comments) - processed, nil
 }
 
-// SaveComment saves a single comment to the database
-func (db *MySQLDB) SaveComment(jobID string, comment models.Comment) (bool, error) {
+// commentInsertArgs returns the INSERT arguments for one comment
+func commentInsertArgs(jobID string, comment models.Comment) ([]interface{}, error) {
 	// Convert raw_data to JSON
 	var rawDataJSON []byte
-	var err error
 	if comment.RawData != nil {
+		var err error
 		rawDataJSON, err = json.Marshal(comment.RawData)
 		if err != nil {
-			return false, fmt.Errorf("failed to marshal raw_data: %v", err)
+			return nil, fmt.Errorf("failed to marshal raw_data: %v", err)
 		}
 	}
 
-	// MySQL: Use INSERT IGNORE to skip duplicates
-	query := `
-		INSERT INTO comments (
-			job_id, platform, comment_id, username, user_id, 
-			text, timestamp, likes, replies_count, parent_comment_id, raw_data
-		) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-		ON DUPLICATE KEY UPDATE id=id
-	`
-
-	result, err := db.db.Exec(
-		query,
+	return []interface{}{
 		jobID,
 		comment.Platform,
 		comment.CommentID,
@@ -106,8 +147,20 @@ func (db *MySQLDB) SaveComment(jobID string, comment models.Comment) (bool, erro
 		comment.RepliesCount,
 		comment.ParentCommentID,
 		rawDataJSON,
-	)
+	}, nil
+}
+
+// SaveComment saves a single comment to the database
+func (db *MySQLDB) SaveComment(jobID string, comment models.Comment) (bool, error) {
+	args, err := commentInsertArgs(jobID, comment)
+	if err != nil {
+		return false, err
+	}
+
+	// MySQL: Use INSERT IGNORE to skip duplicates
+	query := fmt.Sprintf(insertCommentsQuery, "(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)")
 
+	result, err := db.db.Exec(query, args...)
 	if err != nil {
 		return false, fmt.Errorf("failed to insert comment: %v", err)
 	}
@@ -137,28 +190,49 @@ func (db *MySQLDB) UpdateJobStatus(jobID string, status string) error {
 	return nil
 }
 
-// GetCommentsByJobID retrieves all comments for a specific job
-func (db *MySQLDB) GetCommentsByJobID(jobID string) ([]models.Comment, error) {
-	query := `
-		SELECT comment_id, username, user_id, text, timestamp, 
-		       likes, replies_count, platform, parent_comment_id, raw_data
-		FROM comments
-		WHERE job_id = ?
-		ORDER BY created_at DESC
-	`
+// CommentQuery selects comments of one job, newest first (by id).
+// AfterID is the keyset cursor: only comments with a smaller id are returned.
+type CommentQuery struct {
+	JobID      string
+	AfterID    int64
+	Limit      int  // 0 = no limit
+	IncludeRaw bool // select and decode raw_data
+}
+
+// ForEachComment scans a job's comments and calls fn for every row as it is
+// read, without holding the result set in memory. The (job_id, id) order is
+// served by idx_job_id, which InnoDB stores together with the primary key.
+func (db *MySQLDB) ForEachComment(ctx context.Context, q CommentQuery, fn func(models.Comment) error) error {
+	columns := `id, comment_id, username, user_id, text, timestamp,
+		       likes, replies_count, platform, parent_comment_id`
+	if q.IncludeRaw {
+		columns += ", raw_data"
+	}
+
+	query := "SELECT " + columns + " FROM comments WHERE job_id = ?"
+	args := []interface{}{q.JobID}
+	if q.AfterID > 0 {
+		query += " AND id < ?"
+		args = append(args, q.AfterID)
+	}
+	query += " ORDER BY id DESC"
+	if q.Limit > 0 {
+		query += " LIMIT ?"
+		args = append(args, q.Limit)
+	}
 
-	rows, err := db.db.Query(query, jobID)
+	rows, err := db.db.QueryContext(ctx, query, args...)
 	if err != nil {
-		return nil, fmt.Errorf("failed to query comments: %v", err)
+		return fmt.Errorf("failed to query comments: %v", err)
 	}
 	defer rows.Close()
 
-	var comments []models.Comment
 	for rows.Next() {
 		var comment models.Comment
 		var rawDataJSON []byte
 
-		err := rows.Scan(
+		dest := []interface{}{
+			&comment.ID,
 			&comment.CommentID,
 			&comment.Username,
 			&comment.UserID,
@@ -168,22 +242,50 @@ func (db *MySQLDB) GetCommentsByJobID(jobID string) ([]models.Comment, error) {
 			&comment.RepliesCount,
 			&comment.Platform,
 			&comment.ParentCommentID,
-			&rawDataJSON,
-		)
-		if err != nil {
-			return nil, fmt.Errorf("failed to scan row: %v", err)
+		}
+		if q.IncludeRaw {
+			dest = append(dest, &rawDataJSON)
+		}
+
+		if err := rows.Scan(dest...); err != nil {
+			return fmt.Errorf("failed to scan row: %v", err)
 		}
 
 		// Unmarshal raw_data if present
 		if len(rawDataJSON) > 0 {
 			err = json.Unmarshal(rawDataJSON, &comment.RawData)
 			if err != nil {
-				return nil, fmt.Errorf("failed to unmarshal raw_data: %v", err)
+				return fmt.Errorf("failed to unmarshal raw_data: %v", err)
 			}
 		}
 
+		if err := fn(comment); err != nil {
+			return err
+		}
+	}
+
+	return rows.Err()
+}
+
+// GetCommentsPage returns up to q.Limit comments and the cursor of the next
+// page (0 when this is the last page)
+func (db *MySQLDB) GetCommentsPage(ctx context.Context, q CommentQuery) ([]models.Comment, int64, error) {
+	limit := q.Limit
+	q.Limit = limit + 1 // One extra row tells whether another page exists
+
+	comments := make([]models.Comment, 0, limit)
+	var nextCursor int64
+	err := db.ForEachComment(ctx, q, func(comment models.Comment) error {
+		if len(comments) == limit {
+			nextCursor = comments[limit-1].ID
+			return nil
+		}
 		comments = append(comments, comment)
+		return nil
+	})
+	if err != nil {
+		return nil, 0, err
 	}
 
-	return comments, nil
+	return comments, nextCursor, nil
 }
@@ -3,17 +3,21 @@ package handlers
 import (
 	"crawling/processing-api/database"
 	"crawling/processing-api/models"
+	"encoding/json"
+	"fmt"
 	"net/http"
+	"strconv"
 
 	"github.com/gin-gonic/gin"
 )
 
 type DataHandler struct {
-	db *database.MySQLDB
+	db      *database.MySQLDB
+	batcher *database.CommentBatcher
 }
 
-func NewDataHandler(db *database.MySQLDB) *DataHandler {
-	return &DataHandler{db: db}
+func NewDataHandler(db *database.MySQLDB, batcher *database.CommentBatcher) *DataHandler {
+	return &DataHandler{db: db, batcher: batcher}
 }
 
 // ProcessData handles POST /api/process
@@ -29,26 +33,47 @@ func (h *DataHandler) ProcessData(c *gin.Context) {
 		return
 	}
 
-	// Validate we have comments
-	if len(req.Comments) == 0 {
+	// Validate we have comments (only the final marker of a chunked upload may be empty)
+	final := req.IsFinal()
+	if len(req.Comments) == 0 && !(req.IsChunked() && final) {
 		c.JSON(http.StatusBadRequest, gin.H{
 			"error": "No comments provided",
 		})
 		return
 	}
 
-	// Save comments to database
-	processed, duplicates, err := h.db.SaveComments(req.JobID, req.Comments)
-	if err != nil {
-		c.JSON(http.StatusInternalServerError, gin.H{
-			"error":   "Failed to save comments",
-			"details": err.Error(),
+	// Save comments to database (group-committed with concurrent requests;
+	// re-sent chunks only add duplicates)
+	processed, duplicates := 0, 0
+	if len(req.Comments) > 0 {
+		var err error
+		processed, duplicates, err = h.batcher.SaveComments(req.JobID, req.Comments)
+		if err != nil {
+			c.JSON(http.StatusInternalServerError, gin.H{
+				"error":   "Failed to save comments",
+				"details": err.Error(),
+			})
+			return
+		}
+	}
+
+	// More chunks are coming - the job is not stored yet
+	if !final {
+		message := "Chunk processed"
+		if req.ChunkIndex != nil {
+			message = fmt.Sprintf("Chunk %d processed", *req.ChunkIndex)
+		}
+		c.JSON(http.StatusOK, models.ProcessResponse{
+			Success:    true,
+			Processed:  processed,
+			Duplicates: duplicates,
+			Message:    message,
 		})
 		return
 	}
 
 	// Update job status to completed
-	err = h.db.UpdateJobStatus(req.JobID, "stored")
+	err := h.db.UpdateJobStatus(req.JobID, "stored")
 	if err != nil {
 		// Log error but don't fail the request
 		c.JSON(http.StatusInternalServerError, gin.H{
@@ -67,11 +92,58 @@ func (h *DataHandler) ProcessData(c *gin.Context) {
 	})
 }
 
+// Page size limits for GET /api/comments/:job_id
+const (
+	defaultPageSize = 100
+	maxPageSize     = 1000
+	// NDJSON streams are flushed to the client every ndjsonFlushEvery rows
+	ndjsonFlushEvery = 200
+)
+
 // GetComments handles GET /api/comments/:job_id
+//
+// Query parameters:
+//   - limit: page size (default 100, max 1000)
+//   - cursor: next_cursor from the previous page
+//   - include_raw: set to false to skip raw_data
+//   - format=ndjson: stream every comment (from cursor on) as one JSON object per line
 func (h *DataHandler) GetComments(c *gin.Context) {
 	jobID := c.Param("job_id")
 
-	comments, err := h.db.GetCommentsByJobID(jobID)
+	query := database.CommentQuery{
+		JobID:      jobID,
+		IncludeRaw: c.DefaultQuery("include_raw", "true") != "false",
+	}
+
+	if cursor := c.Query("cursor"); cursor != "" {
+		afterID, err := strconv.ParseInt(cursor, 10, 64)
+		if err != nil || afterID <= 0 {
+			c.JSON(http.StatusBadRequest, gin.H{
+				"error": "Invalid cursor",
+			})
+			return
+		}
+		query.AfterID = afterID
+	}
+
+	if c.Query("format") == "ndjson" {
+		h.streamComments(c, query)
+		return
+	}
+
+	limit, err := strconv.Atoi(c.DefaultQuery("limit", strconv.Itoa(defaultPageSize)))
+	if err != nil || limit < 1 {
+		c.JSON(http.StatusBadRequest, gin.H{
+			"error": "Invalid limit",
+		})
+		return
+	}
+	if limit > maxPageSize {
+		limit = maxPageSize
+	}
+	query.Limit = limit
+
+	comments, nextCursor, err := h.db.GetCommentsPage(c.Request.Context(), query)
 	if err != nil {
 		c.JSON(http.StatusInternalServerError, gin.H{
 			"error":   "Failed to retrieve comments",
@@ -80,9 +152,47 @@ func (h *DataHandler) GetComments(c *gin.Context) {
 		return
 	}
 
+	var next interface{}
+	if nextCursor != 0 {
+		next = strconv.FormatInt(nextCursor, 10)
+	}
+
 	c.JSON(http.StatusOK, gin.H{
-		"job_id":   jobID,
-		"count":    len(comments),
-		"comments": comments,
+		"job_id":      jobID,
+		"count":       len(comments),
+		"comments":    comments,
+		"has_more":    nextCursor != 0,
+		"next_cursor": next,
 	})
 }
+
+// streamComments writes comments as NDJSON while they are scanned from MySQL
+func (h *DataHandler) streamComments(c *gin.Context, query database.CommentQuery) {
+	c.Header("Content-Type", "application/x-ndjson")
+	encoder := json.NewEncoder(c.Writer)
+
+	written := 0
+	err := h.db.ForEachComment(c.Request.Context(), query, func(comment models.Comment) error {
+		if err := encoder.Encode(comment); err != nil {
+			return err
+		}
+		written++
+		if written%ndjsonFlushEvery == 0 {
+			c.Writer.Flush()
+		}
+		return nil
+	})
+
+	if err != nil {
+		if !c.Writer.Written() {
+			c.JSON(http.StatusInternalServerError, gin.H{
+				"error":   "Failed to retrieve comments",
+				"details": err.Error(),
+			})
+			return
+		}
+		// Headers are already sent - report the failure as the last line
+		encoder.Encode(gin.H{"error": "Failed to stream comments", "details": err.Error()})
+	}
+	c.Writer.Flush()
+}
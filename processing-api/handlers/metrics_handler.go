@@ -0,0 +1,43 @@
+package handlers
+
+import (
+	"crawling/processing-api/database"
+	"fmt"
+	"net/http"
+	"strings"
+
+	"github.com/gin-gonic/gin"
+)
+
+type MetricsHandler struct {
+	batcher *database.CommentBatcher
+}
+
+func NewMetricsHandler(batcher *database.CommentBatcher) *MetricsHandler {
+	return &MetricsHandler{batcher: batcher}
+}
+
+// GetMetrics handles GET /metrics in the Prometheus text format
+func (h *MetricsHandler) GetMetrics(c *gin.Context) {
+	stats := h.batcher.Stats()
+
+	metrics := []struct {
+		name, help string
+		value      float64
+	}{
+		{"processing_api_commits_total", "Group commits written", float64(stats.Commits)},
+		{"processing_api_commit_failures_total", "Group commits that failed as a whole", float64(stats.FailedCommits)},
+		{"processing_api_commit_seconds_total", "Time spent in group commits", stats.CommitTime.Seconds()},
+		{"processing_api_requests_total", "Save requests answered by a group commit", float64(stats.Requests)},
+		{"processing_api_request_failures_total", "Save requests that got an error", float64(stats.Failed)},
+		{"processing_api_comments_inserted_total", "Comments stored", float64(stats.Inserted)},
+		{"processing_api_comments_duplicate_total", "Comments skipped as already stored", float64(stats.Duplicates)},
+	}
+
+	var out strings.Builder
+	for _, metric := range metrics {
+		fmt.Fprintf(&out, "# HELP %s %s\n# TYPE %s counter\n%s %g\n", metric.name, metric.help, metric.name, metric.name, metric.value)
+	}
+
+	c.Data(http.StatusOK, "text/plain; version=0.0.4", []byte(out.String()))
+}
@@ -6,6 +6,8 @@ import (
 	"fmt"
 	"log"
 	"os"
+	"strconv"
+	"time"
 
 	"github.com/gin-gonic/gin"
 	"github.com/joho/godotenv"
@@ -39,8 +41,15 @@ func main() {
 
 	log.Println("✅ Connected to MySQL successfully")
 
+	// Group commit: concurrent /api/process requests share one transaction
+	commitMaxRows := getEnvInt("COMMIT_MAX_ROWS", 2000)
+	commitMaxWait := time.Duration(getEnvInt("COMMIT_MAX_WAIT_MS", 5)) * time.Millisecond
+	batcher := database.NewCommentBatcher(db, commitMaxRows, commitMaxWait)
+	defer batcher.Close()
+
 	// Initialize handlers
-	dataHandler := handlers.NewDataHandler(db)
+	dataHandler := handlers.NewDataHandler(db, batcher)
+	metricsHandler := handlers.NewMetricsHandler(batcher)
 
 	// Setup Gin router
 	router := gin.Default()
@@ -67,6 +76,9 @@ func main() {
 		})
 	})
 
+	// Prometheus metrics: group commits and stored comments
+	router.GET("/metrics", metricsHandler.GetMetrics)
+
 	// API routes
 	api := router.Group("/api")
 	{
@@ -81,6 +93,7 @@ func main() {
 	log.Printf("   POST   http://localhost%s/api/process", addr)
 	log.Printf("   GET    http://localhost%s/api/comments/:job_id", addr)
 	log.Printf("   GET    http://localhost%s/health", addr)
+	log.Printf("   GET    http://localhost%s/metrics", addr)
 
 	if err := router.Run(addr); err != nil {
 		log.Fatalf("Failed to start server: %v", err)
@@ -94,3 +107,11 @@ func getEnv(key, defaultValue string) string {
 	}
 	return value
 }
+
+func getEnvInt(key string, defaultValue int) int {
+	value, err := strconv.Atoi(os.Getenv(key))
+	if err != nil {
+		return defaultValue
+	}
+	return value
+}
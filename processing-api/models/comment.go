@@ -2,6 +2,7 @@ package models
 
 // Comment represents a crawled comment
 type Comment struct {
+	ID              int64                  `json:"id,omitempty"` // Row id, used as the pagination cursor
 	CommentID       string                 `json:"comment_id"`
 	Username        string                 `json:"username"`
 	UserID          string                 `json:"user_id"`
@@ -14,10 +15,27 @@ type Comment struct {
 	RawData         map[string]interface{} `json:"raw_data,omitempty"`
 }
 
-// ProcessRequest represents incoming data from crawler workers
+// ProcessRequest represents incoming data from crawler workers.
+// Workers stream large jobs as numbered chunks and flag the last one with
+// Complete; requests without chunk fields are single-shot uploads.
 type ProcessRequest struct {
-	JobID    string    `json:"job_id" binding:"required"`
-	Comments []Comment `json:"comments" binding:"required"`
+	JobID      string    `json:"job_id" binding:"required"`
+	Comments   []Comment `json:"comments"`
+	ChunkIndex *int      `json:"chunk_index,omitempty"`
+	Complete   *bool     `json:"complete,omitempty"`
+}
+
+// IsChunked reports whether the request is part of a chunked upload
+func (r *ProcessRequest) IsChunked() bool {
+	return r.ChunkIndex != nil || r.Complete != nil
+}
+
+// IsFinal reports whether the request finishes the job's upload
+func (r *ProcessRequest) IsFinal() bool {
+	if !r.IsChunked() {
+		return true
+	}
+	return r.Complete != nil && *r.Complete
 }
 
 // ProcessResponse represents the API response after processing